@@ -0,0 +1,570 @@
+import argparse
+import os
+import random
+import select
+import threading
+from collections import deque
+from time import perf_counter, sleep
+
+try:
+    import pty
+    import tty
+except ImportError:  # Pseudo-terminals are not available on Windows
+    pty = None
+
+from SerialProtocol import (FRAME_TYPE_KEY, FRAME_TYPE_DELTA, FRAME_TYPE_GLYPH, PACKED_FRAME_TYPE_MIN,
+                            PACKED_FRAME_TYPE_OFFSET, FRAME_CHARS, CHAR_ROWS, BYTES_PER_FRAME, ROW_BITS,
+                            PACKED_FRAME_BYTES, unpack_rows,
+                            GLYPH_MAP_BYTES, GLYPH_CODE_BLANK, GLYPH_CODE_FULL, START_MARKER, SEQUENCE_MASK, ACK_FLAG,
+                            NAK_FLAG, MAX_PAYLOAD_BYTES, PACKET_TIMEOUT_MS, READY_QUERY, checksum, ready_message)
+
+# --- Arduino Emulator ---
+# A software stand-in for the Arduino running ino/ino.ino, for testing and benchmarking
+# without hardware. It opens a pseudo-terminal, whose device path can be used as COM_PORT,
+# parses the packets exactly like the sketch, keeps the LCD contents in memory and answers
+# every packet with an acknowledgement byte. Like the sketch, it sends its READY line when it
+# starts and whenever it is queried (see "Startup Handshake" in SerialProtocol.py).
+#
+# The timing of the real board is modeled:
+#   - Bytes arrive one UART byte time apart (10 bits per byte at the configured baud rate).
+#   - Received bytes wait in a receive buffer of the Arduino's size. Bytes arriving while
+#     the buffer is full are lost, like on the real board.
+#   - While the sketch is idle, bytes are parsed in the order and at the time they arrive,
+#     even if the emulator thread itself was held up for a moment.
+#   - While the LCD is being updated, no bytes are read from the buffer. Every byte sent to
+#     the LCD takes the time the LiquidCrystal_I2C library needs for it on the I2C bus.
+#   - Optionally, received bytes are lost or corrupted at a given rate, to test resynchronization.
+
+# --- Constants ---
+# UART bits per byte (start bit, 8 data bits, stop bit)
+UART_BITS_PER_BYTE = 10
+# I2C clock cycles of one write to the PCF8574 expander (start, address, data, acknowledges, stop)
+I2C_CLOCKS_PER_EXPANDER_WRITE = 20
+# Expander writes per 4-bit nibble (data, enable high, enable low)
+EXPANDER_WRITES_PER_NIBBLE = 3
+# Delay after every enable pulse in LiquidCrystal_I2C
+ENABLE_PULSE_DELAY_SECONDS = 50e-6
+# Extra delay of lcd.clear() (the HD44780 needs up to 1.52 ms, the library waits 2 ms)
+CLEAR_DELAY_SECONDS = 0.002
+# Size of the HD44780 DDRAM line and the visible part of it on a 16x2 LCD
+DDRAM_LINE_LENGTH = 40
+LCD_COLUMNS = 16
+LCD_ROWS = 2
+# Position of the 4x2 custom character area on the LCD (see ino/ino.ino)
+CHAR_AREA_COLUMN = 6
+CHAR_AREA_COLUMNS = 4
+CHAR_WIDTH_PX = 5
+# Character ROM codes used by glyph frames
+ROM_BLANK = 0x20
+ROM_FULL = 0xFF
+
+# Kind of the last accepted frame, same as in ino/ino.ino
+LAYOUT_NONE = 0
+LAYOUT_BLOCK = 1
+LAYOUT_GLYPH = 2
+
+# Parser states, same as in ino/ino.ino
+WAIT_START = 0
+READ_SEQUENCE = 1
+READ_LENGTH = 2
+READ_PAYLOAD = 3
+READ_CHECKSUM = 4
+
+
+class ArduinoEmulator:
+    """Emulates the Arduino sketch and its LCD on a pseudo-terminal."""
+
+    def __init__(self, baudrate=500000, i2c_clock_hz=100000, rx_buffer_bytes=64, error_rate=0.0, seed=None):
+        """
+        Args:
+            baudrate (int): Serial speed of the modeled board. 0 = bytes arrive without delay.
+            i2c_clock_hz (int): I2C clock of the LCD backpack. 0 = LCD updates take no time.
+            rx_buffer_bytes (int): Size of the serial receive buffer. The AVR ring buffer
+                                   keeps one slot free, so it holds one byte less.
+            error_rate (float): Probability that a received byte is lost or has a flipped bit
+                                (half of the errors each).
+            seed (int): Seed of the error generator, for reproducible runs.
+        """
+        self.baudrate = baudrate
+        self.i2c_clock_hz = i2c_clock_hz
+        self.rx_buffer_bytes = rx_buffer_bytes
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.byte_seconds = UART_BITS_PER_BYTE / baudrate if baudrate > 0 else 0.0
+        if i2c_clock_hz > 0:
+            nibble_seconds = (EXPANDER_WRITES_PER_NIBBLE * I2C_CLOCKS_PER_EXPANDER_WRITE / i2c_clock_hz
+                              + ENABLE_PULSE_DELAY_SECONDS)
+            self.lcd_byte_seconds = 2 * nibble_seconds
+        else:
+            self.lcd_byte_seconds = 0.0
+        self.port = None  # Device path of the pseudo-terminal, set by start()
+
+        # LCD state: the custom character data and the character codes on the screen
+        self.cgram = bytearray(BYTES_PER_FRAME)
+        self.ddram = [bytearray(b" " * DDRAM_LINE_LENGTH) for _ in range(LCD_ROWS)]
+        self._cursor = (0, 0)
+
+        # Statistics
+        self.bytes_received = 0
+        self.overflow_bytes = 0  # Bytes lost because the receive buffer was full
+        self.frames_received = 0
+        self.keyframes_received = 0
+        self.delta_frames_received = 0
+        self.glyph_frames_received = 0
+        self.packets_rejected = 0  # Answered with a NAK
+        self.packets_dropped = 0  # Bad checksum, length or sequence byte, or timed out halfway
+        self.bytes_corrupted = 0  # Bytes lost or changed by error_rate
+        self.chars_written = 0  # Number of lcd.createChar() calls
+        self.lcd_busy_seconds = 0.0
+        self.max_rx_depth = 0
+
+        # Sketch state, same as in ino/ino.ino
+        self._frame_buffer = bytearray(BYTES_PER_FRAME)
+        self._data_ready = False
+        self._first_frame_received = False
+        self._dirty_chars = 0
+        self._ready_sequence = 0
+        self._expected_sequence = 0
+        self._layout = LAYOUT_NONE
+        self._cell_codes = bytearray(b" " * (LCD_COLUMNS * LCD_ROWS))
+        self._screen_codes = bytearray(b" " * (LCD_COLUMNS * LCD_ROWS))
+        self._parser_state = WAIT_START
+        self._packet = bytearray()  # Every byte after the start marker
+        self._payload_length = 0
+        self._last_byte_time = 0.0
+        self._replay = deque()  # Bytes of a dropped packet that are parsed again
+
+        self._rx = deque()  # Receive buffer of the board
+        self._in_transit = deque()  # (arrival time, byte) of bytes still on the wire
+        self._line_free_at = 0.0  # When the last byte in transit has arrived
+        self._tx = deque()  # (due time, data) of replies still being transmitted
+        self._master = None
+        self._slave = None
+        self._stop = threading.Event()
+        self._frame_event = threading.Condition()
+        self._thread = None
+
+    # --- Lifecycle ---
+    def start(self):
+        """
+        Opens the pseudo-terminal and starts the emulated board on a background thread.
+
+        Returns:
+            ArduinoEmulator: self, with port set to the device path to connect to.
+        """
+        if pty is None:
+            raise OSError("The Arduino emulator needs pseudo-terminal support (Linux or macOS).")
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        # The slave stays open here as well, so the host can close and reopen the port
+        self.port = os.ttyname(self._slave)
+        self._setup()
+        self._thread = threading.Thread(target=self._run, name="ArduinoEmulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the emulated board and closes the pseudo-terminal."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def wait_for_frames(self, count, timeout=None):
+        """
+        Waits until the board has displayed the given number of frames in total.
+
+        Returns:
+            bool: True if the frames were displayed before the timeout.
+        """
+        with self._frame_event:
+            return self._frame_event.wait_for(lambda: self.frames_received >= count, timeout)
+
+    # --- LCD ---
+    def _lcd_command(self, lcd_bytes, extra_seconds=0.0):
+        """Returns the time the LCD library needs to send the given number of bytes."""
+        return lcd_bytes * self.lcd_byte_seconds + extra_seconds
+
+    def _lcd_print(self, text):
+        row, column = self._cursor
+        for code in text:
+            if column < DDRAM_LINE_LENGTH:
+                self.ddram[row][column] = code
+            column += 1
+        self._cursor = (row, column)
+        return self._lcd_command(len(text))
+
+    def _lcd_clear(self):
+        for line in self.ddram:
+            line[:] = b" " * DDRAM_LINE_LENGTH
+        self._cursor = (0, 0)
+        return self._lcd_command(1, CLEAR_DELAY_SECONDS)
+
+    def _lcd_set_cursor(self, column, row):
+        self._cursor = (row, column)
+        return self._lcd_command(1)
+
+    def _lcd_create_char(self, index, data):
+        self.cgram[index * CHAR_ROWS:(index + 1) * CHAR_ROWS] = data
+        self.chars_written += 1
+        # Set the CGRAM address, then write the 8 rows
+        return self._lcd_command(1 + CHAR_ROWS)
+
+    def screen(self):
+        """
+        Returns the character codes on the visible part of the LCD.
+
+        Returns:
+            list: One bytes object of 16 character codes per LCD row. Codes 0-7 are custom characters.
+        """
+        return [bytes(line[:LCD_COLUMNS]) for line in self.ddram]
+
+    def render(self, full_screen=False):
+        """
+        Renders the 20x16 pixel area of the custom characters, as placed on the screen.
+
+        Args:
+            full_screen (bool): Render all 16 columns (80x16 pixels, for glyph frames) instead.
+
+        Returns:
+            list: 16 strings of 20 (or 80) characters, '#' for a set pixel and '.' for a clear one.
+        """
+        lines = []
+        for row in range(LCD_ROWS):
+            if full_screen:
+                codes = self.ddram[row][:LCD_COLUMNS]
+            else:
+                codes = self.ddram[row][CHAR_AREA_COLUMN:CHAR_AREA_COLUMN + CHAR_AREA_COLUMNS]
+            for pixel_row in range(CHAR_ROWS):
+                line = ""
+                for code in codes:
+                    # Custom characters and the full block are rendered, anything else shows as blank
+                    if code < FRAME_CHARS:
+                        value = self.cgram[code * CHAR_ROWS + pixel_row]
+                    else:
+                        value = (1 << CHAR_WIDTH_PX) - 1 if code == ROM_FULL else 0
+                    line += "".join("#" if value >> (CHAR_WIDTH_PX - 1 - bit) & 1 else "."
+                                    for bit in range(CHAR_WIDTH_PX))
+                lines.append(line)
+        return lines
+
+    # --- Sketch ---
+    def _setup(self):
+        self._lcd_clear()
+        self._lcd_set_cursor(0, 0)
+        self._lcd_print(b"System Ready")
+        self._lcd_set_cursor(0, 1)
+        self._lcd_print(b"Waiting for data...")
+        self._transmit(ready_message())
+
+    def _set_block_layout(self):
+        """Places the 8 custom characters as a 4x2 block, the other cells stay blank."""
+        for cell in range(LCD_COLUMNS * LCD_ROWS):
+            row, column = divmod(cell, LCD_COLUMNS)
+            if CHAR_AREA_COLUMN <= column < CHAR_AREA_COLUMN + CHAR_AREA_COLUMNS:
+                self._cell_codes[cell] = row * CHAR_AREA_COLUMNS + column - CHAR_AREA_COLUMN
+            else:
+                self._cell_codes[cell] = ROM_BLANK
+
+    @staticmethod
+    def _check_changed_rows(payload, end, packed=False):
+        """
+        Checks that the character mask and row masks starting at payload[1] add up to end.
+
+        Returns:
+            tuple: (valid, complete), complete if every row of every character is included.
+        """
+        char_mask = payload[1]
+        index = 2
+        rows = 0
+        complete = char_mask == 0xFF
+        for char_index in range(FRAME_CHARS):
+            if char_mask & (1 << char_index):
+                if index >= end:
+                    return False, False
+                complete = complete and payload[index] == 0xFF
+                count = bin(payload[index]).count("1")
+                if packed:
+                    rows += count
+                    index += 1
+                else:
+                    index += 1 + count
+        if packed:
+            index += (rows * ROW_BITS + 7) // 8
+        return index == end, complete
+
+    def _apply_changed_rows(self, payload, packed=False):
+        char_mask = payload[1]
+        index = 2
+        if packed:
+            # The packed rows follow all row masks
+            rows_start = 2 + bin(char_mask).count("1")
+            rows = iter(unpack_rows(payload[rows_start:], (len(payload) - rows_start) * 8 // ROW_BITS).tolist())
+        for char_index in range(FRAME_CHARS):
+            if char_mask & (1 << char_index):
+                row_mask = payload[index]
+                index += 1
+                for row in range(CHAR_ROWS):
+                    if row_mask & (1 << row):
+                        if packed:
+                            self._frame_buffer[char_index * CHAR_ROWS + row] = next(rows)
+                        else:
+                            self._frame_buffer[char_index * CHAR_ROWS + row] = payload[index]
+                            index += 1
+                self._dirty_chars |= 1 << char_index
+
+    def _apply_payload(self, payload, sequence):
+        """Applies a received payload, returns False if it is malformed or out of sequence."""
+        frame_type = payload[0]
+        # The same rule as applyPayload() in ino.ino: lowercase types are packed, anything else stays unknown
+        packed = frame_type >= PACKED_FRAME_TYPE_MIN
+        if packed:
+            frame_type -= PACKED_FRAME_TYPE_OFFSET
+        if frame_type == FRAME_TYPE_KEY:
+            if len(payload) != 1 + (PACKED_FRAME_BYTES if packed else BYTES_PER_FRAME):
+                return False
+            self._frame_buffer[:] = unpack_rows(payload[1:], BYTES_PER_FRAME).tobytes() if packed else payload[1:]
+            self._dirty_chars = 0xFF
+            self._layout = LAYOUT_BLOCK
+            self._set_block_layout()
+            self.keyframes_received += 1
+            return True
+        if frame_type == FRAME_TYPE_DELTA:
+            # Check that the masks and rows add up to the payload length before changing anything
+            if (len(payload) < 2 or self._layout != LAYOUT_BLOCK or sequence != self._expected_sequence
+                    or not self._check_changed_rows(payload, len(payload), packed)[0]):
+                return False
+            self._apply_changed_rows(payload, packed)
+            self.delta_frames_received += 1
+            return True
+        if frame_type == FRAME_TYPE_GLYPH:
+            if len(payload) < 2 + GLYPH_MAP_BYTES:
+                return False
+            valid, complete = self._check_changed_rows(payload, len(payload) - GLYPH_MAP_BYTES, packed)
+            if not valid or (not complete and (self._layout != LAYOUT_GLYPH or sequence != self._expected_sequence)):
+                return False
+            cell_map = payload[-GLYPH_MAP_BYTES:]
+            codes = [code for value in cell_map for code in (value & 0x0F, value >> 4)]
+            if max(codes) > GLYPH_CODE_FULL:
+                return False
+            self._apply_changed_rows(payload[:-GLYPH_MAP_BYTES], packed)
+            rom_codes = {GLYPH_CODE_BLANK: ROM_BLANK, GLYPH_CODE_FULL: ROM_FULL}
+            self._cell_codes[:] = bytes(rom_codes.get(code, code) for code in codes)
+            self._layout = LAYOUT_GLYPH
+            self.glyph_frames_received += 1
+            return True
+        return False
+
+    def _drop_packet(self):
+        """Drops the packet being received and parses the bytes after its start marker again."""
+        self.packets_dropped += 1
+        if self._packet and not self._packet[0] & ~SEQUENCE_MASK:
+            self._transmit(bytes((ACK_FLAG | NAK_FLAG | self._packet[0],)))
+            self.packets_rejected += 1
+        if START_MARKER in self._packet:
+            tail = self._packet[self._packet.index(START_MARKER):]
+            self._replay.extendleft(reversed(tail))
+        self._packet = bytearray()
+        self._parser_state = WAIT_START
+
+    def _parse_byte(self, value):
+        state = self._parser_state
+        if state == WAIT_START:
+            if value == START_MARKER:
+                self._packet = bytearray()
+                self._parser_state = READ_SEQUENCE
+            elif value == READY_QUERY:
+                self._transmit(ready_message())
+            # Any other byte is ignored until a start marker arrives
+        elif state == READ_SEQUENCE:
+            self._packet.append(value)
+            if value & ~SEQUENCE_MASK:
+                self._drop_packet()
+            else:
+                self._parser_state = READ_LENGTH
+        elif state == READ_LENGTH:
+            self._packet.append(value)
+            self._payload_length = value
+            if value == 0 or value > MAX_PAYLOAD_BYTES:
+                self._drop_packet()
+            else:
+                self._parser_state = READ_PAYLOAD
+        elif state == READ_PAYLOAD:
+            self._packet.append(value)
+            if len(self._packet) == 2 + self._payload_length:
+                self._parser_state = READ_CHECKSUM
+        elif state == READ_CHECKSUM:
+            self._packet.append(value)
+            if checksum(self._packet[:-1]) != value:
+                self._drop_packet()
+                return
+            sequence = self._packet[0]
+            payload = bytes(self._packet[2:-1])
+            self._packet = bytearray()
+            self._parser_state = WAIT_START
+            if self._apply_payload(payload, sequence):
+                self._ready_sequence = sequence
+                self._expected_sequence = (sequence + 1) & SEQUENCE_MASK
+                self._data_ready = True
+            else:
+                self._transmit(bytes((ACK_FLAG | NAK_FLAG | sequence,)))
+                self.packets_rejected += 1
+
+    def _display_frame(self):
+        """Updates the LCD like loop() does once a frame is complete. Returns the time it takes."""
+        seconds = 0.0
+        for index in range(FRAME_CHARS):
+            if self._dirty_chars & (1 << index):
+                start = index * CHAR_ROWS
+                seconds += self._lcd_create_char(index, self._frame_buffer[start:start + CHAR_ROWS])
+        self._dirty_chars = 0
+        if not self._first_frame_received:
+            seconds += self._lcd_clear()
+            self._screen_codes[:] = b" " * len(self._screen_codes)
+            self._first_frame_received = True
+        # Only the cells whose character code changed are written, runs of cells with one setCursor
+        for row in range(LCD_ROWS):
+            column = 0
+            while column < LCD_COLUMNS:
+                start = row * LCD_COLUMNS
+                end = column
+                while end < LCD_COLUMNS and self._cell_codes[start + end] != self._screen_codes[start + end]:
+                    end += 1
+                if end > column:
+                    seconds += self._lcd_set_cursor(column, row)
+                    seconds += self._lcd_print(bytes(self._cell_codes[start + column:start + end]))
+                    self._screen_codes[start + column:start + end] = self._cell_codes[start + column:start + end]
+                    column = end
+                else:
+                    column += 1
+        return seconds
+
+    # --- Serial Line ---
+    def _pump(self, timeout, buffering=False):
+        """
+        Moves bytes between the pseudo-terminal, the wire and, while the sketch is busy
+        (buffering), the receive buffer. While it is idle, _run() parses arrived bytes directly.
+        """
+        now = perf_counter()
+        # Wake up for the next byte arrival or reply, if earlier than the timeout
+        if self._in_transit:
+            timeout = min(timeout, self._in_transit[0][0] - now)
+        if self._tx:
+            timeout = min(timeout, self._tx[0][0] - now)
+        readable, _, _ = select.select([self._master], [], [], max(timeout, 0.0))
+        now = perf_counter()
+        if readable:
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                data = b""
+            arrival = max(now, self._line_free_at)
+            for value in data:
+                arrival += self.byte_seconds
+                if self.error_rate and self._random.random() < self.error_rate:
+                    self.bytes_corrupted += 1
+                    if self._random.random() < 0.5:
+                        continue  # Lost
+                    value ^= 1 << self._random.randrange(8)
+                self._in_transit.append((arrival, value))
+            self._line_free_at = arrival
+            self.bytes_received += len(data)
+        if buffering:
+            capacity = self.rx_buffer_bytes - 1
+            while self._in_transit and self._in_transit[0][0] <= now:
+                _, value = self._in_transit.popleft()
+                if len(self._rx) < capacity:
+                    self._rx.append(value)
+                else:
+                    self.overflow_bytes += 1
+            self.max_rx_depth = max(self.max_rx_depth, len(self._rx))
+        while self._tx and self._tx[0][0] <= now:
+            os.write(self._master, self._tx.popleft()[1])
+
+    def _busy(self, start, seconds):
+        """Keeps receiving into the buffer while the sketch is busy from start for the given time."""
+        deadline = start + seconds
+        while not self._stop.is_set():
+            remaining = deadline - perf_counter()
+            self._pump(max(remaining, 0.0), True)
+            if remaining <= 0:
+                break
+
+    def _transmit(self, data):
+        due = max(perf_counter(), self._tx[-1][0] if self._tx else 0.0) + len(data) * self.byte_seconds
+        self._tx.append((due, data))
+
+    def _run(self):
+        packet_timeout = PACKET_TIMEOUT_MS / 1000.0
+        while not self._stop.is_set():
+            # Wait for the next byte if there is nothing to parse
+            timeout = 0.0 if self._rx or self._replay else 0.05
+            if self._parser_state != WAIT_START:
+                timeout = min(timeout, max(self._last_byte_time + packet_timeout - perf_counter(), 0.0))
+            self._pump(timeout)
+            now = perf_counter()
+            while not self._data_ready:
+                if self._replay:
+                    self._parse_byte(self._replay.popleft())
+                elif self._rx:
+                    self._last_byte_time = now
+                    self._parse_byte(self._rx.popleft())
+                elif self._in_transit and self._in_transit[0][0] <= now:
+                    # The idle sketch reads every byte as soon as it arrives
+                    self._last_byte_time, value = self._in_transit.popleft()
+                    self._parse_byte(value)
+                else:
+                    break
+            # A packet that stopped halfway (bytes were lost) is dropped, so the next one is not missed
+            if (not self._data_ready and self._parser_state != WAIT_START and not self._replay
+                    and perf_counter() - self._last_byte_time > packet_timeout):
+                self._drop_packet()
+            if not self._data_ready:
+                continue
+            self._data_ready = False
+            seconds = self._display_frame()
+            self.lcd_busy_seconds += seconds
+            # The LCD update started when the last byte of the packet arrived
+            self._busy(self._last_byte_time, seconds)
+            self._transmit(bytes((ACK_FLAG | self._ready_sequence,)))
+            with self._frame_event:
+                self.frames_received += 1
+                self._frame_event.notify_all()
+
+
+# --- Standalone Use ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulates the Arduino and LCD on a pseudo-terminal.")
+    parser.add_argument("--baudrate", type=int, default=500000, help="Serial speed (default 500000)")
+    parser.add_argument("--i2c-clock", type=int, default=100000, help="I2C clock of the LCD in Hz (default 100000)")
+    parser.add_argument("--rx-buffer", type=int, default=64, help="Serial receive buffer size (default 64)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probability that a received byte is lost or corrupted (default 0)")
+    arguments = parser.parse_args()
+
+    emulator = ArduinoEmulator(arguments.baudrate, arguments.i2c_clock, arguments.rx_buffer,
+                               arguments.error_rate).start()
+    print(f"Emulated Arduino listening on {emulator.port} (set COM_PORT to this path). Press Ctrl+C to stop.")
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator.stop()
+    print(f"Frames displayed: {emulator.frames_received} ({emulator.keyframes_received} keyframes, "
+          f"{emulator.delta_frames_received} delta frames, {emulator.glyph_frames_received} glyph frames), bytes received: {emulator.bytes_received}, "
+          f"bytes lost to overflow: {emulator.overflow_bytes}")
+    print(f"Packets dropped: {emulator.packets_dropped}, rejected: {emulator.packets_rejected}, "
+          f"bytes lost or corrupted on purpose: {emulator.bytes_corrupted}")
+    print("\n".join(emulator.render(emulator.glyph_frames_received > 0)))
@@ -0,0 +1,194 @@
+import argparse
+import contextlib
+import io
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+import main
+from Playlist import read_playlist
+from RawInput import is_raw_source
+
+# --- Batch Conversion ---
+# Converts many image folders, GIFs and images into script files (Scripts/*.bin) without a
+# board: no serial port is opened, nothing is played. The sources are converted concurrently,
+# one per worker process of a single process pool, so the whole library is rebuilt with at
+# most one process per CPU core. A lone source uses the parallel ingest of main.py instead.
+#
+# A source is skipped when its script file is up to date: the source fingerprint (file names,
+# sizes and modification times of the frames) and the conversion settings in its header match
+# the current ones (see script_is_up_to_date() in main.py). This makes a batch resumable: after
+# an interruption, running the same command again converts only the sources that did not finish.
+# On Ctrl+C, the sources that are being converted are finished and the others are left for the
+# next run. A conversion cut off by a crash leaves the previous script file (if any) as it was.
+#
+# Usage:
+#   python BatchConvert.py "Bad Apple" clips/*.gif show.m3u [--workers 4] [--force]
+# A playlist (see Playlist.py) stands for its entries. Conversion settings (threshold, frame
+# range, layout, packing...) are taken from main.py.
+
+
+# --- Helper Functions ---
+def expand_sources(paths):
+    """
+    Returns the sources to convert: the given paths, with playlists replaced by their entries.
+    Script files (.bin) and duplicates are left out.
+
+    Args:
+        paths (list): Image folders, GIFs, images or playlists.
+
+    Returns:
+        list: The source paths, in order.
+    """
+    sources = []
+    for path in paths:
+        if path.lower().endswith(main.PLAYLIST_EXTENSIONS) and os.path.isfile(path):
+            try:
+                entries = read_playlist(path)
+            except OSError as e:
+                print(f"Warning: Could not read playlist {path}: {e}. Skipping it.")
+                continue
+            sources.extend(entry for entry in entries if not entry.lower().endswith(".bin"))
+        else:
+            sources.append(path)
+    # The same source given twice (e.g. on the command line and in a playlist) is converted once
+    unique = {}
+    for source in sources:
+        unique.setdefault(os.path.abspath(source), os.path.normpath(source))
+    return list(unique.values())
+
+
+def ignore_interrupts():
+    """Worker process initializer: Ctrl+C is handled by the main process, which lets running conversions finish."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def convert_source(source_path, ingest_workers=1):
+    """
+    Converts one source into its script file, with the console output of the conversion captured.
+
+    Args:
+        source_path (str): The image folder, GIF or image file.
+        ingest_workers (int): Worker processes for this source (INGEST_WORKERS).
+
+    Returns:
+        tuple: (frame count, seconds, warning and error lines of the conversion).
+    """
+    main.INGEST_WORKERS = ingest_workers
+    begin = perf_counter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        frame_count = sum(1 for _ in main.process_source_frames(source_path, main.script_file_path_for(source_path)))
+    problems = [line.strip() for line in output.getvalue().splitlines() if line.strip().startswith(("Warning", "Error"))]
+    return frame_count, perf_counter() - begin, problems
+
+
+# --- Batch Conversion ---
+def convert_all(sources, workers=0, force=False):
+    """
+    Converts the sources that are not up to date, reporting progress as they finish.
+
+    Args:
+        sources (list): Image folders, GIFs or images.
+        workers (int): Worker processes, 0 = one per CPU core.
+        force (bool): Convert every source, even if its script file is up to date.
+
+    Returns:
+        int: The number of sources that could not be converted.
+    """
+    failed = 0
+    pending = []
+    script_sources = {}  # Script file path -> source, sources with the same name would overwrite each other
+    for source in sources:
+        script_file_path = main.script_file_path_for(source)
+        if is_raw_source(source) or not os.path.exists(source):
+            print(f"Error: Source '{source}' not found or not a file or folder. Skipping it.")
+            failed += 1
+        elif script_file_path in script_sources:
+            print(f"Error: {source} and {script_sources[script_file_path]} would both be saved to "
+                  f"{script_file_path}. Skipping {source}, rename one of them.")
+            failed += 1
+        elif not force and main.script_is_up_to_date(source, script_file_path):
+            script_sources[script_file_path] = source
+            print(f"Up to date: {source} ({script_file_path})")
+        else:
+            script_sources[script_file_path] = source
+            pending.append(source)
+    if not pending:
+        print("Nothing to convert.")
+        return failed
+
+    workers = main.resolve_worker_count(workers)
+    begin = perf_counter()
+    total_frames = 0
+    print(f"Converting {len(pending)} of {len(sources)} sources with {min(workers, len(pending))} worker processes...")
+
+    def report(number, source, result):
+        """Prints the outcome of one source, returns True if it was converted."""
+        nonlocal total_frames
+        frame_count, seconds, problems = result
+        for line in problems:
+            print(f"    {line}")
+        if not frame_count:
+            print(f"[{number}/{len(pending)}] Failed: {source} (no frames converted)")
+            return False
+        total_frames += frame_count
+        print(f"[{number}/{len(pending)}] Converted {source}: {frame_count} frames in {seconds:.1f} s "
+              f"({frame_count / max(seconds, 1e-9):.0f} frames/s) -> {main.script_file_path_for(source)}")
+        return True
+
+    if len(pending) == 1:
+        # A single source gets all workers for its frames
+        failed += not report(1, pending[0], convert_source(pending[0], workers))
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=ignore_interrupts)
+        futures = {pool.submit(convert_source, source): source for source in pending}
+        reported = set()
+
+        def collect(future):
+            """Reports a finished conversion."""
+            nonlocal failed
+            reported.add(future)
+            finished = len(reported)
+            try:
+                failed += not report(finished, futures[future], future.result())
+            except Exception as e:
+                print(f"[{finished}/{len(pending)}] Failed: {futures[future]} ({e})")
+                failed += 1
+
+        try:
+            for future in as_completed(futures):
+                collect(future)
+        except KeyboardInterrupt:
+            print("\nInterrupted by user. Finishing the conversions in progress...")
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future in futures:
+                if future.done() and not future.cancelled() and future not in reported:
+                    collect(future)
+            if len(reported) < len(pending):
+                print(f"{len(pending) - len(reported)} sources left, run the same command again to convert them.")
+                failed += len(pending) - len(reported)
+        else:
+            pool.shutdown()
+
+    duration = perf_counter() - begin
+    print(f"Converted {total_frames} frames in {duration:.1f} s ({total_frames / max(duration, 1e-9):.0f} frames/s).")
+    return failed
+
+
+# --- Entry Point ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts image folders, GIFs and images into script files "
+                                                 "without a board.")
+    parser.add_argument("sources", nargs="+", help="Image folders, GIFs, images or playlists to convert")
+    parser.add_argument("--workers", type=int, default=main.INGEST_WORKERS,
+                        help=f"Worker processes, 0 = one per CPU core ({main.INGEST_WORKERS})")
+    parser.add_argument("--force", action="store_true", help="Convert sources whose script files are up to date")
+    arguments = parser.parse_args()
+
+    failures = convert_all(expand_sources(arguments.sources), arguments.workers, arguments.force)
+    if failures:
+        print(f"{failures} source(s) could not be converted.")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+from time import time
+
+# --- Per-Frame Conversion Cache ---
+# Stores the converted bytes of every source image, keyed by the identity of the
+# source file and the conversion parameters. When a folder is processed again, only
+# images that are new, were edited, or were converted with different settings are
+# converted; every other frame is read back from the cache.
+#
+# The cache is a single SQLite database. Entries are evicted least recently used
+# first once the stored data exceeds the configured size.
+
+# --- Constants ---
+# Bump when the conversion output changes, so old entries are no longer used
+CACHE_FORMAT_VERSION = 2
+# Key modes: "stat" identifies a file by path, size and modification time (fast),
+# "content" hashes the file content (survives copies and touched files, but reads every file)
+KEY_MODE_STAT = "stat"
+KEY_MODE_CONTENT = "content"
+# Approximate per-entry overhead (key, row and index) counted towards the size limit
+ENTRY_OVERHEAD_BYTES = 96
+# SQLite limits the number of parameters in a single query
+_QUERY_BATCH = 500
+
+
+class FrameCache:
+    """A size-limited, persistent cache of converted frames."""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, key_mode=KEY_MODE_STAT):
+        """
+        Args:
+            path (str): Path of the cache database file (created if missing).
+            max_bytes (int): Size limit of the stored frame data (0 = unlimited).
+            key_mode (str): KEY_MODE_STAT or KEY_MODE_CONTENT.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.key_mode = key_mode
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS frames ("
+                         "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS frames_last_used ON frames (last_used)")
+        self._db.commit()
+
+    def key(self, image_path, black, white, threshold, layout="block", fast_decode=False):
+        """
+        Builds the cache key of a source image converted with the given parameters.
+
+        Args:
+            image_path (str): Path of the source image.
+            black, white, threshold, layout, fast_decode: The conversion parameters.
+
+        Returns:
+            str: The hex digest identifying the converted frame.
+        """
+        digest = hashlib.sha256(f"v{CACHE_FORMAT_VERSION}|{black}|{white}|{threshold}|{layout}|{int(fast_decode)}|"
+                                .encode('utf-8'))
+        if self.key_mode == KEY_MODE_CONTENT:
+            with open(image_path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        else:
+            stat = os.stat(image_path)
+            digest.update(f"{os.path.abspath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        """
+        Looks up several frames at once and marks them as recently used.
+
+        Args:
+            keys (list): Cache keys built with key().
+
+        Returns:
+            dict: The frame bytes of every key found in the cache.
+        """
+        found = {}
+        now = time()
+        for start in range(0, len(keys), _QUERY_BATCH):
+            batch = keys[start:start + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(f"SELECT key, data FROM frames WHERE key IN ({placeholders})", batch)
+            found.update((key, bytes(data)) for key, data in rows)
+            self._db.execute(f"UPDATE frames SET last_used = ? WHERE key IN ({placeholders})", [now, *batch])
+        self._db.commit()
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Stores converted frames.
+
+        Args:
+            items (list): (key, frame bytes) pairs.
+        """
+        now = time()
+        self._db.executemany("INSERT OR REPLACE INTO frames (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                             [(key, bytes(data), len(data) + ENTRY_OVERHEAD_BYTES, now) for key, data in items])
+        self._db.commit()
+
+    def size(self):
+        """Returns the number of bytes counted against the size limit."""
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM frames").fetchone()[0]
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits within max_bytes.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        if self.max_bytes <= 0:
+            return 0
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM frames ORDER BY last_used"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM frames WHERE key = ?", doomed)
+        self._db.commit()
+        return len(doomed)
+
+    def clear(self):
+        """Deletes every entry."""
+        self._db.execute("DELETE FROM frames")
+        self._db.commit()
+
+    def close(self):
+        """Evicts entries over the size limit and closes the database."""
+        self.evict()
+        self._db.close()
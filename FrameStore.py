@@ -0,0 +1,138 @@
+# --- Frame Store ---
+# Keeps the converted frames of a sequence in a single contiguous buffer instead of one
+# bytes object per frame. Appending copies a frame straight from the converter's output
+# (a list of ints, bytes or a numpy row) into the buffer, and every frame handed out is a
+# read-only memoryview slice of it, so there is no per-frame allocation on the ingest or
+# the playback path and the whole sequence can be written to a script file in one go.
+# A batch of frames that is already contiguous (a converted numpy batch) is copied in
+# with a single slice assignment.
+#
+# The buffer is preallocated with reserve() when the number of frames is known. When it
+# is full, a buffer twice the size is allocated and the frames are copied over; views
+# handed out before keep referring to the old buffer, which holds the same frames, so
+# they stay valid.
+
+# --- Constants ---
+DEFAULT_CAPACITY = 1024  # Frames allocated for the first append() without reserve()
+
+
+class FrameStore:
+    """A growable sequence of fixed-size frames in one contiguous buffer."""
+
+    def __init__(self, frame_size, capacity=0):
+        """
+        Args:
+            frame_size (int): Bytes per frame.
+            capacity (int): Frames to allocate up front.
+        """
+        self.frame_size = frame_size
+        self.frame_count = 0
+        self._buffer = bytearray(frame_size * capacity)
+        self._writable = memoryview(self._buffer)
+        self._view = self._writable.toreadonly()
+
+    @property
+    def capacity(self):
+        """Number of frames that fit in the buffer before it grows."""
+        return len(self._buffer) // self.frame_size
+
+    def reserve(self, frame_count):
+        """Makes room for frame_count frames in total, so appending them never reallocates."""
+        if frame_count <= self.capacity:
+            return
+        buffer = bytearray(self.frame_size * frame_count)
+        used = self.frame_count * self.frame_size
+        buffer[:used] = self._view[:used]
+        self._buffer = buffer
+        self._writable = memoryview(buffer)
+        self._view = self._writable.toreadonly()
+
+    def append(self, frame):
+        """
+        Copies a frame into the store.
+
+        Args:
+            frame: The frame_size bytes of the frame, as bytes, a memoryview, a uint8 numpy row
+                   or a list of ints (the output of convert()).
+
+        Returns:
+            memoryview: The stored frame (read-only).
+
+        Raises:
+            ValueError: If the frame is not frame_size bytes.
+        """
+        start = self.frame_count * self.frame_size
+        end = start + self.frame_size
+        if end > len(self._buffer):
+            self.reserve(max(2 * self.capacity, DEFAULT_CAPACITY))
+        if isinstance(frame, list):
+            if len(frame) != self.frame_size:
+                raise ValueError(f"Expected a frame of {self.frame_size} bytes, got {len(frame)}.")
+            self._buffer[start:end] = frame
+        else:
+            try:
+                # Buffers are copied by the memoryview, which also checks their size
+                self._writable[start:end] = frame
+            except ValueError:
+                raise ValueError(f"Expected a frame of {self.frame_size} bytes (uint8).") from None
+        self.frame_count += 1
+        return self._view[start:end]
+
+    def extend(self, frames):
+        """
+        Appends several frames. Frames back to back in one contiguous buffer (bytes, a memoryview
+        or a uint8 numpy array, e.g. the (N, frame_size) output of convert_batch()) are copied
+        with a single slice assignment; lists and other iterables are appended frame by frame.
+
+        Returns:
+            int: The number of frames appended.
+
+        Raises:
+            ValueError: If a buffer does not hold whole frames of frame_size bytes.
+        """
+        try:
+            data = memoryview(frames)
+        except TypeError:
+            data = None  # A list or another iterable
+        if data is None or not data.c_contiguous:
+            count = 0
+            for frame in frames:
+                self.append(frame)
+                count += 1
+            return count
+        if data.itemsize != 1 or data.nbytes % self.frame_size:
+            raise ValueError(f"Expected whole frames of {self.frame_size} bytes (uint8), got {data.nbytes} bytes.")
+        count = data.nbytes // self.frame_size
+        if not count:
+            return 0
+        if self.frame_count + count > self.capacity:
+            self.reserve(max(self.frame_count + count, 2 * self.capacity))
+        start = self.frame_count * self.frame_size
+        self._writable[start:start + data.nbytes] = data.cast('B')
+        self.frame_count += count
+        return count
+
+    def view(self, start=0, stop=None):
+        """
+        Returns the frames in the range [start, stop) as one contiguous read-only memoryview,
+        e.g. for writing them to a file or wrapping them with numpy.frombuffer().
+        """
+        start, stop, _ = slice(start, stop).indices(self.frame_count)
+        return self._view[start * self.frame_size:max(stop, start) * self.frame_size]
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.frame_count))]
+        if index < 0:
+            index += self.frame_count
+        if not 0 <= index < self.frame_count:
+            raise IndexError("frame index out of range")
+        start = index * self.frame_size
+        return self._view[start:start + self.frame_size]
+
+    def __iter__(self):
+        for index in range(self.frame_count):
+            yield self[index]
@@ -0,0 +1,112 @@
+import queue
+import threading
+from time import perf_counter
+
+# --- Streaming Frame Pipeline ---
+# A background thread pulls frames from a producer (any iterable, typically the
+# generator that converts the source images) into a bounded queue, while the sender
+# consumes them. When the queue is full the producer blocks (backpressure), so memory
+# use stays constant no matter how long the sequence is, and the first frame can be
+# sent as soon as it has been converted.
+
+# Marks the end of the stream in the queue
+_END_OF_STREAM = object()
+
+
+class FrameStream:
+    """A bounded, single-pass stream of frames produced by a background thread."""
+
+    def __init__(self, producer, max_queued_frames=256):
+        """
+        Args:
+            producer (iterable): Yields the frames in order. It is iterated on the background thread.
+            max_queued_frames (int): Maximum number of converted frames waiting to be sent.
+        """
+        self.producer = producer
+        self.max_queued_frames = max_queued_frames
+        self.frames_produced = 0
+        self.frames_consumed = 0
+        self.producer_blocked_seconds = 0.0  # Time the producer waited for room in the queue
+        self.consumer_wait_seconds = 0.0  # Time the consumer waited for the next frame
+        self.max_queue_depth = 0
+        self.finished = threading.Event()  # Set once the producer is exhausted or stopped
+        self._queue = queue.Queue(maxsize=max_queued_frames)
+        self._stop = threading.Event()
+        self._first_frame = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="FrameStream", daemon=True)
+
+    def start(self):
+        """Starts converting frames on the background thread."""
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        """Puts an item into the queue, waiting while it is full. Returns False if the stream was stopped."""
+        begin = perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                self.producer_blocked_seconds += perf_counter() - begin
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        iterator = iter(self.producer)
+        try:
+            for frame in iterator:
+                if not self._put(frame):
+                    break
+                self.frames_produced += 1
+                self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+                self._first_frame.set()
+        except Exception as e:
+            print(f"\nError while producing frames: {e}")
+        finally:
+            # Lets a generator producer run its cleanup (e.g. closing the script file)
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+            self.finished.set()
+            self._first_frame.set()
+            self._put(_END_OF_STREAM)
+
+    def wait_for_first_frame(self):
+        """
+        Blocks until the first frame is available or the producer finished.
+
+        Returns:
+            bool: True if at least one frame was produced.
+        """
+        self._first_frame.wait()
+        return self.frames_produced > 0
+
+    def __iter__(self):
+        """Yields the frames in order, waiting for the producer when the queue is empty."""
+        while True:
+            begin = perf_counter()
+            frame = self._queue.get()
+            self.consumer_wait_seconds += perf_counter() - begin
+            if frame is _END_OF_STREAM:
+                return
+            self.frames_consumed += 1
+            yield frame
+
+    def __len__(self):
+        """Returns the number of frames produced so far (the total, once finished)."""
+        return self.frames_produced
+
+    def stop(self):
+        """Stops the producer early and waits for the background thread to end."""
+        self._stop.set()
+        self._thread.join()
+
+    def join(self):
+        """Waits until the producer is exhausted. Frames that were not consumed are discarded."""
+        while not self.finished.is_set():
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        self._thread.join()
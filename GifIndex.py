@@ -0,0 +1,583 @@
+import io
+import mmap
+import os
+import struct
+from array import array
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from ScriptFile import source_fingerprint
+
+# --- GIF Frame Index ---
+# Pillow can only reach frame N of a GIF by decoding frames 0 to N-1 first, because every
+# frame is drawn on top of the previous ones. Starting a long GIF in the middle therefore
+# costs as much as converting everything before it, on every run.
+#
+# The index records where every frame starts in the file, its extent, transparency and
+# disposal method, found by walking the block structure of the GIF without decompressing
+# any image data. Every CHECKPOINT_INTERVAL frames it also stores a checkpoint: the canvas
+# a frame is drawn on (the previous frames after their disposal), encoded as GIF frames (one
+# full-size frame, or tiles of at most 256 colors each). The index is built once, which decodes the GIF once, and saved next to the
+# script file (Scripts/<name>.index).
+#
+# To decode frame N, Pillow is handed the GIF header, the last checkpoint at or before N and
+# the file from there up to N, so only the frames since that checkpoint are decoded. A frame
+# that covers the whole canvas without transparency and uses the global palette does not
+# depend on the frames before it (a keyframe), and the file can be handed over from there
+# without a checkpoint. (Pillow decodes a first frame with a local palette differently from
+# the same frame later in the file: with a grayscale palette on one side and a color palette
+# on the other, it keeps the wrong one.)
+#
+# Index file layout (all integers little-endian):
+#   Header (HEADER_SIZE bytes):
+#     magic              4s   b"GIFX"
+#     version            H    FORMAT_VERSION
+#     width, height      H H  Logical screen size of the GIF
+#     frame_count        I    Number of frames
+#     checkpoint_count   I    Number of checkpoints
+#     header_length      I    Length of the GIF header and global palette
+#     data_end           I    Offset after the last frame
+#     source_fingerprint 32s  source_fingerprint() of the GIF, to detect a changed file
+#   Frames (FRAME_FORMAT for each frame):
+#     offset             I    Offset of the frame's first block (extensions before the image)
+#     x0, y0, x1, y1     HHHH Extent of the frame on the canvas
+#     disposal           B    Disposal method of the frame's graphic control extension
+#     flags              B    FLAG_TRANSPARENCY, FLAG_DURATION, FLAG_LOCAL_PALETTE
+#     duration           H    Display duration in milliseconds (if FLAG_DURATION)
+#   Checkpoints (CHECKPOINT_FORMAT for each checkpoint):
+#     frame              I    The frame that is drawn on the stored canvas
+#     frame_count        I    Number of GIF frames the canvas is encoded as
+#     offset, length     I I  Position of the encoded canvas (GIF blocks) in the index file
+#   Encoded canvases
+
+# --- Constants ---
+MAGIC = b"GIFX"
+FORMAT_VERSION = 2
+HEADER_FORMAT = "<4sHHHIIII32s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # Should be 60
+FRAME_FORMAT = "<IHHHHBBH"
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)  # Should be 16
+CHECKPOINT_FORMAT = "<IIII"
+CHECKPOINT_SIZE = struct.calcsize(CHECKPOINT_FORMAT)  # Should be 16
+INDEX_EXTENSION = ".index"
+# Frames between checkpoints: at most this many frames are decoded before the first one needed
+CHECKPOINT_INTERVAL = 32
+
+FLAG_TRANSPARENCY = 1  # The frame has a transparent color
+FLAG_DURATION = 2  # The frame has a graphic control extension with a delay
+FLAG_LOCAL_PALETTE = 4  # The frame has its own palette
+
+DISPOSAL_PREVIOUS = 3  # Restore the canvas to its state before the frame
+# Stands for transparent pixels while the colors of an RGBA canvas are counted (above any RGB color)
+TRANSPARENT_COLOR = 1 << 24
+
+
+# --- Checkpoint Encoding ---
+def _palette_needed(palette):
+    """Mirrors Pillow: a palette of gray levels equal to their index is read as a grayscale image."""
+    return any(palette[i] != i // 3 for i in range(len(palette)))
+
+
+def _split_tiles(packed, limit):
+    """
+    Splits a canvas into tiles of at most limit distinct colors: bands of whole rows,
+    or segments of a single row that has too many colors by itself.
+
+    Returns:
+        list: (x0, y0, x1, y1) of every tile, covering the canvas.
+    """
+    height, width = packed.shape
+    tiles = []
+    y = 0
+    while y < height:
+        colors = set()
+        y1 = y
+        while y1 < height:
+            band_colors = colors.union(np.unique(packed[y1]).tolist())
+            if len(band_colors) > limit:
+                break
+            colors = band_colors
+            y1 += 1
+        if y1 > y:
+            tiles.append((0, y, width, y1))
+            y = y1
+            continue
+        x = 0
+        while x < width:
+            colors = set()
+            x1 = x
+            while x1 < width and len(colors | {int(packed[y, x1])}) <= limit:
+                colors.add(int(packed[y, x1]))
+                x1 += 1
+            tiles.append((x, y, x1, y + 1))
+            x = x1
+        y += 1
+    return tiles
+
+
+def _encode_tile(indices, palette, box, transparency, disposal, grayscale=False):
+    """
+    Encodes one tile as GIF blocks: graphic control extension, image descriptor with a
+    local palette and the image data (compressed by Pillow).
+
+    Returns:
+        bytes: The blocks, or None if Pillow would read the palette as grayscale when it
+               is not meant to be, or the other way around.
+    """
+    image = Image.fromarray(indices, "P")
+    image.putpalette(palette)
+    encoded = io.BytesIO()
+    image.save(encoded, "GIF", optimize=False, interlace=False)
+    gif = encoded.getvalue()
+    flags = gif[10]
+    if not flags & 0x80:
+        return None
+    table_length = 3 << ((flags & 7) + 1)
+    position = 13 + table_length
+    while gif[position] == 0x21:  # Skip extensions written by Pillow
+        position += 2
+        while gif[position]:
+            position += gif[position] + 1
+        position += 1
+    if gif[position] != 0x2C:
+        return None
+    local_palette = gif[13:13 + table_length]
+    if _palette_needed(local_palette) == grayscale:
+        return None
+    image_data = gif[position + 10:].rstrip(b";")
+
+    x0, y0, x1, y1 = box
+    packed_flags = (disposal << 2) | (1 if transparency is not None else 0)
+    control = b"!\xF9\x04" + struct.pack("<BHB", packed_flags, 0, transparency or 0) + b"\x00"
+    descriptor = b"," + struct.pack("<HHHHB", x0, y0, x1 - x0, y1 - y0, 0x80 | (flags & 7))
+    return control + descriptor + local_palette + image_data
+
+
+def _encode_canvas(canvas, transparency, disposal):
+    """
+    Encodes a canvas as GIF frames, so that Pillow decoding them as the first frames of a
+    GIF ends up with the same canvas and mode as after the original frames. A canvas with
+    more than 256 colors is split into tiles, one frame each.
+
+    Args:
+        canvas (PIL.Image.Image): The canvas, in mode 'RGB', 'RGBA' or 'L'.
+        transparency (int): The transparent gray level of an 'L' canvas, or None.
+        disposal (int): Disposal method the frames must leave in effect for the following
+                        frames, or None if they declare their own.
+
+    Returns:
+        tuple: (blocks, frame_count), or None if the canvas can't be stored.
+    """
+    pixels = np.asarray(canvas)
+    if canvas.mode == "L":
+        # Pillow keeps a grayscale canvas without a palette, the gray levels are the indices.
+        # A transparent first frame restoring the previous canvas would clear it.
+        allowed = (0, 1) if transparency is not None else (0, 1, DISPOSAL_PREVIOUS)
+        if disposal is not None and disposal not in allowed:
+            return None
+        block = _encode_tile(pixels, bytes(np.repeat(np.arange(256, dtype=np.uint8), 3)),
+                             (0, 0, canvas.width, canvas.height), transparency, disposal or 0, grayscale=True)
+        return None if block is None else (block, 1)
+    if canvas.mode not in ("RGB", "RGBA"):
+        return None
+
+    rgb = pixels[..., :3].astype(np.uint32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    hidden = None
+    if canvas.mode == "RGBA":
+        # Transparent pixels become the transparent palette entry, which needs a single color
+        alpha = pixels[..., 3]
+        if not np.isin(alpha, (0, 255)).all():
+            return None
+        hidden_colors = np.unique(packed[alpha == 0])
+        if len(hidden_colors) > 1:
+            return None
+        hidden = int(hidden_colors[0]) if len(hidden_colors) else 0
+        packed = np.where(alpha == 0, np.uint32(TRANSPARENT_COLOR), packed)
+
+    # The first frame of an RGBA canvas needs a transparent entry even without transparent pixels
+    tiles = _split_tiles(packed, 255 if hidden is not None else 256)
+    # A tile restoring the previous canvas would undo itself, unless it is the only one
+    allowed = (0, 1, DISPOSAL_PREVIOUS) if len(tiles) == 1 and hidden is None else (0, 1)
+    if disposal is not None and disposal not in allowed:
+        return None
+    blocks = []
+    for n, (x0, y0, x1, y1) in enumerate(tiles):
+        colors, indices = np.unique(packed[y0:y1, x0:x1], return_inverse=True)
+        tile_transparency = None
+        if hidden is not None and (n == 0 or colors[-1] == TRANSPARENT_COLOR):
+            if colors[-1] != TRANSPARENT_COLOR:
+                colors = np.append(colors, np.uint32(TRANSPARENT_COLOR))
+            tile_transparency = len(colors) - 1
+            colors = np.where(colors == TRANSPARENT_COLOR, np.uint32(hidden), colors)
+        palette = bytes(np.stack(((colors >> 16) & 255, (colors >> 8) & 255, colors & 255), axis=1)
+                        .astype(np.uint8).reshape(-1))
+        if not _palette_needed(palette) and len(colors) < 256:
+            palette += b"\xff\x00\x00"  # An unused color, so dark gray tiles stay color tiles
+        last = n == len(tiles) - 1
+        block = _encode_tile(indices.reshape(y1 - y0, x1 - x0).astype(np.uint8), palette, (x0, y0, x1, y1),
+                             tile_transparency, (disposal or 0) if last else 1)
+        if block is None:
+            return None
+        blocks.append(block)
+    return b"".join(blocks), len(blocks)
+
+
+class GifIndex:
+    """The frame positions, disposal state and checkpoints of a GIF, for random access to its frames."""
+
+    def __init__(self, width, height, header_length, data_end, frames, fingerprint=b"", checkpoints=None,
+                 path=None):
+        """
+        Args:
+            width (int): Logical screen width.
+            height (int): Logical screen height.
+            header_length (int): Length of the GIF header and global palette.
+            data_end (int): Offset after the last frame.
+            frames (list): (offset, x0, y0, x1, y1, disposal, flags, duration) for every frame.
+            fingerprint (bytes): source_fingerprint() of the GIF.
+            checkpoints (dict): Frame index -> (GIF frame count, encoded canvas), or
+                                (GIF frame count, offset, length) in the index file at path.
+            path (str): The index file the checkpoints are read from.
+        """
+        self.width = width
+        self.height = height
+        self.header_length = header_length
+        self.data_end = data_end
+        self.frames = frames
+        self.fingerprint = fingerprint
+        self.checkpoints = checkpoints or {}
+        self.path = path
+        self.keyframes = self._find_keyframes()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _can_seek(self):
+        """False if Pillow would grow the canvas for a frame outside of it (decode from frame 0 then)."""
+        return all(x1 <= self.width and y1 <= self.height for _, _, _, x1, y1, _, _, _ in self.frames)
+
+    def _find_keyframes(self):
+        """Returns, for every frame, the index of the last keyframe at or before it."""
+        keyframes = array('I', [0]) * len(self.frames)
+        # With a transparent first frame, Pillow keeps the canvas in RGBA, which a keyframe
+        # decoded as the first frame would not do, so only checkpoints are used then
+        if not self.frames or self.frames[0][6] & FLAG_TRANSPARENCY or not self._can_seek():
+            return keyframes
+        keyframe = 0
+        disposal_in_effect = 0
+        for n, (_, x0, y0, x1, y1, disposal, flags, _) in enumerate(self.frames):
+            # Pillow carries the last specified disposal method over to frames that don't specify one
+            if disposal:
+                disposal_in_effect = disposal
+            covers_canvas = (x0, y0, x1, y1) == (0, 0, self.width, self.height)
+            if (covers_canvas and not flags & (FLAG_TRANSPARENCY | FLAG_LOCAL_PALETTE)
+                    and disposal == disposal_in_effect and disposal != DISPOSAL_PREVIOUS):
+                keyframe = n
+            keyframes[n] = keyframe
+        return keyframes
+
+    def _create_checkpoints(self, gif_path):
+        """Decodes the GIF once and stores a checkpoint about every CHECKPOINT_INTERVAL frames."""
+        if not self._can_seek():
+            return
+        disposal_in_effect = 0
+        last_checkpoint = 0
+        with Image.open(gif_path) as im:
+            for n in range(1, len(self.frames)):
+                # The disposal method the frames before n leave in effect for frames that don't specify one
+                if self.frames[n - 1][5]:
+                    disposal_in_effect = self.frames[n - 1][5]
+                try:
+                    # Seeking loads frame n-1 and applies its disposal; frame n is not decoded yet,
+                    # so the image holds the canvas frame n is drawn on
+                    im.seek(n)
+                except (OSError, EOFError, ValueError):
+                    return
+                if n - max(last_checkpoint, self.keyframes[n]) < CHECKPOINT_INTERVAL:
+                    continue
+                canvas = Image.new(im.im.mode, im.im.size)
+                canvas.im = im.im.copy()
+                transparency = im.info.get("transparency") if canvas.mode == "L" else None
+                encoded = _encode_canvas(canvas, transparency, None if self.frames[n][5] else disposal_in_effect)
+                if encoded is not None:  # Otherwise try again with the next frame
+                    block, frame_count = encoded
+                    self.checkpoints[n] = (frame_count, block)
+                    last_checkpoint = n
+
+    def _checkpoint_block(self, frame):
+        """Returns the encoded canvas of a checkpoint and the number of GIF frames it consists of."""
+        checkpoint = self.checkpoints[frame]
+        if len(checkpoint) == 2:
+            return checkpoint[1], checkpoint[0]
+        frame_count, offset, length = checkpoint
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length), frame_count
+
+    def frame_duration(self, index):
+        """Returns the duration of a frame in milliseconds, or None if the GIF does not specify one."""
+        _, _, _, _, _, _, flags, duration = self.frames[index]
+        return duration if flags & FLAG_DURATION else None
+
+    def save(self, path):
+        """
+        Writes the index to a file.
+
+        Returns:
+            bool: True on success.
+        """
+        try:
+            frames = sorted(self.checkpoints)
+            blocks = []
+            offset = HEADER_SIZE + len(self.frames) * FRAME_SIZE + len(frames) * CHECKPOINT_SIZE
+            table = []
+            for frame in frames:
+                block, frame_count = self._checkpoint_block(frame)
+                table.append(struct.pack(CHECKPOINT_FORMAT, frame, frame_count, offset, len(block)))
+                blocks.append(block)
+                offset += len(block)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, self.width, self.height, len(self.frames),
+                                    len(frames), self.header_length, self.data_end, self.fingerprint))
+                f.write(b"".join(struct.pack(FRAME_FORMAT, *frame) for frame in self.frames))
+                f.write(b"".join(table))
+                f.write(b"".join(blocks))
+            return True
+        except (OSError, struct.error) as e:
+            print(f"Warning: Could not save the GIF frame index {path}: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index file. The checkpoints are only read when they are used.
+
+        Returns:
+            GifIndex: The index, or None if the file is missing or not a valid index.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER_SIZE)
+                if len(header) < HEADER_SIZE:
+                    return None
+                magic, version, width, height, frame_count, checkpoint_count, header_length, data_end, fingerprint = \
+                    struct.unpack(HEADER_FORMAT, header)
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    return None
+                tables = f.read(frame_count * FRAME_SIZE + checkpoint_count * CHECKPOINT_SIZE)
+        except OSError:
+            return None
+        if len(tables) != frame_count * FRAME_SIZE + checkpoint_count * CHECKPOINT_SIZE:
+            return None
+        frames = list(struct.iter_unpack(FRAME_FORMAT, tables[:frame_count * FRAME_SIZE]))
+        checkpoints = {frame: (tiles, offset, length) for frame, tiles, offset, length
+                       in struct.iter_unpack(CHECKPOINT_FORMAT, tables[frame_count * FRAME_SIZE:])}
+        return cls(width, height, header_length, data_end, frames, fingerprint, checkpoints, path)
+
+    @classmethod
+    def build(cls, gif_path):
+        """
+        Scans the block structure of a GIF file, then decodes it once for the checkpoints.
+
+        Returns:
+            GifIndex: The index of every complete frame.
+        """
+        with open(gif_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:3] != b"GIF" or len(data) < 13:
+                raise ValueError(f"{gif_path} is not a GIF file.")
+            width, height = struct.unpack_from("<HH", data, 6)
+            position = 13
+            if data[10] & 0x80:
+                position += 3 << ((data[10] & 7) + 1)  # Global palette
+            header_length = position
+
+            def skip_sub_blocks(position):
+                # Data sub-blocks: a length byte followed by that many bytes, up to a zero length
+                while position < len(data) and data[position]:
+                    position += data[position] + 1
+                return position + 1
+
+            frames = []
+            frame_start = position
+            disposal = flags = duration = 0
+            while position < len(data):
+                introducer = data[position]
+                if introducer == 0x21:  # Extension
+                    label = data[position + 1] if position + 1 < len(data) else 0
+                    position += 2
+                    if label == 0xF9 and position + 4 < len(data) and data[position] >= 4:
+                        # Graphic control extension: packed flags, delay in 1/100 s, transparent color
+                        packed = data[position + 1]
+                        if packed & 0x1C:
+                            disposal = (packed & 0x1C) >> 2
+                        if packed & 1:
+                            flags |= FLAG_TRANSPARENCY
+                        else:
+                            flags &= ~FLAG_TRANSPARENCY
+                        flags |= FLAG_DURATION
+                        duration = min(struct.unpack_from("<H", data, position + 2)[0] * 10, 0xFFFF)
+                    position = skip_sub_blocks(position)
+                elif introducer == 0x2C:  # Image descriptor
+                    if position + 10 > len(data):
+                        break
+                    x0, y0, w, h, packed = struct.unpack_from("<HHHHB", data, position + 1)
+                    position += 10
+                    if packed & 0x80:
+                        position += 3 << ((packed & 7) + 1)  # Local palette
+                        flags |= FLAG_LOCAL_PALETTE
+                    position = skip_sub_blocks(position + 1)  # LZW code size, then the image data
+                    if position > len(data):
+                        break  # Truncated image data
+                    frames.append((frame_start, x0, y0, x0 + w, y0 + h, disposal, flags, duration))
+                    frame_start = position
+                    disposal = flags = duration = 0
+                elif introducer == 0x3B:  # Trailer
+                    break
+                else:
+                    position += 1  # Stray byte, skipped like Pillow does
+        gif_index = cls(width, height, header_length, frame_start, frames, source_fingerprint([gif_path]))
+        gif_index._create_checkpoints(gif_path)
+        return gif_index
+
+    def iterate_frames(self, gif_path, start, end):
+        """
+        Decodes the frames in the range [start, end), starting from the last checkpoint or
+        keyframe at or before start instead of the first frame.
+
+        Args:
+            gif_path (str): Path of the GIF file the index was built from.
+            start (int): First frame index (inclusive).
+            end (int): Last frame index (exclusive).
+
+        Yields:
+            tuple: (index, image, duration). The image is only valid until the next frame is read.
+        """
+        start = max(start, 0)
+        end = min(end, len(self.frames))
+        if start >= end:
+            return
+        first = self.keyframes[start]
+        checkpoint = max((frame for frame in self.checkpoints if first < frame <= start), default=None)
+        data_end = self.frames[end][0] if end < len(self.frames) else self.data_end
+        with open(gif_path, "rb") as f:
+            if checkpoint is None:
+                stream = _SplicedFile(f, self.header_length, b"", self.frames[first][0], data_end)
+            else:
+                # The frames of the stored canvas come first, then the checkpoint frame
+                block, frame_count = self._checkpoint_block(checkpoint)
+                first = checkpoint - frame_count
+                stream = _SplicedFile(f, self.header_length, block, self.frames[checkpoint][0], data_end)
+            with Image.open(stream) as im:
+                for n in range(first, end):
+                    if n > first:
+                        im.seek(n - first)
+                    if n < start:
+                        continue
+                    frame = im
+                    if n == first and n > 0 and im.mode == "P":
+                        # Pillow switches to RGB after the first frame, the keyframe is the first frame here
+                        frame = im.convert("RGB")
+                    yield n, frame, self.frame_duration(n)
+
+
+class _SplicedFile:
+    """
+    A read-only file that consists of the GIF header and palette, an optional checkpoint
+    frame, one range of the GIF's frames and the trailer, read from the original file
+    without copying it.
+    """
+
+    def __init__(self, f, header_length, checkpoint_block, body_start, body_end):
+        f.seek(0)
+        self._file = f
+        self._head = f.read(header_length) + checkpoint_block
+        self._body_start = body_start
+        self._body_length = body_end - body_start
+        self._trailer = b";"
+        self._size = len(self._head) + self._body_length + len(self._trailer)
+        self._position = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._size - self._position
+        chunks = []
+        while size > 0 and self._position < self._size:
+            body_position = self._position - len(self._head)
+            if body_position < 0:
+                chunk = self._head[self._position:self._position + size]
+            elif body_position < self._body_length:
+                self._file.seek(self._body_start + body_position)
+                chunk = self._file.read(min(size, self._body_length - body_position))
+                if not chunk:
+                    break
+            else:
+                trailer_position = body_position - self._body_length
+                chunk = self._trailer[trailer_position:trailer_position + size]
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+# --- Helper Functions ---
+def load_gif_index(gif_path, index_path):
+    """
+    Loads the frame index of a GIF, or builds and saves it if it is missing or the GIF changed.
+
+    Args:
+        gif_path (str): Path of the GIF file.
+        index_path (str): Path of the index file (see index_path_for()).
+
+    Returns:
+        GifIndex: The index, or None if the GIF could not be scanned.
+    """
+    gif_index = GifIndex.load(index_path)
+    if gif_index is not None and gif_index.fingerprint == source_fingerprint([gif_path]):
+        return gif_index
+    print(f"Indexing the frames of {gif_path}...")
+    try:
+        gif_index = GifIndex.build(gif_path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Warning: Could not index the frames of {gif_path}: {e}")
+        return None
+    gif_index.save(index_path)
+    return gif_index
+
+
+def index_path_for(script_file_path):
+    """Returns the path of the frame index stored next to a script file."""
+    return os.path.splitext(script_file_path)[0] + INDEX_EXTENSION
+
+
+def iterate_gif_frames(gif_path, start, end, gif_index=None):
+    """
+    Yields the frames of a GIF in the range [start, end), with random access through
+    the frame index if there is one, otherwise by decoding from the first frame.
+
+    Yields:
+        tuple: (index, image, duration in milliseconds or None).
+    """
+    # The index reproduces Pillow's default way of combining frames
+    if gif_index is not None and GifImagePlugin.LOADING_STRATEGY == GifImagePlugin.LoadingStrategy.RGB_AFTER_FIRST:
+        yield from gif_index.iterate_frames(gif_path, start, end)
+        return
+    with Image.open(gif_path) as im:
+        for n in range(start, min(end, getattr(im, 'n_frames', 1))):
+            im.seek(n)
+            yield n, im, im.info.get('duration')
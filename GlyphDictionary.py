@@ -0,0 +1,175 @@
+import numpy as np
+
+from SerialProtocol import (FrameEncoder, ENCODING_DELTA, FRAME_CHARS, CHAR_ROWS, GLYPH_CELLS, GLYPH_CODE_BLANK,
+                            GLYPH_CODE_FULL, encode_glyph_frame)
+
+# --- Glyph Dictionary ---
+# The LCD has only 8 custom characters (CGRAM), but 32 character cells. To fill the whole
+# 16x2 display (80x16 pixels), every frame is split into its 32 cells of 5x8 pixels, and the
+# cells are drawn with a small dictionary of glyphs: the 8 custom characters, chosen for this
+# frame, plus the blank and full block of the character ROM, which cost nothing to use.
+#
+# A frame with at most 8 distinct cell patterns (besides blank and full) is shown exactly.
+# Otherwise the 8 glyphs are picked greedily, each one reducing the number of wrong pixels
+# the most, and then refined by a majority vote of the cells drawn with them (a k-means step
+# in Hamming distance). Glyphs that are already in CGRAM are preferred when they are nearly
+# as good, and keep their slot, so only new glyphs (and only their changed rows) are sent.
+
+# --- Constants ---
+CHAR_WIDTH_PX = 5
+FULL_ROW = (1 << CHAR_WIDTH_PX) - 1  # A row with all 5 pixels set
+# A glyph already in CGRAM is chosen over a new one unless the new one saves more wrong pixels
+RESIDENT_GLYPH_BONUS_PIXELS = 2
+# Majority vote rounds that refine the chosen glyphs when a frame has too many distinct cells
+REFINE_ITERATIONS = 2
+
+# Pixel column shifts within a row byte (leftmost pixel is bit 4)
+_BIT_SHIFTS = np.arange(CHAR_WIDTH_PX - 1, -1, -1, dtype=np.uint8)
+# Glyphs of the ROM characters, in the order of their codes
+_ROM_GLYPHS = np.array([[0] * CHAR_ROWS, [FULL_ROW] * CHAR_ROWS], dtype=np.uint8)
+_ROM_CODES = (GLYPH_CODE_BLANK, GLYPH_CODE_FULL)
+
+
+# --- Helper Functions ---
+def _to_bits(glyphs):
+    """Unpacks (N, 8) row bytes into (N, 40) pixel bits."""
+    return ((glyphs[:, :, None] >> _BIT_SHIFTS) & 1).reshape(len(glyphs), -1).astype(np.int32)
+
+
+def _from_bits(bits):
+    """Packs (N, 40) pixel bits into (N, 8) row bytes."""
+    return (bits.reshape(len(bits), CHAR_ROWS, CHAR_WIDTH_PX) << _BIT_SHIFTS).sum(axis=2).astype(np.uint8)
+
+
+def _distances(a_bits, b_bits):
+    """Returns the matrix of Hamming distances (differing pixels) between two sets of glyphs."""
+    return a_bits @ (1 - b_bits).T + (1 - a_bits) @ b_bits.T
+
+
+def select_glyphs(cells, resident=None):
+    """
+    Chooses the custom characters and the glyph of every cell for one frame.
+
+    Args:
+        cells (numpy.ndarray): (32, 8) uint8 rows of the 32 character cells.
+        resident (numpy.ndarray): (8, 8) uint8 custom characters currently in CGRAM,
+                                  or None if unknown (every character is sent again).
+
+    Returns:
+        tuple: (glyphs, cell_map, error_pixels). glyphs is the 64 bytes of the new custom
+               characters, cell_map the code of each cell (0-7, GLYPH_CODE_BLANK or
+               GLYPH_CODE_FULL) and error_pixels the number of pixels drawn wrong.
+    """
+    # The 8 rows of a cell read as one 64-bit number, so distinct cells are found with a flat np.unique()
+    cells = np.ascontiguousarray(cells, dtype=np.uint8)
+    _, first, inverse, counts = np.unique(cells.view(np.uint64).reshape(-1), return_index=True,
+                                          return_inverse=True, return_counts=True)
+    patterns = cells[first]
+    pattern_bits = _to_bits(patterns)
+    rom_bits = _to_bits(_ROM_GLYPHS)
+    error = _distances(pattern_bits, rom_bits).min(axis=1)
+
+    # Candidates: every distinct cell, and the characters already in CGRAM
+    candidates = patterns
+    is_resident = np.zeros(len(patterns), dtype=bool)
+    if resident is not None:
+        candidates = np.concatenate((patterns, resident))
+        is_resident = np.concatenate((is_resident, np.ones(len(resident), dtype=bool)))
+    candidate_bits = _to_bits(candidates)
+    distances = _distances(pattern_bits, candidate_bits)
+
+    # Greedy selection: add the glyph that removes the most wrong pixels, up to 8 glyphs
+    chosen = []
+    for _ in range(FRAME_CHARS):
+        gain = (counts[:, None] * np.maximum(error[:, None] - distances, 0)).sum(axis=0)
+        gain = np.where(gain > 0, gain + RESIDENT_GLYPH_BONUS_PIXELS * is_resident, 0)
+        gain[chosen] = 0
+        best = int(gain.argmax())
+        if gain[best] <= 0:
+            break  # Every cell is already drawn exactly
+        chosen.append(best)
+        error = np.minimum(error, distances[:, best])
+    chosen_bits = candidate_bits[chosen]
+    chosen_resident = is_resident[chosen]
+
+    # Refine the new glyphs: each one becomes the majority of the cells drawn with it
+    for _ in range(REFINE_ITERATIONS if error.any() else 0):
+        dictionary_bits = np.concatenate((rom_bits, chosen_bits))
+        nearest = _distances(pattern_bits, dictionary_bits).argmin(axis=1) - len(rom_bits)
+        for n in range(len(chosen_bits)):
+            members = nearest == n
+            if chosen_resident[n] or not members.any():
+                continue
+            weights = counts[members]
+            votes = (pattern_bits[members] * weights[:, None]).sum(axis=0)
+            chosen_bits[n] = (2 * votes >= weights.sum()).astype(np.int32)
+
+    # Keep the glyphs that are already in CGRAM in their slots, put new glyphs into the
+    # slots of characters that are no longer needed, preferring slots with similar rows
+    slots = resident.copy() if resident is not None else np.zeros((FRAME_CHARS, CHAR_ROWS), dtype=np.uint8)
+    taken = np.zeros(FRAME_CHARS, dtype=bool)
+    new_glyphs = []
+    for glyph in _from_bits(chosen_bits):
+        matches = np.flatnonzero((slots == glyph).all(axis=1) & ~taken) if resident is not None else ()
+        if len(matches):
+            taken[matches[0]] = True
+        else:
+            new_glyphs.append(glyph)
+    for glyph in new_glyphs:
+        changed_rows = np.where(taken, CHAR_ROWS + 1, (slots != glyph).sum(axis=1))
+        slot = int(changed_rows.argmin())
+        slots[slot] = glyph
+        taken[slot] = True
+
+    # Draw every cell with its nearest glyph; unused slots still hold usable glyphs
+    dictionary_bits = np.concatenate((rom_bits, _to_bits(slots)))
+    codes = np.array(_ROM_CODES + tuple(range(FRAME_CHARS)), dtype=np.uint8)
+    pattern_distances = _distances(pattern_bits, dictionary_bits)
+    nearest = pattern_distances.argmin(axis=1)
+    cell_map = codes[nearest][inverse]
+    error_pixels = int((pattern_distances.min(axis=1) * counts).sum())
+    return slots.tobytes(), cell_map.tolist(), error_pixels
+
+
+class GlyphEncoder(FrameEncoder):
+    """
+    Encodes full display frames (32 cells of 8 rows, see LAYOUT_FULL in ImageToDigit.py)
+    as glyph frames, keeping track of the custom characters in the Arduino's CGRAM.
+    """
+
+    def __init__(self, encoding=ENCODING_DELTA, keyframe_interval=0):
+        """
+        Args:
+            encoding (str): ENCODING_DELTA to reuse the custom characters in CGRAM and send only
+                            changed rows, or ENCODING_FULL to send every frame self-contained.
+            keyframe_interval (int): Send a self-contained frame every N frames in delta mode
+                                     (0 = only when required).
+        """
+        super().__init__(encoding, keyframe_interval)
+        self.error_pixels = 0  # Pixels drawn wrong because a frame needed more than 8 glyphs
+
+    def encode(self, frame):
+        """
+        Encodes a frame for sending and records its custom characters as the Arduino's new state.
+
+        Args:
+            frame (bytes): The 256 bytes of the 32 character cells.
+
+        Returns:
+            bytes: The glyph frame payload, to be wrapped with frame_packet().
+        """
+        previous = None
+        if (self.encoding == ENCODING_DELTA and self.previous is not None
+                and (self.keyframe_interval <= 0 or self.frames_since_keyframe < self.keyframe_interval)):
+            previous = self.previous
+        cells = np.frombuffer(bytes(frame), dtype=np.uint8).reshape(GLYPH_CELLS, CHAR_ROWS)
+        resident = None if previous is None else np.frombuffer(previous, dtype=np.uint8).reshape(FRAME_CHARS, CHAR_ROWS)
+        glyphs, cell_map, error_pixels = select_glyphs(cells, resident)
+        self.error_pixels += error_pixels
+
+        if previous is None:
+            self.frames_since_keyframe = 0
+        else:
+            self.frames_since_keyframe += 1
+        self.previous = glyphs
+        return encode_glyph_frame(glyphs, cell_map, previous, self.packed_rows)
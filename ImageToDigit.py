@@ -1,11 +1,14 @@
 import os
 import sys
-from time import sleep
+from itertools import groupby
 # No longer need Iterable import with the new mean calculation
 # from collections.abc import Iterable
 
+import numpy as np
 from PIL import Image
 
+from GifIndex import GifIndex, iterate_gif_frames
+
 # No longer need ImageStat for this approach
 # from PIL import ImageStat
 
@@ -35,6 +38,59 @@ TOTAL_CHARS = CHARS_HORIZONTAL * CHARS_VERTICAL  # Should be 8
 # Total number of bytes required for all custom characters (8 bytes per character)
 TOTAL_BYTES_PER_FRAME = TOTAL_CHARS * CHAR_HEIGHT_PX  # Should be 64
 
+# Total number of pixels in the target LCD area
+TOTAL_PIXELS = LCD_WIDTH_PX * LCD_HEIGHT_PX  # Should be 320
+
+# Display layouts (DISPLAY_LAYOUT in main.py)
+# "block": the 20x16 pixel area of the 8 custom characters, 64 bytes per frame
+# "full": the whole 16x2 display (80x16 pixels), 8 rows for each of the 32 character
+#         cells, 256 bytes per frame (sent with the glyph dictionary, see GlyphDictionary.py)
+LAYOUT_BLOCK = "block"
+LAYOUT_FULL = "full"
+FULL_WIDTH_PX = 80
+FULL_CHARS_HORIZONTAL = FULL_WIDTH_PX // CHAR_WIDTH_PX  # Should be 16
+FULL_TOTAL_CHARS = FULL_CHARS_HORIZONTAL * CHARS_VERTICAL  # Should be 32
+FULL_BYTES_PER_FRAME = FULL_TOTAL_CHARS * CHAR_HEIGHT_PX  # Should be 256
+# Pixel size of each layout
+LAYOUT_SIZES = {LAYOUT_BLOCK: (LCD_WIDTH_PX, LCD_HEIGHT_PX), LAYOUT_FULL: (FULL_WIDTH_PX, LCD_HEIGHT_PX)}
+# Bytes per converted frame of each layout
+LAYOUT_FRAME_BYTES = {LAYOUT_BLOCK: TOTAL_BYTES_PER_FRAME, LAYOUT_FULL: FULL_BYTES_PER_FRAME}
+
+# --- Reduced-Resolution Decoding ---
+# Source images are usually far larger than the 20x16 (or 80x16) pixels that are shown, and
+# decoding and resampling every source pixel dominates the conversion time of large frames.
+# With fast_decode, JPEG images are decoded directly at 1/2 to 1/8 of their size by the JPEG
+# decoder (draft mode, grayscale only), other images are converted to grayscale before they
+# are resized, and the resize first shrinks the image by an integer factor with reduce()
+# (box averaging) before the final bicubic resampling. The final resampling still sees at
+# least FAST_DECODE_REDUCING_GAP times the target size, which keeps every gray level within
+# a few steps of the full-size conversion (benchmark.py "decode" measures the difference).
+# Palette and bilevel images are resized exactly as before (nearest neighbour).
+FAST_DECODE_REDUCING_GAP = 3.0
+# Modes that are resampled in grayscale; other modes (P, 1, RGBA, ...) keep the exact path
+FAST_DECODE_MODES = ("L", "RGB")
+
+
+# --- Batch Conversion Tables ---
+def _char_gather_index(width_px, chars_horizontal, total_chars):
+    """
+    Flat pixel index (into a row-major frame of the given width) for every bit of every output byte.
+    Shape is (total_chars * 8, 5): byte n = character n // 8, row n % 8; column 0 is the leftmost pixel.
+    """
+    char_index = np.arange(total_chars).repeat(CHAR_HEIGHT_PX)
+    row_in_char = np.tile(np.arange(CHAR_HEIGHT_PX), total_chars)
+    global_y = (char_index // chars_horizontal) * CHAR_HEIGHT_PX + row_in_char
+    global_x = (char_index % chars_horizontal) * CHAR_WIDTH_PX
+    return (global_y[:, None] * width_px + global_x[:, None] + np.arange(CHAR_WIDTH_PX)).astype(np.intp)
+
+
+CHAR_GATHER_INDEX = _char_gather_index(LCD_WIDTH_PX, CHARS_HORIZONTAL, TOTAL_CHARS)  # Shape (64, 5)
+FULL_CHAR_GATHER_INDEX = _char_gather_index(FULL_WIDTH_PX, FULL_CHARS_HORIZONTAL, FULL_TOTAL_CHARS)  # Shape (256, 5)
+LAYOUT_GATHER_INDEX = {LAYOUT_BLOCK: CHAR_GATHER_INDEX, LAYOUT_FULL: FULL_CHAR_GATHER_INDEX}
+
+# Bit weight of each pixel column within a row byte (leftmost pixel is bit 4)
+BIT_WEIGHTS = (1 << np.arange(CHAR_WIDTH_PX - 1, -1, -1)).astype(np.uint8)
+
 
 # --- Helper Function ---
 def calculate_mean_grayscale(pixels):
@@ -52,8 +108,105 @@ def calculate_mean_grayscale(pixels):
     return int(sum(pixels) / len(pixels))
 
 
+def render_pixels(pixels_binary, width, height, white=WHITE):
+    """
+    Renders a binarized frame as ANSI colored text, ready to be written to the console at once.
+
+    Args:
+        pixels_binary: The row-major pixel values (black or white).
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        white (int): Value of white pixels.
+
+    Returns:
+        str: The escape sequences and spaces that draw the frame from the top left corner.
+    """
+    # Use ANSI escape codes for clearing and positioning cursor
+    parts = ["\033[0J\033[H"]  # Clear screen and move cursor to home
+    for y in range(height):
+        parts.append("\033[0K")  # Clear line from cursor to end
+        row = pixels_binary[y * width:(y + 1) * width]
+        # One color code for each run of equal pixels
+        for is_white, run in groupby(pixel == white for pixel in row):
+            parts.append('\033[37;47m' if is_white else '\033[30;40m')
+            parts.append(' ' * sum(1 for _ in run))
+        parts.append('\033[m\n')  # Reset colors and move to the next line
+    return "".join(parts)
+
+
+def print_pixels(pixels_binary, width, height, white=WHITE):
+    """
+    Draws a binarized frame in the console with ANSI colors, in a single write.
+
+    Args:
+        pixels_binary: The row-major pixel values (black or white).
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        white (int): Value of white pixels.
+    """
+    sys.stdout.write(render_pixels(pixels_binary, width, height, white))
+    sys.stdout.flush()  # Ensure output is displayed
+
+
+def frame_to_pixels(frame_bytes, layout=LAYOUT_BLOCK):
+    """
+    Unpacks the character rows of a converted frame back into row-major pixels.
+
+    Args:
+        frame_bytes: The bytes of the frame (LAYOUT_FRAME_BYTES[layout]).
+        layout (str): LAYOUT_BLOCK or LAYOUT_FULL.
+
+    Returns:
+        list: The pixel values (the bits of the rows, so black or white), row by row.
+    """
+    rows = np.frombuffer(bytes(frame_bytes), dtype=np.uint8)
+    bits = (rows[:, None] >> (CHAR_WIDTH_PX - 1 - np.arange(CHAR_WIDTH_PX))) & 1
+    pixels = np.zeros(LAYOUT_GATHER_INDEX[layout].size, dtype=np.uint8)
+    pixels[LAYOUT_GATHER_INDEX[layout].reshape(-1)] = bits.reshape(-1)
+    return pixels.tolist()
+
+
+def draft_image(img, layout=LAYOUT_BLOCK):
+    """
+    Asks the decoder of a not yet loaded JPEG image to decode it in grayscale at the
+    smallest scale that is still large enough for the layout. Does nothing for other
+    formats or images that are already loaded.
+
+    Args:
+        img (PIL.Image.Image): The freshly opened image.
+        layout (str): LAYOUT_BLOCK or LAYOUT_FULL.
+    """
+    if img.mode in FAST_DECODE_MODES:
+        _draft(img, LAYOUT_SIZES[layout])
+
+
+def _draft(img, size):
+    """Requests grayscale JPEG decoding at no less than FAST_DECODE_REDUCING_GAP times the size."""
+    img.draft('L', (int(size[0] * FAST_DECODE_REDUCING_GAP), int(size[1] * FAST_DECODE_REDUCING_GAP)))
+
+
+def resize_to_grayscale(img, size, fast_decode=False):
+    """
+    Resizes an image to the target size and converts it to grayscale ('L').
+
+    Args:
+        img (PIL.Image.Image): The input image object.
+        size (tuple): Target (width, height) in pixels.
+        fast_decode (bool): Use reduced-resolution decoding (see FAST_DECODE_REDUCING_GAP).
+                            Otherwise the image is resized first, then converted to 'L'.
+
+    Returns:
+        PIL.Image.Image: The resized grayscale image.
+    """
+    if not fast_decode or img.mode not in FAST_DECODE_MODES:
+        return img.resize(size).convert('L')
+    _draft(img, size)  # Only has an effect if the image is a JPEG that is not loaded yet
+    return img.convert('L').resize(size, Image.Resampling.BICUBIC, reducing_gap=FAST_DECODE_REDUCING_GAP)
+
+
 # --- Main Conversion Function ---
-def image_to_lcd_bytes(img, printout=False, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK):
+def image_to_lcd_bytes(img, printout=False, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK,
+                       fast_decode=False):
     """
     Resizes an image to the target LCD dimensions (20x16), converts it to
     black and white using a threshold, and generates a list of 64 bytes
@@ -68,17 +221,16 @@ def image_to_lcd_bytes(img, printout=False, black=BLACK, white=WHITE, color_chec
         color_check (int): Threshold for determining black/white pixels (0-255).
                            Use -1 for automatic threshold calculation based on
                            the mean intensity of the resized grayscale image.
+        fast_decode (bool): Use reduced-resolution decoding for large images.
 
     Returns:
         list: A list of 64 integers (bytes) representing the custom character data,
               or None if an error occurs during processing.
     """
     try:
-        # Resize the image to the target LCD dimensions
-        img_resized = img.resize((LCD_WIDTH_PX, LCD_HEIGHT_PX))
-
-        # Convert image to grayscale for consistent thresholding
-        img_gray = img_resized.convert('L')
+        # Resize the image to the target LCD dimensions and convert it to grayscale
+        # for consistent thresholding
+        img_gray = resize_to_grayscale(img, (LCD_WIDTH_PX, LCD_HEIGHT_PX), fast_decode)
 
         # Get pixel data from the grayscale image
         pixels_gray = list(img_gray.getdata())
@@ -96,20 +248,7 @@ def image_to_lcd_bytes(img, printout=False, black=BLACK, white=WHITE, color_chec
 
         # --- Console Printout (Optional) ---
         if printout:
-            # Use ANSI escape codes for clearing and positioning cursor
-            sys.stdout.write("\033[0J\033[H")  # Clear screen and move cursor to home
-            for y in range(LCD_HEIGHT_PX):
-                sys.stdout.write("\033[0K")  # Clear line from cursor to end
-                for x in range(LCD_WIDTH_PX):
-                    # Use ANSI escape codes for colored output
-                    pixel_index = y * LCD_WIDTH_PX + x
-                    color_code = f'\033[37;47m ' if pixels_binary[pixel_index] == white else f'\033[30;40m '
-                    sys.stdout.write(color_code)
-                    sys.stdout.write(f'\033[m')  # Reset colors
-                sys.stdout.write('\n')  # Move to the next line
-                if y == LCD_HEIGHT_PX - 1:
-                    sleep(1 / 144)  # Small delay for visualization (adjust if needed)
-            sys.stdout.flush()  # Ensure output is displayed
+            print_pixels(pixels_binary, LCD_WIDTH_PX, LCD_HEIGHT_PX, white)
 
         # --- Generate LCD Custom Character Bytes ---
         # List to hold all 64 bytes for the 8 custom characters
@@ -159,10 +298,251 @@ def image_to_lcd_bytes(img, printout=False, black=BLACK, white=WHITE, color_chec
         return None
 
 
+# --- Batch Conversion ---
+def image_to_grayscale_array(img, layout=LAYOUT_BLOCK, fast_decode=False):
+    """
+    Resizes and converts one image to a flat grayscale array, following the
+    same steps as image_to_lcd_bytes.
+
+    Args:
+        img (PIL.Image.Image): The input image object.
+        layout (str): LAYOUT_BLOCK (20x16 pixels) or LAYOUT_FULL (80x16 pixels).
+        fast_decode (bool): Use reduced-resolution decoding for large images.
+
+    Returns:
+        numpy.ndarray: A (320,) or (1280,) uint8 array of grayscale pixels.
+    """
+    return np.asarray(resize_to_grayscale(img, LAYOUT_SIZES[layout], fast_decode), dtype=np.uint8).reshape(-1)
+
+
+def images_to_grayscale_array(images, layout=LAYOUT_BLOCK, fast_decode=False):
+    """
+    Resizes and converts a sequence of images to a stacked grayscale array.
+
+    Args:
+        images (iterable): PIL.Image.Image objects.
+        layout (str): LAYOUT_BLOCK or LAYOUT_FULL.
+        fast_decode (bool): Use reduced-resolution decoding for large images.
+
+    Returns:
+        numpy.ndarray: An (N, pixels) uint8 array of grayscale pixels.
+    """
+    gray_frames = [image_to_grayscale_array(img, layout, fast_decode) for img in images]
+    if not gray_frames:
+        width, height = LAYOUT_SIZES[layout]
+        return np.empty((0, width * height), dtype=np.uint8)
+    return np.stack(gray_frames)
+
+
+def convert_batch(frames, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK, layout=LAYOUT_BLOCK,
+                  fast_decode=False):
+    """
+    Converts a stack of frames to LCD custom character bytes in one vectorized pass.
+    The output is byte-for-byte identical to calling convert() on each frame.
+
+    Args:
+        frames: Either a sequence of PIL.Image.Image objects, or a uint8 grayscale
+                array of shape (N, 16, 20) or (N, 320) already at LCD resolution
+                ((N, 16, 80) or (N, 1280) for LAYOUT_FULL).
+        black (int): Value for black pixels in the output byte data (0 or 1).
+        white (int): Value for white pixels in the output byte data (0 or 1).
+        color_check (int): Threshold for determining black/white pixels (0-255).
+                           Use -1 for a per-frame automatic threshold (mean intensity).
+                           A sequence of N thresholds binarizes every frame at its own
+                           threshold (see ThresholdAnalysis.py).
+        layout (str): LAYOUT_BLOCK (8 custom characters) or LAYOUT_FULL (32 character cells).
+        fast_decode (bool): Use reduced-resolution decoding for PIL images.
+
+    Returns:
+        numpy.ndarray: A contiguous (N, 64) uint8 array with one row of CGRAM bytes
+                       per frame ((N, 256) for LAYOUT_FULL), or None if an error
+                       occurs during processing.
+    """
+    try:
+        if black not in (0, 1) or white not in (0, 1):
+            print(f"Error: black/white pixel values must be 0 or 1, got {black}/{white}.")
+            return None
+
+        if layout not in LAYOUT_SIZES:
+            print(f"Error: Unknown display layout '{layout}'.")
+            return None
+        width, height = LAYOUT_SIZES[layout]
+        total_pixels = width * height
+        if isinstance(frames, np.ndarray):
+            pixels_gray = frames.reshape(len(frames), -1)
+        else:
+            pixels_gray = images_to_grayscale_array(frames, layout, fast_decode)
+        if pixels_gray.shape[1] != total_pixels:
+            print(f"Error: Expected {total_pixels} pixels per frame, got {pixels_gray.shape[1]}.")
+            return None
+
+        # Determine the threshold for binarization, one per frame
+        if np.ndim(color_check) > 0:
+            thresholds = np.asarray(color_check, dtype=np.int64).reshape(-1)
+            if len(thresholds) != len(pixels_gray):
+                print(f"Error: Expected {len(pixels_gray)} thresholds, got {len(thresholds)}.")
+                return None
+        elif color_check == -1:
+            # Integer floor of the mean matches int(sum / len) in calculate_mean_grayscale
+            thresholds = pixels_gray.sum(axis=1, dtype=np.int64) // total_pixels
+        else:
+            thresholds = np.full(len(pixels_gray), color_check, dtype=np.int64)
+
+        # Pixels >= threshold become white, pixels < threshold become black
+        is_white = pixels_gray >= thresholds[:, None]
+        pixels_binary = np.where(is_white, np.uint8(white), np.uint8(black))
+
+        # Gather the 5 pixels of every character row, then pack them with bit weights
+        row_pixels = pixels_binary[:, LAYOUT_GATHER_INDEX[layout]]  # Shape (N, 64, 5) or (N, 256, 5)
+        return np.ascontiguousarray((row_pixels * BIT_WEIGHTS).sum(axis=2, dtype=np.uint8))
+
+    except Exception as e:
+        print(f"An error occurred during batch image processing: {e}")
+        return None
+
+
+# --- Parallel Ingest Workers ---
+# These functions are run inside worker processes, so they only take picklable
+# arguments (paths and numbers) and return plain bytes objects.
+def convert_gray_frames(gray_frames, black, white, color_check, layout=LAYOUT_BLOCK):
+    """
+    Converts a list of grayscale arrays (None for failed frames) to a list of bytes (or None).
+    color_check is a single threshold, or a list with the threshold of each frame.
+    """
+    results = [None] * len(gray_frames)
+    valid = [n for n, gray in enumerate(gray_frames) if gray is not None]
+    if valid:
+        if np.ndim(color_check) > 0:
+            color_check = np.asarray(color_check)[valid]
+        frame_bytes = convert_batch(np.stack([gray_frames[n] for n in valid]), black, white, color_check, layout)
+        if frame_bytes is not None:
+            for n, row in zip(valid, frame_bytes):
+                results[n] = row.tobytes()
+    return results
+
+
+def grayscale_image_files(image_paths, layout=LAYOUT_BLOCK, fast_decode=False):
+    """
+    Opens a chunk of image files and resizes them to grayscale arrays, without binarizing them.
+
+    Args:
+        image_paths (list): Paths of the image files, in frame order.
+        layout, fast_decode: Same as for convert().
+
+    Returns:
+        list: One entry per path, either the grayscale array (see image_to_grayscale_array())
+              or None if the image could not be read.
+    """
+    gray_frames = []
+    for path in image_paths:
+        try:
+            with Image.open(path) as img:
+                gray_frames.append(image_to_grayscale_array(img, layout, fast_decode))
+        except Exception as e:
+            print(f"Warning: Could not read image {path}: {e}")
+            gray_frames.append(None)
+    return gray_frames
+
+
+def convert_image_files(image_paths, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK, layout=LAYOUT_BLOCK,
+                        fast_decode=False):
+    """
+    Opens and converts a chunk of image files.
+
+    Args:
+        image_paths (list): Paths of the image files, in frame order.
+        black, white, color_check, layout, fast_decode: Same as for convert(). color_check
+                                                        may also list the threshold of each frame.
+
+    Returns:
+        list: One entry per path, either the frame bytes or None if the
+              frame could not be processed.
+    """
+    gray_frames = grayscale_image_files(image_paths, layout, fast_decode)
+    return convert_gray_frames(gray_frames, black, white, color_check, layout)
+
+
+def grayscale_gif_frames(gif_path, start, end, layout=LAYOUT_BLOCK, fast_decode=False, index_path=None):
+    """
+    Opens a GIF and resizes the frames in the range [start, end) to grayscale arrays,
+    without binarizing them.
+
+    Args:
+        gif_path, start, end, layout, fast_decode, index_path: Same as for convert_gif_frames().
+
+    Returns:
+        tuple: (gray_frames, durations). gray_frames has one entry per frame, either the
+               grayscale array or None if the frame could not be read. Decoding stops at
+               the first frame that can't be decoded, and the frames after it are None too.
+               durations is the same as for convert_gif_frames().
+    """
+    gray_frames = []
+    durations = []
+    gif_index = GifIndex.load(index_path) if index_path else None
+    frames = iterate_gif_frames(gif_path, start, end, gif_index)
+    for i in range(start, end):
+        try:
+            _, frame, duration = next(frames)
+        except StopIteration:
+            print(f"Warning: {gif_path} has no frames from frame {i} on.")
+            break
+        except Exception as e:
+            # The frame iterator ends with the error, so the rest of the range can't be read
+            print(f"Warning: Could not read GIF frames {i} to {end - 1}: {e}")
+            break
+        try:
+            gray_frames.append(image_to_grayscale_array(frame, layout, fast_decode))
+            durations.append(duration)
+        except Exception as e:
+            print(f"Warning: Could not convert GIF frame {i}: {e}")
+            gray_frames.append(None)
+            durations.append(None)
+    unread = end - start - len(gray_frames)
+    gray_frames.extend([None] * unread)
+    durations.extend([None] * unread)
+    return gray_frames, durations
+
+
+def convert_gif_frames(gif_path, start, end, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK,
+                       layout=LAYOUT_BLOCK, fast_decode=False, index_path=None):
+    """
+    Opens a GIF and converts the frames in the range [start, end).
+
+    Args:
+        gif_path (str): Path of the GIF file.
+        start (int): First frame index (inclusive).
+        end (int): Last frame index (exclusive).
+        black, white, color_check, layout, fast_decode: Same as for convert(). color_check
+                                                        may also list the threshold of each frame.
+        index_path (str): The GIF's frame index file (see GifIndex.py), to start decoding
+                          near the first frame instead of at frame 0. None to decode from frame 0.
+
+    Returns:
+        tuple: (frames, durations). frames has one entry per frame, either the
+               frame bytes or None if the frame could not be processed.
+               durations holds each frame's display duration in milliseconds
+               (None if the GIF does not specify one).
+    """
+    gray_frames, durations = grayscale_gif_frames(gif_path, start, end, layout, fast_decode, index_path)
+    return convert_gray_frames(gray_frames, black, white, color_check, layout), durations
+
+
 # --- Wrapper Function ---
-def convert(image_file, printout=False, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK):
+def convert(image_file, printout=False, black=BLACK, white=WHITE, color_check=DEFAULT_COLOR_CHECK, layout=LAYOUT_BLOCK,
+            fast_decode=False):
     """
     Wrapper function to convert an image to LCD character bytes.
     Handles potential errors during the conversion process.
+    LAYOUT_FULL frames (256 bytes for the 32 character cells) are converted with convert_batch().
+    With fast_decode, large images are decoded and resized at reduced resolution (see
+    FAST_DECODE_REDUCING_GAP), which changes the result by a few gray levels at most.
     """
-    return image_to_lcd_bytes(image_file, printout, black, white, color_check)
+    if layout == LAYOUT_BLOCK:
+        return image_to_lcd_bytes(image_file, printout, black, white, color_check, fast_decode)
+    frame_bytes = convert_batch([image_file], black, white, color_check, layout, fast_decode)
+    if frame_bytes is None:
+        return None
+    if printout:
+        width, height = LAYOUT_SIZES[layout]
+        print_pixels(frame_to_pixels(frame_bytes[0], layout), width, height, white)
+    return frame_bytes[0].tolist()
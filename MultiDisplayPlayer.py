@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import os
+import sys
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+import serial
+from PIL import Image, ImageSequence
+
+import main
+from ArduinoEmulator import ArduinoEmulator
+from FrameStore import FrameStore
+from GifIndex import load_gif_index, index_path_for, iterate_gif_frames
+from ImageToDigit import image_to_grayscale_array, convert_batch
+from PlaybackScheduler import PlaybackScheduler
+from SerialProtocol import (frame_packet, parse_answer, parse_ready_message, FRAMING_OVERHEAD_BYTES, ACK_FLAG,
+                            READY_QUERY, READY_QUERY_INTERVAL_SECONDS, CAPABILITY_PACKED_ROWS)
+from ScriptFile import ScriptReader
+
+# --- Multi-Display Playback ---
+# Plays animations on several LCDs at once, each on its own Arduino and serial port, from a
+# single asyncio event loop. Every display has its own frames (a separate source, or one tile
+# of a larger source), its own frame encoder, flow control window and acknowledgement
+# handling, so a slow or unresponsive board only drops its own frames.
+#
+# All displays share one clock: frame i of every display is due at the same moment, so the
+# displays stay frame-synchronized no matter how long they run. A board that falls behind
+# skips frames to catch up, like the single-display scheduler in main.py.
+#
+# Usage:
+#   python MultiDisplayPlayer.py --display COM3 "Bad Apple" --display COM4 animation.gif
+#   python MultiDisplayPlayer.py --tile 2x1 "Bad Apple" --ports COM3 COM4
+# Use "emulator" as a port name to play on an emulated Arduino (see ArduinoEmulator.py).
+# Conversion settings (threshold, frame range, encoding, window...) are taken from main.py.
+
+# --- Constants ---
+EMULATOR_PORT = "emulator"
+# Lead time before the first frame of a cycle, so every display starts on the same frame
+CYCLE_START_LEAD_SECONDS = 0.05
+# Polling interval for serial ports that can't be watched by the event loop (Windows)
+POLL_INTERVAL_SECONDS = 0.001
+
+
+# --- Frame Sources ---
+def iterate_source_images(source_path, start, end):
+    """
+    Yields the images of a folder (numbered files, in order), a GIF or a single image
+    within the frame range.
+
+    Args:
+        source_path (str): The image folder, GIF or image file.
+        start (int): First frame index (inclusive).
+        end (int): Last frame index (exclusive).
+    """
+    if os.path.isdir(source_path):
+        names = sorted((f for f in os.listdir(source_path)
+                        if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp'))),
+                       key=lambda x: int(os.path.splitext(x)[0]) if os.path.splitext(x)[0].isdigit() else float('inf'))
+        for name in names[start:end]:
+            with Image.open(os.path.join(source_path, name)) as img:
+                yield img
+    elif source_path.lower().endswith('.gif'):
+        gif_index = load_gif_index(source_path, index_path_for(main.script_file_path_for(source_path)))
+        for _, frame, _ in iterate_gif_frames(source_path, start, end, gif_index):
+            yield frame
+    else:
+        with Image.open(source_path) as img:
+            for i, frame in enumerate(ImageSequence.Iterator(img)):
+                if i >= end:
+                    break
+                if i >= start:
+                    yield frame
+
+
+def tile_source_frames(source_path, columns, rows):
+    """
+    Splits every frame of a source into a grid of tiles and converts each tile for one LCD,
+    using the conversion settings and frame range of main.py.
+
+    Args:
+        source_path (str): The image folder, GIF or image file.
+        columns (int): Number of displays side by side.
+        rows (int): Number of displays on top of each other.
+
+    Returns:
+        list: For each tile, row by row, a FrameStore with its frames.
+    """
+    tiles = [[] for _ in range(columns * rows)]
+    for img in iterate_source_images(source_path, main.START_FRAME_INDEX, main.END_FRAME_INDEX):
+        width, height = img.size
+        for row in range(rows):
+            for column in range(columns):
+                box = (column * width // columns, row * height // rows,
+                       (column + 1) * width // columns, (row + 1) * height // rows)
+                tile = img.crop(box)
+                tiles[row * columns + column].append(image_to_grayscale_array(tile, main.DISPLAY_LAYOUT, main.FAST_DECODE))
+    tile_frames = []
+    for gray_frames in tiles:
+        frame_store = FrameStore(main.BYTES_PER_FRAME, len(gray_frames))
+        if gray_frames:
+            converted = convert_batch(np.stack(gray_frames), main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                      main.COLOR_BINARIZATION_THRESHOLD, main.DISPLAY_LAYOUT)
+            if converted is not None:
+                frame_store.extend(converted)
+        tile_frames.append(frame_store)
+    return tile_frames
+
+
+def source_frames(source_path):
+    """
+    Returns the frames of a source for one display: from its script file if
+    AUTO_LOAD_SCRIPT is set and it exists, otherwise converted like main.py does.
+    """
+    script_file_path = main.script_file_path_for(source_path)
+    if main.AUTO_LOAD_SCRIPT and os.path.exists(script_file_path):
+        script_reader = ScriptReader(script_file_path)
+        if script_reader.frame_size == main.BYTES_PER_FRAME:
+            return script_reader
+        script_reader.close()
+    frame_store = FrameStore(main.BYTES_PER_FRAME)
+    for _ in main.process_source_frames(source_path, script_file_path, frame_store=frame_store):
+        pass
+    return frame_store
+
+
+# --- Serial Link ---
+class AsyncSerialLink:
+    """A serial port used from asyncio: reads wait on the event loop instead of blocking it."""
+
+    def __init__(self, port, baudrate):
+        self.serial = main.open_serial_port(port, baudrate, 0, main.AVOID_BOARD_RESET)
+        try:
+            self._fileno = self.serial.fileno()
+        except (AttributeError, OSError):
+            self._fileno = None  # Not a file descriptor (Windows), fall back to polling
+
+    async def read(self):
+        """Waits until bytes are available and returns them."""
+        while True:
+            data = self.serial.read(self.serial.in_waiting or 1)
+            if data:
+                return data
+            if self._fileno is None:
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+                continue
+            loop = asyncio.get_running_loop()
+            readable = loop.create_future()
+            loop.add_reader(self._fileno, readable.set_result, None)
+            try:
+                await readable
+            finally:
+                loop.remove_reader(self._fileno)
+
+    def write(self, data):
+        self.serial.write(data)
+
+    def close(self):
+        self.serial.close()
+
+
+# --- Displays ---
+class Display:
+    """One LCD on its own serial port, with its own frames, encoder and flow control."""
+
+    def __init__(self, name, port, frames):
+        """
+        Args:
+            name (str): Name used in the console output.
+            port (str): Serial port of the Arduino, or EMULATOR_PORT.
+            frames (list): The frames to play (main.BYTES_PER_FRAME each).
+        """
+        self.name = name
+        self.port = port
+        self.frames = frames
+        self.frame_encoder = main.create_frame_encoder()
+        self.scheduler = PlaybackScheduler(main.TARGET_FPS)
+        self.emulator = None
+        self.link = None
+        # Sequence number, packet length, send time and due time and resync epoch of each unconfirmed frame
+        self.in_flight = deque()
+        self.in_flight_bytes = 0
+        self.resync_epoch = 0
+        self.consecutive_timeouts = 0
+        self.failed = False  # Set when the board stopped answering, its playback stops
+        self.frames_sent = 0
+        self.frames_lost = 0
+        self.bytes_sent = 0
+        self._credit = None  # asyncio.Event set whenever a frame in flight is settled
+        self._reader = None
+
+    def open(self):
+        """Opens the serial port (starting an emulated board for EMULATOR_PORT)."""
+        port = self.port
+        if port == EMULATOR_PORT:
+            self.emulator = ArduinoEmulator(main.BAUDRATE, main.EMULATOR_I2C_CLOCK_HZ, main.ARDUINO_RX_BUFFER_BYTES).start()
+            port = self.emulator.port
+        self.link = AsyncSerialLink(port, main.BAUDRATE)
+
+    async def wait_until_ready(self):
+        """
+        Waits for the READY message of the board, like main.wait_for_ready().
+
+        Returns:
+            bool: True if the board answered within main.READY_TIMEOUT_SECONDS.
+        """
+        received = bytearray()
+
+        async def handshake():
+            next_query = 0.0
+            while True:
+                now = perf_counter()
+                if now >= next_query:
+                    self.link.write(bytes((READY_QUERY,)))
+                    next_query = now + READY_QUERY_INTERVAL_SECONDS
+                try:
+                    data = await asyncio.wait_for(self.link.read(), next_query - now)
+                except asyncio.TimeoutError:
+                    continue
+                received.extend(value for value in data if not value & ACK_FLAG)
+                ready = parse_ready_message(received)
+                if ready is not None:
+                    self.frame_encoder.packed_rows = main.ROW_PACKING and bool(ready[1] & CAPABILITY_PACKED_ROWS)
+                    return
+                del received[:-main.READY_BUFFER_BYTES]
+
+        try:
+            await asyncio.wait_for(handshake(), main.READY_TIMEOUT_SECONDS)
+            return True
+        except asyncio.TimeoutError:
+            print(f"Warning: No READY message from {self.name} ({self.port}), sending anyway.")
+            return False
+
+    def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self.link:
+            self.link.close()
+        if self.emulator:
+            self.emulator.stop()
+
+    def start_reader(self):
+        """Starts the task that reads the acknowledgements of this display."""
+        self._credit = asyncio.Event()
+        self._reader = asyncio.create_task(self._read_answers())
+
+    def _settle(self, entry, displayed):
+        self.in_flight_bytes -= entry[1]
+        if displayed:
+            self.frames_sent += 1
+            if entry[3] is not None:
+                self.scheduler.frame_confirmed(entry[2], entry[3], perf_counter())
+            return
+        self.frames_lost += 1
+        # The deltas sent after a lost frame are rejected as well, one keyframe resyncs them all
+        if entry[4] == self.resync_epoch:
+            self.resync_epoch += 1
+            self.frame_encoder.reset()
+
+    def _handle_answer(self, value):
+        answer = parse_answer(value)
+        if answer is None or all(entry[0] != answer[0] for entry in self.in_flight):
+            return  # Not an answer, or a late answer for a frame that was already given up on
+        self.consecutive_timeouts = 0
+        sequence, accepted = answer
+        # Answers arrive in order, so the frames sent before the answered one were lost
+        entry = self.in_flight.popleft()
+        while entry[0] != sequence:
+            self._settle(entry, False)
+            entry = self.in_flight.popleft()
+        self._settle(entry, accepted)
+        self._credit.set()
+
+    async def _read_answers(self):
+        while True:
+            timeout = None
+            if self.in_flight:
+                timeout = max(self.in_flight[0][2] + main.ACK_TIMEOUT_SECONDS - perf_counter(), 0.0)
+            try:
+                data = await asyncio.wait_for(self.link.read(), timeout)
+            except asyncio.TimeoutError:
+                # No answer within the timeout, so none of the frames in flight arrived intact
+                while self.in_flight:
+                    self._settle(self.in_flight.popleft(), False)
+                self.consecutive_timeouts += 1
+                if self.consecutive_timeouts >= main.MAX_CONSECUTIVE_ACK_TIMEOUTS:
+                    self.failed = True
+                    print(f"\nWarning: Display {self.name} ({self.port}) does not acknowledge any frames. Stopping it.")
+                self._credit.set()
+                continue
+            except serial.SerialException as e:
+                self.failed = True
+                print(f"\nSerial error on display {self.name} ({self.port}): {e}")
+                self._credit.set()
+                return
+            for value in data:
+                self._handle_answer(value)
+
+    async def _wait_for_credit(self):
+        self._credit.clear()
+        await self._credit.wait()
+
+    async def play_cycle(self, start_time):
+        """Plays the frames once, on the shared clock starting at start_time."""
+        self.scheduler.start(start_time)
+        for i, frame_bytes in enumerate(self.frames):
+            if self.failed:
+                return
+            planned = self.scheduler.plan(i)
+            if planned is None:
+                continue  # Too late to be shown in its slot, drop it
+            due_time, send_time = planned
+            delay = send_time - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            payload = self.frame_encoder.encode(frame_bytes)
+            # Wait for credits: a free window slot and room in the Arduino's receive buffer
+            while self.in_flight and (len(self.in_flight) >= main.FLOW_CONTROL_WINDOW or self.in_flight_bytes + len(payload)
+                                      + FRAMING_OVERHEAD_BYTES > main.ARDUINO_RX_BUFFER_BYTES):
+                await self._wait_for_credit()
+                if self.failed:
+                    return
+                if self.frame_encoder.previous is None:
+                    # A frame was lost and the encoder was reset, so send this frame in full
+                    payload = self.frame_encoder.encode(frame_bytes)
+
+            sequence = self.frame_encoder.next_sequence()
+            packet = frame_packet(sequence, payload)
+            self.in_flight.append((sequence, len(packet), perf_counter(), due_time, self.resync_epoch))
+            self.in_flight_bytes += len(packet)
+            try:
+                self.link.write(packet)
+            except serial.SerialException as e:
+                self.failed = True
+                print(f"\nSerial error on display {self.name} ({self.port}): {e}")
+                return
+            self.bytes_sent += len(packet)
+
+        # Collect the acknowledgements of the frames still in flight
+        while self.in_flight and not self.failed:
+            await self._wait_for_credit()
+
+    def report(self):
+        scheduler = self.scheduler
+        return (f"{self.name} ({self.port}): {self.frames_sent} shown, {scheduler.frames_dropped} dropped, "
+                f"{self.frames_lost} lost, lateness avg {scheduler.average_lateness() * 1000:.1f} ms "
+                f"max {scheduler.max_lateness * 1000:.1f} ms, latency {scheduler.latency * 1000:.1f} ms"
+                + (" [FAILED]" if self.failed else ""))
+
+
+class MultiDisplayPlayer:
+    """Plays several displays in sync on one asyncio event loop."""
+
+    def __init__(self, displays, loop_animation=False):
+        """
+        Args:
+            displays (list): Display objects.
+            loop_animation (bool): Repeat the animation until interrupted.
+        """
+        self.displays = displays
+        self.loop_animation = loop_animation
+        self.cycles = 0
+
+    async def run(self):
+        for display in self.displays:
+            display.open()
+        try:
+            # Wait until every board announced that it is ready
+            await asyncio.gather(*(display.wait_until_ready() for display in self.displays))
+            for display in self.displays:
+                display.start_reader()
+            while True:
+                active = [display for display in self.displays if not display.failed and len(display.frames)]
+                if not active:
+                    print("No display is able to play.")
+                    break
+                # Every display starts the cycle at the same moment on the shared clock
+                start_time = perf_counter() + CYCLE_START_LEAD_SECONDS
+                begin = perf_counter()
+                await asyncio.gather(*(display.play_cycle(start_time) for display in active))
+                self.cycles += 1
+                print(f"\nCycle {self.cycles} finished in {perf_counter() - begin:.2f} seconds:")
+                for display in self.displays:
+                    print("  " + display.report())
+                if not self.loop_animation:
+                    break
+        finally:
+            for display in self.displays:
+                display.close()
+
+
+# --- Entry Point ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays animations on several LCDs in sync.")
+    parser.add_argument("--display", nargs=2, action="append", metavar=("PORT", "SOURCE"), default=[],
+                        help="A display and its own image source (repeatable)")
+    parser.add_argument("--tile", nargs=2, metavar=("COLUMNSxROWS", "SOURCE"),
+                        help="Split one source across a grid of displays, given row by row with --ports")
+    parser.add_argument("--ports", nargs="+", default=[], help="Serial ports of the tiled displays")
+    parser.add_argument("--fps", type=float, default=main.TARGET_FPS, help=f"Frames per second ({main.TARGET_FPS})")
+    parser.add_argument("--loop", action="store_true", help="Repeat the animation until interrupted")
+    arguments = parser.parse_args()
+    main.TARGET_FPS = arguments.fps
+
+    displays = []
+    for port, source in arguments.display:
+        if not os.path.exists(source):
+            print(f"Error: Source '{source}' not found.")
+            sys.exit(1)
+        displays.append(Display(f"{len(displays) + 1}:{os.path.basename(os.path.normpath(source))}", port,
+                                source_frames(source)))
+    if arguments.tile:
+        grid, source = arguments.tile
+        try:
+            columns, rows = (int(n) for n in grid.lower().split("x"))
+        except ValueError:
+            print(f"Error: Invalid tile grid '{grid}', expected COLUMNSxROWS such as 2x1.")
+            sys.exit(1)
+        if len(arguments.ports) != columns * rows:
+            print(f"Error: A {columns}x{rows} grid needs {columns * rows} ports, got {len(arguments.ports)}.")
+            sys.exit(1)
+        if not os.path.exists(source):
+            print(f"Error: Source '{source}' not found.")
+            sys.exit(1)
+        print(f"Converting {source} into {columns}x{rows} tiles...")
+        for index, (port, frames) in enumerate(zip(arguments.ports, tile_source_frames(source, columns, rows))):
+            displays.append(Display(f"tile {index % columns},{index // columns}", port, frames))
+    if not displays:
+        parser.print_help()
+        sys.exit(1)
+
+    player = MultiDisplayPlayer(displays, arguments.loop)
+    try:
+        asyncio.run(player.run())
+    except KeyboardInterrupt:
+        print("\nInterrupted by user.")
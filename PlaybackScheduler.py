@@ -0,0 +1,139 @@
+from time import perf_counter, sleep
+
+# --- Clock-Driven Playback ---
+# Decides when each frame is sent, based on a monotonic clock instead of the speed of
+# the serial link. Every frame has a due time (the start of its display slot), derived
+# from TARGET_FPS or from the per-frame durations stored for GIF sources. Frames are
+# held back until shortly before they are due (the LCD keeps showing the previous frame
+# meanwhile), and frames that could only be shown after their slot has ended are dropped.
+#
+# The time between writing a frame and receiving its acknowledgement is measured continuously, and
+# its moving average is used as the expected delay until a frame is visible.
+
+# --- Constants ---
+# Weight of the newest measurement in the moving average of the confirmation latency
+LATENCY_SMOOTHING = 0.2
+# Below this remaining wait time, busy-wait instead of sleeping for better precision
+SPIN_THRESHOLD_SECONDS = 0.002
+
+
+class PlaybackScheduler:
+    """Schedules frames against a monotonic clock and keeps playback statistics."""
+
+    def __init__(self, target_fps=30, frame_duration_ms=None):
+        """
+        Args:
+            target_fps (float): Frame rate used for frames without a stored duration.
+            frame_duration_ms (callable): Optional function returning the stored duration of
+                                          a frame index in milliseconds, or None if unknown.
+        """
+        self.default_duration = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.frame_duration_ms = frame_duration_ms
+        self.latency = 0.0  # Moving average of the write-to-acknowledgement time in seconds
+        self.start()
+
+    def start(self, start_time=None):
+        """
+        Restarts the clock and statistics, at the beginning of an animation cycle.
+
+        Args:
+            start_time (float): Optional perf_counter() time the cycle starts at, so that
+                                several schedulers can share one clock. Defaults to now.
+        """
+        self.start_time = perf_counter() if start_time is None else start_time
+        self.next_due = 0.0  # Due time of the next frame, relative to start_time
+        self.frames_scheduled = 0
+        self.frames_dropped = 0
+        self.frames_shown = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def frame_duration(self, index):
+        """Returns the display duration of a frame in seconds."""
+        if self.frame_duration_ms is not None:
+            duration_ms = self.frame_duration_ms(index)
+            if duration_ms:
+                return duration_ms / 1000.0
+        return self.default_duration
+
+    def plan(self, index):
+        """
+        Decides whether a frame is sent and when, without waiting.
+        Frames must be planned in order.
+
+        Args:
+            index (int): Index of the frame in the sequence.
+
+        Returns:
+            tuple: (due time, send time) of the frame (perf_counter() clock),
+                   or None if the frame should be dropped.
+        """
+        due = self.next_due
+        duration = self.frame_duration(index)
+        self.next_due += duration
+        self.frames_scheduled += 1
+
+        now = perf_counter() - self.start_time
+        # The frame would only become visible after its display slot has ended
+        if duration > 0 and now + self.latency > due + duration:
+            self.frames_dropped += 1
+            return None
+        # Send early enough that the frame becomes visible when it is due
+        return self.start_time + due, self.start_time + due - self.latency
+
+    def schedule(self, index, wait=None):
+        """
+        Decides whether a frame is sent and waits until it is time to send it.
+        Frames must be scheduled in order.
+
+        Args:
+            index (int): Index of the frame in the sequence.
+            wait (callable): Optional function called with the number of seconds to wait,
+                             used to process confirmations while waiting. Defaults to sleeping.
+
+        Returns:
+            float: The absolute due time of the frame (perf_counter() clock),
+                   or None if the frame should be dropped.
+        """
+        planned = self.plan(index)
+        if planned is None:
+            return None
+        due_time, send_time = planned
+        remaining = send_time - perf_counter()
+        if remaining > 0:
+            (wait or wait_seconds)(remaining)
+        return due_time
+
+    def frame_confirmed(self, sent_time, due_time, confirmed_time):
+        """
+        Records the acknowledgement of a scheduled frame.
+
+        Args:
+            sent_time (float): When the frame was written (perf_counter() clock).
+            due_time (float): The due time returned by schedule().
+            confirmed_time (float): When the confirmation arrived.
+        """
+        latency = confirmed_time - sent_time
+        if self.frames_shown == 0 and self.latency == 0.0:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        lateness = max(0.0, confirmed_time - due_time)
+        self.frames_shown += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+
+    def average_lateness(self):
+        """Returns the average lateness of the shown frames in seconds."""
+        return self.total_lateness / self.frames_shown if self.frames_shown else 0.0
+
+
+def wait_seconds(seconds):
+    """Waits precisely: sleeps for most of the time, then busy-waits for the rest."""
+    deadline = perf_counter() + seconds
+    remaining = seconds
+    while remaining > SPIN_THRESHOLD_SECONDS:
+        sleep(remaining - SPIN_THRESHOLD_SECONDS)
+        remaining = deadline - perf_counter()
+    while perf_counter() < deadline:
+        pass
@@ -0,0 +1,217 @@
+import os
+import threading
+from time import perf_counter
+
+# --- Playlists ---
+# A playlist is a text file (M3U style) with one entry per line: a script file (.bin)
+# or any source main.py can play (an image folder, a GIF or an image). Empty lines and
+# lines starting with '#' are ignored, relative paths are relative to the playlist.
+#
+# The entries are played one after another over the same serial connection. While one
+# entry plays, the next one is loaded (converted if needed, and its script file mapped)
+# on a background thread, so it is ready the moment the current one ends. The playlist
+# file is read again whenever it changes, so entries can be added, removed or reordered
+# while it plays: the entry after the one that is playing is always taken from the
+# current content of the file, and a preloaded entry that is no longer next is replaced.
+
+# --- Constants ---
+COMMENT_PREFIX = "#"
+
+
+# --- Helper Functions ---
+def read_playlist(path):
+    """
+    Reads the entries of a playlist file.
+
+    Args:
+        path (str): Path of the playlist file.
+
+    Returns:
+        list: The entry paths, in order. Relative paths are resolved against the playlist's folder.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    base_folder = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(COMMENT_PREFIX):
+                continue
+            entries.append(line if os.path.isabs(line) else os.path.join(base_folder, line))
+    return entries
+
+
+class Playlist:
+    """The entries of a playlist file and the position of the entry that is playing."""
+
+    def __init__(self, path, loop=True):
+        """
+        Args:
+            path (str): Path of the playlist file.
+            loop (bool): Start again with the first entry after the last one.
+        """
+        self.path = path
+        self.loop = loop
+        self.entries = []
+        self.position = -1  # Index of the entry that is playing, -1 before the first one
+        self.current = None  # Path of the entry that is playing
+        self._modified = None
+        self.reload()
+
+    def reload(self):
+        """
+        Reads the playlist file again if it changed. The entry that is playing keeps its place,
+        so playback continues after it even if entries were inserted or removed before it.
+
+        Returns:
+            bool: True if the entries changed.
+        """
+        try:
+            modified = os.stat(self.path).st_mtime_ns
+            if modified == self._modified:
+                return False
+            entries = read_playlist(self.path)
+        except OSError as e:
+            # The file may be replaced by an editor at this moment, keep the entries read before
+            print(f"\nWarning: Could not read playlist {self.path}: {e}")
+            return False
+        self._modified = modified
+        if entries == self.entries:
+            return False
+        if self.current in entries:
+            # The occurrence nearest to the old position, for entries listed more than once
+            matches = [n for n, entry in enumerate(entries) if entry == self.current]
+            self.position = min(matches, key=lambda n: abs(n - self.position))
+        elif self.current is not None:
+            # The entry that is playing was removed, continue with the one that took its place
+            self.position = min(self.position, len(entries)) - 1
+        self.entries = entries
+        return True
+
+    def upcoming(self):
+        """
+        Returns the entry after the one that is playing, according to the current playlist file.
+
+        Returns:
+            str: The path of the next entry, or None at the end of the playlist (or if it is empty).
+        """
+        self.reload()
+        position = self._next_position()
+        return None if position is None else self.entries[position]
+
+    def advance(self):
+        """
+        Makes the upcoming entry the one that is playing.
+
+        Returns:
+            str: Its path, or None at the end of the playlist.
+        """
+        position = self._next_position()
+        if position is None:
+            return None
+        self.position = position
+        self.current = self.entries[position]
+        return self.current
+
+    def _next_position(self):
+        if not self.entries:
+            return None
+        position = self.position + 1
+        if position >= len(self.entries):
+            if not self.loop:
+                return None
+            position = 0
+        return position
+
+
+class PlaylistPreloader:
+    """
+    Keeps the next entry of a playlist loaded on a background thread, while the current one
+    plays (double buffering), and loads a different one when the playlist file changes.
+    """
+
+    def __init__(self, playlist, load, poll_seconds=1.0):
+        """
+        Args:
+            playlist (Playlist): The playlist.
+            load (callable): Called with an entry path on the background thread. Returns the frames
+                             of the entry (an object with a close() method, e.g. a ScriptReader),
+                             or None if the entry cannot be played.
+            poll_seconds (float): How often the playlist file is checked for changes.
+        """
+        self.playlist = playlist
+        self.load = load
+        self.poll_seconds = poll_seconds
+        self.waited_seconds = 0.0  # Time take() waited for an entry that was not loaded yet
+        self._loaded = None  # (entry, frames) of the preloaded entry
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="PlaylistPreloader", daemon=True)
+
+    def start(self):
+        """Starts loading the first entry."""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                upcoming = self.playlist.upcoming()
+                if upcoming is None or (self._loaded is not None and self._loaded[0] == upcoming):
+                    # Nothing to do until the entry is taken or the playlist file changes
+                    self._condition.wait(self.poll_seconds)
+                    continue
+                stale, self._loaded = self._loaded, None
+            if stale is not None and stale[1] is not None:
+                stale[1].close()  # Preloaded, but no longer next in the changed playlist
+            frames = self.load(upcoming)
+            with self._condition:
+                self._loaded = (upcoming, frames)
+                self._condition.notify_all()
+
+    def take(self):
+        """
+        Waits until the next entry is loaded and makes it the one that is playing.
+        Loading of the entry after it starts right away.
+
+        Returns:
+            tuple: (entry, frames), frames is None if the entry could not be loaded.
+                   None at the end of the playlist.
+        """
+        with self._condition:
+            wait_begin = None
+            while True:
+                upcoming = self.playlist.upcoming()
+                if upcoming is None:
+                    return None
+                if self._loaded is not None and self._loaded[0] == upcoming:
+                    entry, frames = self._loaded
+                    self._loaded = None
+                    self.playlist.advance()
+                    self._condition.notify_all()
+                    if wait_begin is not None:
+                        self.waited_seconds += perf_counter() - wait_begin
+                    return entry, frames
+                if wait_begin is None:
+                    wait_begin = perf_counter()
+                    print(f"\nWaiting for the next playlist entry to load: {upcoming}")
+                self._condition.notify_all()
+                self._condition.wait(self.poll_seconds)
+
+    def stop(self):
+        """
+        Stops the background thread and closes a preloaded entry that was not played.
+        An entry that is still being converted is abandoned.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(self.poll_seconds)
+        if self._loaded is not None and self._loaded[1] is not None:
+            self._loaded[1].close()
+            self._loaded = None
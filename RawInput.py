@@ -0,0 +1,157 @@
+import os
+import stat
+import sys
+
+from PIL import Image
+
+# --- Raw Frame Input ---
+# Reads an unbounded sequence of frames from stdin or a named pipe (FIFO), so another
+# program (a video decoder, a generator, a camera grabber...) can feed frames straight
+# into the conversion without writing image files first. Two formats are supported:
+#
+#   "gray": headerless 8-bit grayscale frames of a declared width and height, one byte per
+#           pixel, row by row (e.g. ffmpeg -f rawvideo -pix_fmt gray).
+#   "pnm":  concatenated binary PGM (P5) or PPM (P6) images with 8-bit samples, each with its
+#           own header, so the size does not have to be declared (e.g. ffmpeg -f image2pipe -c:v pgm).
+#
+# Frames are returned as PIL images, so they go through the same conversion as image files.
+
+# --- Constants ---
+STDIN_SOURCE = "-"  # Source path that reads from standard input
+RAW_FORMAT_GRAY = "gray"
+RAW_FORMAT_PNM = "pnm"
+PNM_MODES = {b"P5": "L", b"P6": "RGB"}
+
+
+# --- Helper Functions ---
+def is_raw_source(source_path):
+    """Returns True if the source is standard input or a named pipe."""
+    if source_path == STDIN_SOURCE:
+        return True
+    try:
+        return stat.S_ISFIFO(os.stat(source_path).st_mode)
+    except OSError:
+        return False
+
+
+def _read_exact(stream, buffer):
+    """Fills buffer from the stream, returns the number of bytes read (less at the end of the stream)."""
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def _read_pnm_header(stream):
+    """
+    Reads the header of the next PNM image.
+
+    Returns:
+        tuple: (magic, width, height, maxval), or None at the end of the stream.
+    """
+    tokens = []
+    token = b""
+    while len(tokens) < 4:
+        char = stream.read(1)
+        if not char:
+            if tokens or token:
+                raise ValueError("The stream ended inside a PNM header.")
+            return None
+        if char == b"#":
+            stream.readline()  # Comment until the end of the line
+        elif char.isspace():
+            if token:
+                tokens.append(token)
+                token = b""
+        else:
+            token += char
+    # The single whitespace character after maxval was consumed above, the pixel data follows
+    return tokens[0], int(tokens[1]), int(tokens[2]), int(tokens[3])
+
+
+def read_gray_frames(stream, width, height):
+    """
+    Yields the headerless 8-bit grayscale frames of a stream.
+
+    Args:
+        stream: A binary file object.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+
+    Yields:
+        PIL.Image.Image: Each frame, in mode 'L'. The image is only valid until the next frame is read.
+    """
+    buffer = bytearray(width * height)
+    while True:
+        count = _read_exact(stream, buffer)
+        if count < len(buffer):
+            if count:
+                print(f"Warning: Raw input ended with an incomplete frame of {count} bytes. Ignoring it.")
+            return
+        yield Image.frombuffer('L', (width, height), buffer, 'raw', 'L', 0, 1)
+
+
+def read_pnm_frames(stream):
+    """
+    Yields the concatenated binary PGM/PPM images of a stream.
+
+    Args:
+        stream: A binary file object.
+
+    Yields:
+        PIL.Image.Image: Each frame, in mode 'L' (PGM) or 'RGB' (PPM).
+    """
+    while True:
+        header = _read_pnm_header(stream)
+        if header is None:
+            return
+        magic, width, height, maxval = header
+        if magic not in PNM_MODES or maxval > 255:
+            raise ValueError(f"Unsupported PNM image ({magic.decode(errors='replace')}, maxval {maxval}). "
+                             f"Only binary PGM (P5) and PPM (P6) with 8-bit samples are supported.")
+        mode = PNM_MODES[magic]
+        buffer = bytearray(width * height * len(mode))
+        if _read_exact(stream, buffer) < len(buffer):
+            print("Warning: Raw input ended with an incomplete PNM image. Ignoring it.")
+            return
+        yield Image.frombuffer(mode, (width, height), buffer, 'raw', mode, 0, 1)
+
+
+def iterate_raw_frames(source_path, raw_format, width=0, height=0):
+    """
+    Yields the frames of stdin or a named pipe until the writer closes it.
+
+    Args:
+        source_path (str): STDIN_SOURCE or the path of a named pipe.
+        raw_format (str): RAW_FORMAT_GRAY or RAW_FORMAT_PNM.
+        width (int): Frame width for RAW_FORMAT_GRAY.
+        height (int): Frame height for RAW_FORMAT_GRAY.
+
+    Yields:
+        PIL.Image.Image: Each frame.
+    """
+    if raw_format == RAW_FORMAT_GRAY:
+        if width <= 0 or height <= 0:
+            print("Error: Raw grayscale input needs RAW_INPUT_WIDTH and RAW_INPUT_HEIGHT.")
+            return
+    elif raw_format != RAW_FORMAT_PNM:
+        print(f"Error: Unknown raw input format '{raw_format}'. Use '{RAW_FORMAT_GRAY}' or '{RAW_FORMAT_PNM}'.")
+        return
+
+    if source_path == STDIN_SOURCE:
+        stream = sys.stdin.buffer
+    else:
+        # Opening a named pipe waits until a writer opens it as well
+        stream = open(source_path, "rb")
+    try:
+        if raw_format == RAW_FORMAT_GRAY:
+            yield from read_gray_frames(stream, width, height)
+        else:
+            yield from read_pnm_frames(stream)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
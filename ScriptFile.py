@@ -0,0 +1,346 @@
+import hashlib
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+from SerialProtocol import ROW_BITS, pack_rows, unpack_rows
+
+# --- Script File Format ---
+# A script file (Scripts/<name>.bin) stores the converted frames of one source.
+#
+# Layout (all integers little-endian):
+#   Header (HEADER_SIZE bytes):
+#     magic              4s   b"LCDS"
+#     version            H    FORMAT_VERSION
+#     data_offset        H    Offset of the first frame (== the header size)
+#     frame_size         H    Bytes per stored frame (64, or 256 for FRAME_FORMAT_CELLS, 40 and 160 packed)
+#     frame_format       H    FRAME_FORMAT_RAW: 64 bytes, one per custom character row
+#                             FRAME_FORMAT_CELLS: 256 bytes, 8 rows for each of the 32 cells of the display
+#                             FRAME_FORMAT_PACKED, FRAME_FORMAT_CELLS_PACKED: the same rows packed into
+#                             5 bits each (see pack_rows() in SerialProtocol.py), 40 or 160 bytes
+#     frame_count        I    Number of frames
+#     frame_rate         f    Frames per second the sequence was made for (0 = unknown)
+#     black, white       B B  Pixel values used for the conversion
+#     threshold          h    Binarization threshold used for the conversion (-1 = auto)
+#     start_frame        I    First source frame index (inclusive)
+#     end_frame          I    Last source frame index (exclusive)
+#     durations_offset   I    Offset of the per-frame duration table (0 = none)
+#     source_fingerprint 32s  SHA-256 of the source file names, sizes and modification times
+#     thresholds_offset  I    Offset of the per-frame threshold table (0 = none), version 2
+#     threshold_mode     H    Position of the threshold analysis mode in THRESHOLD_MODES
+#                             (see ThresholdAnalysis.py), version 2
+#     threshold_window   H    Smoothing window of the threshold analysis in frames, version 2
+#     decode_flags       H    Source decoding options that change the frames (DECODE_FLAG_FAST), version 3
+#   Frames:
+#     frame_count * frame_size bytes
+#   Duration table (optional):
+#     frame_count * H, display duration of each frame in milliseconds (GIF frame durations)
+#   Threshold table (optional):
+#     frame_count * B, binarization threshold of each frame (sequence threshold analysis)
+#
+# Version 1 files have the header without the threshold fields (68 bytes), version 2 files
+# the header without decode_flags (76 bytes).
+# Files written by older versions have no header and are a plain stream of 64-byte frames.
+# They are still loaded, with every header field left at its default.
+
+# --- Constants ---
+MAGIC = b"LCDS"
+FORMAT_VERSION = 3
+HEADER_FORMAT_V1 = "<4sHHHHIfBBhIII32s"
+HEADER_SIZE_V1 = struct.calcsize(HEADER_FORMAT_V1)  # Should be 68
+HEADER_EXTENSION_FORMAT = "<IHH"  # Fields added in version 2
+HEADER_SIZE_V2 = HEADER_SIZE_V1 + struct.calcsize(HEADER_EXTENSION_FORMAT)  # Should be 76
+HEADER_EXTENSION_V3_FORMAT = "<H"  # Fields added in version 3
+HEADER_FORMAT = HEADER_FORMAT_V1 + HEADER_EXTENSION_FORMAT[1:] + HEADER_EXTENSION_V3_FORMAT[1:]
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # Should be 78
+FRAME_FORMAT_RAW = 0
+FRAME_FORMAT_CELLS = 1
+FRAME_FORMAT_PACKED = 2
+FRAME_FORMAT_CELLS_PACKED = 3
+# Packed frame format of each unpacked one
+PACKED_FRAME_FORMATS = {FRAME_FORMAT_RAW: FRAME_FORMAT_PACKED, FRAME_FORMAT_CELLS: FRAME_FORMAT_CELLS_PACKED}
+DEFAULT_FRAME_SIZE = 64
+DECODE_FLAG_FAST = 1  # Large images decoded at reduced resolution (FAST_DECODE in main.py)
+TEMP_SUFFIX = ".part"  # Script files are written under this name and renamed when complete
+# Packed frames are unpacked this many at a time, and only the blocks used last are kept,
+# so reading a packed file takes the same time and memory no matter how long it is
+UNPACK_BLOCK_FRAMES = 4096
+UNPACKED_BLOCKS_KEPT = 4
+
+
+# --- Helper Functions ---
+def source_fingerprint(paths):
+    """
+    Computes a fingerprint of the source files from their names, sizes and
+    modification times, without reading their content.
+
+    Args:
+        paths (list): Paths of the source files, in frame order.
+
+    Returns:
+        bytes: A 32-byte SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        except OSError:
+            digest.update(f"{os.path.basename(path)}\0missing\n".encode('utf-8'))
+    return digest.digest()
+
+
+# --- Writing ---
+class ScriptWriter:
+    """
+    Writes frames to a script file. The header is written with a placeholder
+    frame count and completed when the writer is closed, so frames can be
+    appended while they are being converted. With a packed frame format, the
+    frames are packed as they are written.
+
+    The frames are written to a temporary file next to the script file, which
+    replaces it when the writer is closed. A script file that is being played
+    (memory-mapped by a ScriptReader) is never truncated, and a conversion cut
+    off by a crash leaves the previous script file as it was.
+    """
+
+    def __init__(self, path, frame_rate=0.0, black=0, white=1, threshold=-1, start_frame=0, end_frame=0,
+                 fingerprint=b"", frame_size=DEFAULT_FRAME_SIZE, frame_format=FRAME_FORMAT_RAW, threshold_mode=0,
+                 threshold_window=0, decode_flags=0):
+        self.path = path
+        self.frame_rate = frame_rate
+        self.black = black
+        self.white = white
+        self.threshold = threshold
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.fingerprint = fingerprint
+        self.frame_size = frame_size  # Bytes per frame as written, before packing
+        self.frame_format = frame_format
+        self.packed = frame_format in PACKED_FRAME_FORMATS.values()
+        self.threshold_mode = threshold_mode
+        self.threshold_window = threshold_window
+        self.decode_flags = decode_flags
+        self.frame_count = 0
+        self.durations = []
+        self.thresholds = []
+        self.temp_path = path + TEMP_SUFFIX
+        self._file = open(self.temp_path, "wb")
+        self._file.write(self._pack_header(0))
+
+    def _pack_header(self, durations_offset, thresholds_offset=0):
+        stored_size = self.frame_size * ROW_BITS // 8 if self.packed else self.frame_size
+        return struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, HEADER_SIZE, stored_size, self.frame_format,
+                           self.frame_count, float(self.frame_rate), self.black, self.white, self.threshold,
+                           self.start_frame, self.end_frame, durations_offset, self.fingerprint[:32],
+                           thresholds_offset, self.threshold_mode, self.threshold_window, self.decode_flags)
+
+    def write(self, frame_bytes, duration_ms=None, threshold=None):
+        """
+        Appends one frame.
+
+        Args:
+            frame_bytes (bytes): The frame data (frame_size bytes).
+            duration_ms (int): Optional display duration of the frame in milliseconds.
+            threshold (int): Optional binarization threshold of the frame (0-255).
+        """
+        self._file.write(pack_rows(frame_bytes) if self.packed else frame_bytes)
+        self.frame_count += 1
+        self.durations.append(duration_ms)
+        self.thresholds.append(threshold)
+
+    def write_frames(self, frames, durations=None, thresholds=None):
+        """
+        Appends several frames with a single write (and a single packing pass with a packed format).
+
+        Args:
+            frames: The frames back to back, a bytes-like object of frame_size bytes per frame
+                    (e.g. FrameStore.view()).
+            durations (list): Optional display duration of each frame in milliseconds (or None).
+            thresholds (list): Optional binarization threshold of each frame (or None).
+        """
+        rows = np.frombuffer(frames, dtype=np.uint8).reshape(-1, self.frame_size)
+        if not len(rows):
+            return
+        self._file.write(pack_rows(rows) if self.packed else frames)
+        self.frame_count += len(rows)
+        self.durations.extend(durations if durations is not None else [None] * len(rows))
+        self.thresholds.extend(thresholds if thresholds is not None else [None] * len(rows))
+
+    def close(self):
+        """
+        Writes the duration table (if any frame has a duration), the threshold table
+        (if every frame has a threshold) and the final header, then moves the file into place.
+        """
+        if self._file is None:
+            return
+        durations_offset = 0
+        if any(d is not None for d in self.durations):
+            durations_offset = self._file.tell()
+            # Frames without a duration fall back to 0 (= use the frame rate)
+            self._file.write(struct.pack(f"<{len(self.durations)}H",
+                                         *(min(max(int(d or 0), 0), 0xFFFF) for d in self.durations)))
+        thresholds_offset = 0
+        if self.thresholds and all(t is not None for t in self.thresholds):
+            thresholds_offset = self._file.tell()
+            self._file.write(bytes(min(max(int(t), 0), 0xFF) for t in self.thresholds))
+        self._file.seek(0)
+        self._file.write(self._pack_header(durations_offset, thresholds_offset))
+        self._file.close()
+        self._file = None
+        # Readers that have the old file mapped keep it until they are closed
+        os.replace(self.temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# --- Reading ---
+class ScriptReader:
+    """
+    Memory-maps a script file and gives zero-copy access to its frames.
+    Indexing returns a memoryview slice of the mapped file, so loading takes
+    the same time and memory no matter how many frames the file contains.
+    Frames of a packed frame format are unpacked in blocks of UNPACK_BLOCK_FRAMES
+    frames, one vectorized pass per block when a frame of it is first accessed,
+    and indexing returns slices of the unpacked block; frame_size is the size
+    after unpacking.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0  # 0 = legacy headerless file
+        self.frame_size = DEFAULT_FRAME_SIZE
+        self.frame_format = FRAME_FORMAT_RAW
+        self.packed = False
+        self.frame_rate = 0.0
+        self.black = None
+        self.white = None
+        self.threshold = None
+        self.start_frame = None
+        self.end_frame = None
+        self.fingerprint = b""
+        self.durations = None
+        self.threshold_mode = 0
+        self.threshold_window = 0
+        self.decode_flags = None  # Unknown for files before version 3
+        self.thresholds = None  # Per-frame thresholds of the sequence threshold analysis, if stored
+        self._file = open(path, "rb")
+        self._mmap = None
+        self._unpacked = OrderedDict()  # Block number -> unpacked frames of a packed frame format
+        self._view = memoryview(b"")
+        data_offset = 0
+        file_size = os.fstat(self._file.fileno()).st_size
+
+        if file_size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+
+        if file_size >= HEADER_SIZE_V1 and self._view[:4] == MAGIC:
+            (_, self.version, data_offset, self.frame_size, self.frame_format, frame_count, self.frame_rate,
+             self.black, self.white, self.threshold, self.start_frame, self.end_frame, durations_offset,
+             self.fingerprint) = struct.unpack_from(HEADER_FORMAT_V1, self._view)
+            if self.version > FORMAT_VERSION:
+                raise ValueError(f"Script file version {self.version} is newer than supported ({FORMAT_VERSION}).")
+            thresholds_offset = 0
+            if self.version >= 2:
+                thresholds_offset, self.threshold_mode, self.threshold_window = struct.unpack_from(
+                    HEADER_EXTENSION_FORMAT, self._view, HEADER_SIZE_V1)
+            if self.version >= 3:
+                self.decode_flags, = struct.unpack_from(HEADER_EXTENSION_V3_FORMAT, self._view, HEADER_SIZE_V2)
+            if durations_offset:
+                self.durations = self._view[durations_offset:durations_offset + 2 * frame_count].cast('H')
+            if thresholds_offset:
+                self.thresholds = self._view[thresholds_offset:thresholds_offset + frame_count]
+        else:
+            frame_count = file_size // self.frame_size
+            if file_size % self.frame_size:
+                print(f"Warning: {path} ends with an incomplete frame of {file_size % self.frame_size} bytes. Ignoring it.")
+
+        self.frame_count = frame_count
+        self._stored_size = self.frame_size
+        self._frames = self._view[data_offset:data_offset + frame_count * self._stored_size]
+        if self.frame_format in PACKED_FRAME_FORMATS.values():
+            self.packed = True
+            self.frame_size = self._stored_size * 8 // ROW_BITS
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.frame_count))]
+        if index < 0:
+            index += self.frame_count
+        if not 0 <= index < self.frame_count:
+            raise IndexError("frame index out of range")
+        if self.packed:
+            block, offset = divmod(index, UNPACK_BLOCK_FRAMES)
+            start = offset * self.frame_size
+            return self._unpacked_block(block)[start:start + self.frame_size]
+        start = index * self.frame_size
+        return self._frames[start:start + self.frame_size]
+
+    def _unpacked_block(self, block):
+        """Returns the frames of a block unpacked back to back (read-only), unpacking them on first use."""
+        frames = self._unpacked.get(block)
+        if frames is not None:
+            self._unpacked.move_to_end(block)
+            return frames
+        first = block * UNPACK_BLOCK_FRAMES
+        count = min(UNPACK_BLOCK_FRAMES, self.frame_count - first)
+        packed = np.frombuffer(self._frames[first * self._stored_size:(first + count) * self._stored_size],
+                               dtype=np.uint8).reshape(count, self._stored_size)
+        frames = memoryview(unpack_rows(packed, self.frame_size).reshape(-1)).toreadonly()
+        self._unpacked[block] = frames
+        if len(self._unpacked) > UNPACKED_BLOCKS_KEPT:
+            self._unpacked.popitem(last=False)  # Frames handed out before keep their block alive
+        return frames
+
+    def __iter__(self):
+        for index in range(self.frame_count):
+            yield self[index]
+
+    def preload(self):
+        """
+        Asks the operating system to read the whole file into memory in the background,
+        and unpacks the first block of a packed frame format, so playback starts without delay.
+        """
+        if self._mmap is not None and hasattr(mmap, "MADV_WILLNEED"):
+            self._mmap.madvise(mmap.MADV_WILLNEED)
+        if self.packed and self.frame_count:
+            self._unpacked_block(0)
+
+    def frame_duration(self, index):
+        """Returns the stored duration of a frame in milliseconds, or None if unknown."""
+        if self.durations is None or not self.durations[index]:
+            return None
+        return self.durations[index]
+
+    def close(self):
+        """Unmaps the file. Frames returned earlier must no longer be used."""
+        self._unpacked.clear()
+        self._frames.release()
+        if self.durations is not None:
+            self.durations.release()
+        if self.thresholds is not None:
+            self.thresholds.release()
+        self._view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Frame views are still referenced, the mapping is freed with them
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,378 @@
+import numpy as np
+
+# --- Serial Frame Encoding ---
+# Every frame payload sent to the Arduino starts with a single frame type byte.
+#
+# Keyframe:   'K' + 64 bytes (8 custom characters * 8 rows, same layout as convert()).
+# Delta frame: 'D' + character mask (bit n set = character n changed), then for every
+#              changed character, in ascending order: a row mask (bit r set = row r changed)
+#              followed by the new value of each changed row, in ascending row order.
+#
+# A delta frame with an empty character mask ('D', 0x00) is a valid "nothing changed" frame.
+# The Arduino sketch (ino/ino.ino) applies the frame to its copy of the CGRAM data and only
+# rewrites the custom characters that changed. Keyframes and delta frames show the 8 custom
+# characters as a 4x2 block in the middle of the display.
+#
+# Glyph frame: 'G' + glyph mask, then for every changed custom character a row mask and the
+#              changed rows (like a delta frame), followed by the cell map: 16 bytes holding
+#              one 4-bit code for each of the 32 character cells of the display (row by row,
+#              the even cell in the low nibble). Codes 0-7 show a custom character,
+#              GLYPH_CODE_BLANK and GLYPH_CODE_FULL the blank and full block of the LCD's
+#              character ROM. Glyph frames use the whole display (see GlyphDictionary.py).
+#              A glyph frame that rewrites every row of every custom character is
+#              self-contained, like a keyframe.
+#
+# Packed rows: only the low 5 bits of a row are pixels. Boards with CAPABILITY_PACKED_ROWS
+# (see the startup handshake) also accept each frame type with its rows packed into 5 bits,
+# most significant bit first, without gaps (see pack_rows()):
+#   'k' + 40 bytes (the 64 rows of a keyframe)
+#   'd' + character mask + the row masks of the changed characters + the changed rows, packed
+#   'g' + glyph mask + the row masks of the changed glyphs + the changed rows, packed + cell map
+# The packed rows end with zero bits up to a whole byte. A keyframe shrinks from 65 to 41 bytes.
+#
+# --- Packet Framing ---
+# Each payload travels in a packet:
+#
+#   START_MARKER (0xA5), sequence (0-63), payload length (1-90), payload, checksum
+#
+# The checksum is the CRC-8 (polynomial 0x07, initial value 0) of the sequence, length and
+# payload bytes. Unlike a sum, it detects every error burst of up to 8 bits, every odd number
+# of flipped bits and swapped bytes, so a corrupted frame is never displayed.
+# The Arduino answers every packet with a single byte:
+#   ACK_FLAG | sequence             the frame was displayed
+#   ACK_FLAG | NAK_FLAG | sequence  the frame was rejected (bad checksum or length,
+#                                   malformed payload, or a delta or partial glyph frame
+#                                   whose sequence does not follow the last displayed frame
+#                                   of the same kind)
+#
+# Resynchronization: after a bad packet the Arduino looks for the next START_MARKER in the
+# bytes it already received, and drops a half-received packet when no byte follows within
+# PACKET_TIMEOUT_MS. Delta frames are only applied on top of the frame they were encoded
+# against, so after a rejected or lost frame the host sends a keyframe (or a complete glyph
+# frame), which is accepted with any sequence number. The display never shows a frame built on a missing delta.
+# A lost frame is either skipped or sent again as a keyframe (see LOST_FRAME_POLICY in main.py).
+#
+# --- Startup Handshake ---
+# Once the LCD is initialized, the sketch announces itself with a line of ASCII text:
+#
+#   "READY <protocol version> <capabilities>\n"    e.g. "READY 2 7"
+#
+# and sends the same line again whenever it receives READY_QUERY while waiting for a start
+# marker. The host waits for this line instead of sleeping for a fixed time, and sends
+# READY_QUERY now and then, so a board that was not reset when the port was opened (and
+# therefore does not announce itself) answers right away. A bootloader that receives the
+# query bytes simply starts the sketch. The text never has ACK_FLAG set, so it cannot be
+# mistaken for an answer byte.
+
+# --- Constants ---
+FRAME_TYPE_KEY = ord('K')
+FRAME_TYPE_DELTA = ord('D')
+FRAME_TYPE_GLYPH = ord('G')
+FRAME_TYPE_KEY_PACKED = ord('k')
+FRAME_TYPE_DELTA_PACKED = ord('d')
+FRAME_TYPE_GLYPH_PACKED = ord('g')
+# Lowercase frame types (PACKED_FRAME_TYPE_MIN and above) carry packed rows, the frame type
+# minus the offset is the unpacked one
+PACKED_FRAME_TYPE_MIN = ord('a')
+PACKED_FRAME_TYPE_OFFSET = ord('a') - ord('A')
+
+# Number of custom characters and rows per character in a frame
+FRAME_CHARS = 8
+CHAR_ROWS = 8
+BYTES_PER_FRAME = FRAME_CHARS * CHAR_ROWS  # Should be 64
+# Pixels per row (the low bits of a row byte), and a frame with its rows packed
+ROW_BITS = 5
+PACKED_FRAME_BYTES = BYTES_PER_FRAME * ROW_BITS // 8  # Should be 40
+
+# Glyph frames: character cells of the display and their codes in the cell map
+GLYPH_CELLS = 32  # 16 columns * 2 rows
+GLYPH_MAP_BYTES = GLYPH_CELLS // 2  # Two 4-bit codes per byte
+GLYPH_CODE_BLANK = 8  # ROM character 0x20 (space)
+GLYPH_CODE_FULL = 9  # ROM character 0xFF (all pixels set)
+# A complete glyph frame: type, glyph mask, a full row mask and 8 rows per character, cell map
+MAX_GLYPH_PAYLOAD_BYTES = 2 + FRAME_CHARS * (1 + CHAR_ROWS) + GLYPH_MAP_BYTES  # Should be 90
+
+# Packet framing
+START_MARKER = 0xA5
+SEQUENCE_MASK = 0x3F  # Sequence numbers count from 0 to 63 and wrap around
+ACK_FLAG = 0x80  # Set in every answer byte from the Arduino
+NAK_FLAG = 0x40  # Set in the answer to a rejected packet
+MAX_PAYLOAD_BYTES = MAX_GLYPH_PAYLOAD_BYTES  # A complete glyph frame
+FRAMING_OVERHEAD_BYTES = 4  # Start marker, sequence, length and checksum
+# The Arduino drops a half-received packet after this long without a byte
+PACKET_TIMEOUT_MS = 20
+# Generator polynomial of the packet checksum (CRC-8, x^8 + x^2 + x + 1)
+CRC8_POLYNOMIAL = 0x07
+
+# Startup handshake
+PROTOCOL_VERSION = 2  # 1: sum checksum, 2: CRC-8
+READY_PREFIX = b"READY "
+READY_QUERY = ord('?')
+CAPABILITY_BLOCK_FRAMES = 0x01  # Keyframes and delta frames
+CAPABILITY_GLYPH_FRAMES = 0x02  # Glyph frames (the whole display)
+CAPABILITY_PACKED_ROWS = 0x04  # Frame types with packed rows ('k', 'd', 'g')
+# The host repeats READY_QUERY this often until the sketch answers
+READY_QUERY_INTERVAL_SECONDS = 0.1
+
+# Supported values for the FRAME_ENCODING setting in main.py
+ENCODING_FULL = "full"
+ENCODING_DELTA = "delta"
+# Supported values for the LOST_FRAME_POLICY setting in main.py
+LOST_FRAME_SKIP = "skip"
+LOST_FRAME_RETRANSMIT = "retransmit"
+
+
+# --- Row Packing ---
+def pack_rows(rows):
+    """
+    Packs rows into ROW_BITS bits each, most significant bit first. The last byte is
+    filled up with zero bits. Higher bits of a row are dropped.
+
+    Args:
+        rows: The row bytes (bytes-like), or a numpy array of rows; a 2D array packs every
+              frame (row of the array) separately.
+
+    Returns:
+        numpy.ndarray: The packed bytes, (N, 40) for (N, 64) frames.
+    """
+    if not isinstance(rows, np.ndarray):
+        rows = np.frombuffer(bytes(rows), dtype=np.uint8)
+    bits = np.unpackbits(rows[..., None], axis=-1)[..., 8 - ROW_BITS:]
+    return np.packbits(bits.reshape(rows.shape[:-1] + (-1,)), axis=-1)
+
+
+def unpack_rows(packed, count):
+    """
+    Unpacks rows packed by pack_rows().
+
+    Args:
+        packed: The packed bytes (bytes-like), or a numpy array with one packed frame per row.
+        count (int): Number of rows per frame.
+
+    Returns:
+        numpy.ndarray: The row bytes, (N, count) for (N, packed bytes) frames.
+    """
+    if not isinstance(packed, np.ndarray):
+        packed = np.frombuffer(packed, dtype=np.uint8)
+    bits = np.unpackbits(packed, axis=-1)[..., :count * ROW_BITS]
+    # Every row becomes a byte with 3 zero bits at the end, shifted down into place
+    return np.packbits(bits.reshape(packed.shape[:-1] + (count, ROW_BITS)), axis=-1)[..., 0] >> (8 - ROW_BITS)
+
+
+# --- Encoding Functions ---
+def encode_keyframe(frame, packed=False):
+    """
+    Encodes a complete frame.
+
+    Args:
+        frame (bytes): The 64 bytes of custom character data.
+        packed (bool): Pack the rows (CAPABILITY_PACKED_ROWS).
+
+    Returns:
+        bytes: The keyframe payload (65 bytes, 41 packed).
+    """
+    if packed:
+        return bytes((FRAME_TYPE_KEY_PACKED,)) + pack_rows(frame).tobytes()
+    return bytes((FRAME_TYPE_KEY,)) + bytes(frame)
+
+
+def encode_delta(frame, previous, packed=False):
+    """
+    Encodes only the rows of frame that differ from previous.
+
+    Args:
+        frame (bytes): The 64 bytes of the new frame.
+        previous (bytes): The 64 bytes the Arduino is currently displaying.
+        packed (bool): Pack the rows (CAPABILITY_PACKED_ROWS).
+
+    Returns:
+        bytes: The delta frame payload (between 2 and 74 bytes, 50 packed).
+    """
+    frame_type = FRAME_TYPE_DELTA_PACKED if packed else FRAME_TYPE_DELTA
+    return bytes((frame_type,)) + _encode_changed_rows(frame, previous, packed)
+
+
+def _encode_changed_rows(frame, previous, packed=False):
+    """
+    Encodes the character mask, then the row mask and changed rows of every changed character,
+    or with packed rows all row masks first and then all changed rows, packed.
+    """
+    char_mask = 0
+    masks = bytearray()
+    body = bytearray()
+    for char_index in range(FRAME_CHARS):
+        base = char_index * CHAR_ROWS
+        row_mask = 0
+        changed_rows = bytearray()
+        for row in range(CHAR_ROWS):
+            if previous is None or frame[base + row] != previous[base + row]:
+                row_mask |= 1 << row
+                changed_rows.append(frame[base + row])
+        if row_mask:
+            char_mask |= 1 << char_index
+            if packed:
+                masks.append(row_mask)
+            else:
+                body.append(row_mask)
+            body += changed_rows
+    if packed:
+        return bytes((char_mask,)) + bytes(masks) + pack_rows(body).tobytes()
+    return bytes((char_mask,)) + bytes(body)
+
+
+def encode_glyph_frame(glyphs, cell_map, previous=None, packed=False):
+    """
+    Encodes the custom characters and the cell map of a full display frame.
+
+    Args:
+        glyphs (bytes): The 64 bytes of the 8 custom characters.
+        cell_map (sequence): 32 codes (0-7, GLYPH_CODE_BLANK or GLYPH_CODE_FULL), one per cell.
+        previous (bytes): The 64 bytes of custom character data the Arduino currently has,
+                          or None to send every row (a self-contained frame).
+        packed (bool): Pack the rows (CAPABILITY_PACKED_ROWS).
+
+    Returns:
+        bytes: The glyph frame payload (between 18 and 90 bytes, 66 packed).
+    """
+    packed_map = bytes(cell_map[n] | cell_map[n + 1] << 4 for n in range(0, GLYPH_CELLS, 2))
+    frame_type = FRAME_TYPE_GLYPH_PACKED if packed else FRAME_TYPE_GLYPH
+    return bytes((frame_type,)) + _encode_changed_rows(glyphs, previous, packed) + packed_map
+
+
+def _crc8_table():
+    """Returns the CRC-8 (polynomial CRC8_POLYNOMIAL) of every byte value."""
+    table = []
+    for value in range(256):
+        for _ in range(8):
+            value = ((value << 1) ^ CRC8_POLYNOMIAL if value & 0x80 else value << 1) & 0xFF
+        table.append(value)
+    return bytes(table)
+
+
+_CRC8_TABLE = _crc8_table()
+
+
+def checksum(data):
+    """Returns the CRC-8 of the bytes in data (the packet checksum)."""
+    crc = 0
+    for value in data:
+        crc = _CRC8_TABLE[crc ^ value]
+    return crc
+
+
+def frame_packet(sequence, payload):
+    """
+    Wraps a frame payload in a packet.
+
+    Args:
+        sequence (int): The sequence number (0-63).
+        payload (bytes): A keyframe or delta frame.
+
+    Returns:
+        bytes: The packet to write to the serial port.
+    """
+    header = bytes((sequence & SEQUENCE_MASK, len(payload)))
+    return bytes((START_MARKER,)) + header + payload + bytes((checksum(header + payload),))
+
+
+def ready_message(version=PROTOCOL_VERSION,
+                  capabilities=CAPABILITY_BLOCK_FRAMES | CAPABILITY_GLYPH_FRAMES | CAPABILITY_PACKED_ROWS):
+    """Returns the line the sketch sends when it is ready."""
+    return READY_PREFIX + f"{version} {capabilities}\n".encode()
+
+
+def parse_ready_message(data):
+    """
+    Looks for a complete READY line in bytes received from the Arduino.
+
+    Args:
+        data (bytes): The received bytes (answer bytes and other text may surround the line).
+
+    Returns:
+        tuple: (protocol version, capabilities), or None if data holds no complete READY line.
+    """
+    start = data.rfind(READY_PREFIX)
+    while start >= 0:
+        end = data.find(b"\n", start)
+        if end >= 0:
+            try:
+                version, capabilities = data[start + len(READY_PREFIX):end].split()
+                return int(version), int(capabilities)
+            except ValueError:
+                pass  # A garbled line, an earlier one may still be intact
+        start = data.rfind(READY_PREFIX, 0, start)
+    return None
+
+
+def parse_answer(value):
+    """
+    Decodes an answer byte from the Arduino.
+
+    Args:
+        value (int): The received byte.
+
+    Returns:
+        tuple: (sequence, accepted), or None if the byte is not an answer.
+    """
+    if not value & ACK_FLAG:
+        return None
+    return value & SEQUENCE_MASK, not value & NAK_FLAG
+
+
+class FrameEncoder:
+    """
+    Keeps track of the last frame sent to the Arduino and encodes each new frame
+    either as a keyframe or as a delta against it.
+    """
+
+    def __init__(self, encoding=ENCODING_DELTA, keyframe_interval=0):
+        """
+        Args:
+            encoding (str): ENCODING_DELTA to send only changed rows, or ENCODING_FULL
+                            to send every frame as a keyframe.
+            keyframe_interval (int): Force a keyframe every N frames in delta mode
+                                     (0 = only when required).
+        """
+        self.encoding = encoding
+        self.keyframe_interval = keyframe_interval
+        self.previous = None
+        self.frames_since_keyframe = 0
+        self.sequence = 0  # Sequence number of the next packet, continues across resets
+        self.packed_rows = False  # Send packed rows, once the board reported CAPABILITY_PACKED_ROWS
+
+    def reset(self):
+        """Forgets the last sent frame, so the next frame is sent as a keyframe."""
+        self.previous = None
+
+    def encode(self, frame):
+        """
+        Encodes a frame for sending and records it as the Arduino's new state.
+
+        Args:
+            frame (bytes): The 64 bytes of custom character data.
+
+        Returns:
+            bytes: The frame payload, to be wrapped with frame_packet().
+        """
+        packet = None
+        if (self.encoding == ENCODING_DELTA and self.previous is not None
+                and (self.keyframe_interval <= 0 or self.frames_since_keyframe < self.keyframe_interval)):
+            packet = encode_delta(frame, self.previous, self.packed_rows)
+            # A delta touching every row is larger than a keyframe
+            if len(packet) > 1 + (PACKED_FRAME_BYTES if self.packed_rows else BYTES_PER_FRAME):
+                packet = None
+
+        if packet is None:
+            packet = encode_keyframe(frame, self.packed_rows)
+            self.frames_since_keyframe = 0
+        else:
+            self.frames_since_keyframe += 1
+
+        self.previous = bytes(frame)
+        return packet
+
+    def next_sequence(self):
+        """Returns the sequence number for the next packet and advances it."""
+        sequence = self.sequence
+        self.sequence = (sequence + 1) & SEQUENCE_MASK
+        return sequence
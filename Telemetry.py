@@ -0,0 +1,172 @@
+import csv
+import json
+from array import array
+
+import numpy as np
+
+# --- Per-Frame Telemetry ---
+# Records how long each stage of the pipeline takes for every frame, to find out where
+# playback stutters: decoding or converting on the host, writing to the serial port, or
+# the Arduino updating the LCD before it acknowledges the frame.
+#
+# Every stage keeps its most recent timings in a fixed-size ring buffer, preallocated so
+# that recording a timing is only two array stores. Percentiles and histograms are only
+# computed when a report is requested.
+
+# --- Constants ---
+# Stages recorded by main.py
+STAGE_DECODE = "decode"  # Opening and decoding a source image
+STAGE_CONVERT = "convert"  # convert() of a decoded image
+STAGE_INGEST_WAIT = "ingest_wait"  # Waiting for a chunk of frames from the worker processes
+STAGE_WRITE = "write"  # ser.write() of a frame packet
+STAGE_ACK = "ack"  # From the start of the write until the acknowledgement arrived
+# Counters recorded by main.py
+COUNTER_TIMEOUT = "timeouts"  # No answer within the serial timeout
+COUNTER_UNEXPECTED = "unexpected_responses"  # A byte that is not an answer to a frame in flight
+COUNTER_REJECTED = "rejected_frames"  # Frames the Arduino answered with a NAK
+COUNTER_MISSED = "missed_frames"  # Frames without an answer, skipped by the answer to a later frame
+COUNTER_RESYNC = "resyncs"  # Encoder resets after a lost frame (the next frame is a keyframe)
+COUNTER_RETRANSMITTED = "retransmitted_frames"  # Lost frames sent again (LOST_FRAME_POLICY = "retransmit")
+
+PERCENTILES = (50, 95, 99)
+# Upper bounds of the histogram buckets in milliseconds (powers of two), the last bucket is open
+HISTOGRAM_BOUNDS_MS = tuple(2.0 ** e for e in range(-4, 11))  # 0.0625 ms ... 1024 ms
+
+
+class RingBuffer:
+    """A fixed-size buffer of (frame index, seconds) samples that overwrites the oldest sample."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.frames = array('q', [0]) * capacity
+        self.seconds = array('d', [0.0]) * capacity
+        self.total = 0  # Number of samples ever added
+
+    def add(self, frame, seconds):
+        index = self.total % self.capacity
+        self.frames[index] = frame
+        self.seconds[index] = seconds
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def samples(self):
+        """Returns the stored (frames, seconds) as arrays, oldest first."""
+        count = len(self)
+        frames = np.frombuffer(self.frames, dtype=np.int64)
+        seconds = np.frombuffer(self.seconds, dtype=np.float64)
+        if self.total <= self.capacity:
+            return frames[:count].copy(), seconds[:count].copy()
+        start = self.total % self.capacity
+        return np.roll(frames, -start), np.roll(seconds, -start)
+
+
+class Telemetry:
+    """Per-stage timing ring buffers and event counters."""
+
+    def __init__(self, capacity=4096):
+        """
+        Args:
+            capacity (int): Number of most recent samples kept per stage.
+        """
+        self.capacity = capacity
+        self.stages = {}
+        self.counters = {}
+
+    def record(self, stage, frame, seconds):
+        """
+        Records the duration of a stage for one frame.
+
+        Args:
+            stage (str): The stage name, e.g. STAGE_WRITE.
+            frame (int): The source frame index.
+            seconds (float): The measured duration.
+        """
+        buffer = self.stages.get(stage)
+        if buffer is None:
+            buffer = self.stages[stage] = RingBuffer(self.capacity)
+        buffer.add(frame, seconds)
+
+    def count(self, counter, amount=1):
+        """Increments an event counter, e.g. COUNTER_TIMEOUT."""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reset(self):
+        """Discards all samples and counters."""
+        self.stages.clear()
+        self.counters.clear()
+
+    def summary(self):
+        """
+        Computes statistics of the stored samples of every stage.
+
+        Returns:
+            dict: Per stage: total sample count, stored samples, mean, max and the
+                  PERCENTILES in milliseconds, and the histogram bucket counts.
+        """
+        result = {}
+        for stage, buffer in self.stages.items():
+            _, seconds = buffer.samples()
+            if not len(seconds):
+                continue
+            milliseconds = seconds * 1000.0
+            stats = {"total": buffer.total, "samples": len(milliseconds),
+                     "mean_ms": float(milliseconds.mean()), "max_ms": float(milliseconds.max())}
+            for p, value in zip(PERCENTILES, np.percentile(milliseconds, PERCENTILES)):
+                stats[f"p{p}_ms"] = float(value)
+            counts = np.bincount(np.searchsorted(HISTOGRAM_BOUNDS_MS, milliseconds),
+                                 minlength=len(HISTOGRAM_BOUNDS_MS) + 1)
+            stats["histogram"] = {label: int(n) for label, n in zip(histogram_labels(), counts)}
+            result[stage] = stats
+        return result
+
+    def report(self):
+        """Returns a printable table of the stage percentiles and the counters."""
+        summary = self.summary()
+        if not summary and not self.counters:
+            return "No telemetry recorded."
+        lines = [f"{'stage':<12} {'samples':>8} {'mean':>9} " + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+                 + f" {'max':>9}  (ms)"]
+        for stage, stats in summary.items():
+            lines.append(f"{stage:<12} {stats['samples']:>8} {stats['mean_ms']:>9.3f} "
+                         + " ".join(f"{stats[f'p{p}_ms']:>9.3f}" for p in PERCENTILES) + f" {stats['max_ms']:>9.3f}")
+        if self.counters:
+            lines.append(", ".join(f"{name}: {value}" for name, value in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def export(self, path):
+        """
+        Writes the stored samples to a file: CSV (stage, frame, milliseconds per row)
+        or, if the path ends with ".json", the summary, counters and samples as JSON.
+
+        Returns:
+            bool: True on success.
+        """
+        try:
+            if path.lower().endswith(".json"):
+                samples = {}
+                for stage, buffer in self.stages.items():
+                    frames, seconds = buffer.samples()
+                    samples[stage] = {"frames": frames.tolist(), "ms": (seconds * 1000.0).tolist()}
+                with open(path, "w") as f:
+                    json.dump({"summary": self.summary(), "counters": self.counters, "samples": samples}, f, indent=1)
+            else:
+                with open(path, "w", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(["stage", "frame", "ms"])
+                    for stage, buffer in self.stages.items():
+                        frames, seconds = buffer.samples()
+                        writer.writerows((stage, int(frame), f"{value * 1000.0:.4f}")
+                                         for frame, value in zip(frames, seconds))
+            return True
+        except OSError as e:
+            print(f"Error writing telemetry to {path}: {e}")
+            return False
+
+
+def histogram_labels():
+    """Returns the labels of the histogram buckets, e.g. "<=0.5ms" and ">1024ms"."""
+    labels = [f"<={bound:g}ms" for bound in HISTOGRAM_BOUNDS_MS]
+    labels.append(f">{HISTOGRAM_BOUNDS_MS[-1]:g}ms")
+    return labels
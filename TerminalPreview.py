@@ -0,0 +1,77 @@
+import sys
+import threading
+
+from ImageToDigit import frame_to_pixels, render_pixels, LAYOUT_BLOCK, LAYOUT_SIZES, WHITE
+
+# --- Terminal Preview ---
+# Draws the frames that the Arduino displayed in the console, on a background thread, so
+# the preview never slows down the conversion or the serial playback. The sender hands
+# over each acknowledged frame with show(), which only stores it: the thread renders the
+# newest frame into one string and writes it with a single call. Frames that arrive while
+# the terminal is still busy with the previous one replace each other, so a slow terminal
+# skips preview frames instead of holding up playback.
+
+
+class TerminalPreview:
+    """Renders the newest shown frame in the console on a background thread."""
+
+    def __init__(self, layout=LAYOUT_BLOCK, white=WHITE, stream=None):
+        """
+        Args:
+            layout (str): Layout of the frames (LAYOUT_BLOCK or LAYOUT_FULL).
+            white (int): Value of white pixels in the frames.
+            stream: Text stream to draw on, defaults to sys.stdout.
+        """
+        self.layout = layout
+        self.white = white
+        self.stream = stream if stream is not None else sys.stdout
+        self.frames_drawn = 0
+        self.frames_skipped = 0  # Frames replaced by a newer one before they were drawn
+        self._pending = None
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="TerminalPreview", daemon=True)
+
+    def start(self):
+        """Starts the drawing thread."""
+        self._thread.start()
+        return self
+
+    def show(self, frame):
+        """
+        Hands over a frame to be drawn. Returns at once, without rendering.
+
+        Args:
+            frame: The bytes of the frame (LAYOUT_FRAME_BYTES[layout]).
+        """
+        frame = bytes(frame)  # The caller's buffer may be reused or unmapped
+        with self._condition:
+            if self._pending is not None:
+                self.frames_skipped += 1
+            self._pending = frame
+            self._condition.notify()
+
+    def stop(self):
+        """Draws the last pending frame and stops the thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        width, height = LAYOUT_SIZES[self.layout]
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopping:
+                    self._condition.wait()
+                frame, self._pending = self._pending, None
+            if frame is None:
+                return
+            try:
+                self.stream.write(render_pixels(frame_to_pixels(frame, self.layout), width, height, self.white))
+                self.stream.flush()
+                self.frames_drawn += 1
+            except (OSError, ValueError) as e:
+                print(f"\nWarning: Terminal preview stopped: {e}")
+                return
@@ -0,0 +1,146 @@
+import numpy as np
+
+# --- Sequence Threshold Analysis ---
+# With COLOR_BINARIZATION_THRESHOLD = -1, every frame is binarized at a threshold derived
+# from its brightness. Binarizing each frame at its own mean adapts to dark and bright
+# scenes, but every brightness change (a fade, a flash, a bright object entering) moves the
+# threshold and makes the static parts of the picture flicker. The analysis modes look at
+# the whole sequence first: the 256-bin histograms of all frames are computed in one
+# vectorized pass, and the thresholds of all frames are derived from them:
+#
+#   "frame":    the mean of each frame on its own (no analysis pass).
+#   "global":   one Otsu threshold for the histogram of the whole sequence. Never flickers,
+#               but dark or bright scenes can end up nearly all black or all white.
+#   "otsu":     the Otsu threshold of each frame, which separates dark and bright pixels
+#               better than the mean when one of them covers most of the frame.
+#   "smoothed": the Otsu threshold of the summed histograms of the frames around each frame
+#               (a window of THRESHOLD_WINDOW_FRAMES), so it follows the scene brightness
+#               without jumping from frame to frame.
+#
+# The thresholds are stored in the script file, so converting the same frames again
+# reuses them instead of decoding the whole sequence for the analysis.
+
+# --- Constants ---
+THRESHOLD_MODE_FRAME = "frame"
+THRESHOLD_MODE_GLOBAL = "global"
+THRESHOLD_MODE_OTSU = "otsu"
+THRESHOLD_MODE_SMOOTHED = "smoothed"
+# Script files store the mode by its position in this tuple
+THRESHOLD_MODES = (THRESHOLD_MODE_FRAME, THRESHOLD_MODE_GLOBAL, THRESHOLD_MODE_OTSU, THRESHOLD_MODE_SMOOTHED)
+GRAY_LEVELS = 256
+
+_LEVELS = np.arange(GRAY_LEVELS, dtype=np.int64)
+
+
+# --- Histograms ---
+def gray_histograms(pixels_gray):
+    """
+    Counts the gray levels of every frame in one pass.
+
+    Args:
+        pixels_gray (numpy.ndarray): (N, pixels) uint8 grayscale frames (any trailing shape).
+
+    Returns:
+        numpy.ndarray: (N, 256) int64 pixel counts per gray level.
+    """
+    pixels_gray = np.asarray(pixels_gray, dtype=np.uint8).reshape(len(pixels_gray), -1)
+    # Offset the levels of frame n by n * 256, so one bincount() builds every histogram
+    offsets = np.arange(len(pixels_gray), dtype=np.int64)[:, None] * GRAY_LEVELS
+    counts = np.bincount((pixels_gray + offsets).reshape(-1), minlength=len(pixels_gray) * GRAY_LEVELS)
+    return counts.reshape(len(pixels_gray), GRAY_LEVELS)
+
+
+# --- Thresholds ---
+def mean_thresholds(histograms):
+    """
+    Returns the mean gray level of each histogram, rounded down like calculate_mean_grayscale().
+
+    Args:
+        histograms (numpy.ndarray): (N, 256) pixel counts.
+
+    Returns:
+        numpy.ndarray: (N,) int64 thresholds.
+    """
+    histograms = np.atleast_2d(histograms)
+    counts = np.maximum(histograms.sum(axis=1), 1)
+    return (histograms * _LEVELS).sum(axis=1) // counts
+
+
+def otsu_thresholds(histograms):
+    """
+    Finds the threshold of each histogram that maximizes the variance between the pixels
+    below it (black) and the pixels at or above it (white), Otsu's method.
+
+    Args:
+        histograms (numpy.ndarray): (N, 256) pixel counts.
+
+    Returns:
+        numpy.ndarray: (N,) int64 thresholds. A frame with a single gray level gets 0 (all white),
+                       like the mean threshold.
+    """
+    histograms = np.atleast_2d(histograms).astype(np.float64)
+    weighted = histograms * _LEVELS
+    # Pixels and level sums below each candidate threshold t = 0..255
+    weight_below = np.cumsum(histograms, axis=1) - histograms
+    sum_below = np.cumsum(weighted, axis=1) - weighted
+    weight_above = histograms.sum(axis=1, keepdims=True) - weight_below
+    sum_above = weighted.sum(axis=1, keepdims=True) - sum_below
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_difference = sum_below / weight_below - sum_above / weight_above
+        variance = weight_below * weight_above * mean_difference ** 2
+    return np.nan_to_num(variance).argmax(axis=1).astype(np.int64)
+
+
+def sequence_thresholds(histograms, mode=THRESHOLD_MODE_SMOOTHED, window=15):
+    """
+    Derives the threshold of every frame of a sequence from the histograms of all frames.
+
+    Args:
+        histograms (numpy.ndarray): (N, 256) pixel counts of the frames, in order.
+        mode (str): One of THRESHOLD_MODES.
+        window (int): Frames whose histograms are combined for THRESHOLD_MODE_SMOOTHED.
+
+    Returns:
+        numpy.ndarray: (N,) int64 thresholds (0-255), or None if the mode is unknown.
+    """
+    histograms = np.atleast_2d(histograms)
+    if mode == THRESHOLD_MODE_FRAME:
+        return mean_thresholds(histograms)
+    if mode == THRESHOLD_MODE_GLOBAL:
+        return np.repeat(otsu_thresholds(histograms.sum(axis=0)), len(histograms))
+    if mode == THRESHOLD_MODE_OTSU:
+        return otsu_thresholds(histograms)
+    if mode == THRESHOLD_MODE_SMOOTHED:
+        # Sum of the histograms in a centered window, from the running sums of all histograms
+        half = max(int(window), 1) // 2
+        running = np.concatenate((np.zeros((1, GRAY_LEVELS), dtype=np.int64), np.cumsum(histograms, axis=0)))
+        index = np.arange(len(histograms))
+        first = np.maximum(index - half, 0)
+        last = np.minimum(index + half + 1, len(histograms))
+        return otsu_thresholds(running[last] - running[first])
+    print(f"Error: Unknown threshold mode '{mode}'. Use one of {', '.join(THRESHOLD_MODES)}.")
+    return None
+
+
+def analyze_gray_frames(gray_frames, mode=THRESHOLD_MODE_SMOOTHED, window=15):
+    """
+    Runs the threshold analysis on the grayscale frames of a sequence.
+
+    Args:
+        gray_frames (list): Grayscale arrays of the frames in order (see image_to_grayscale_array()
+                            in ImageToDigit.py), None for frames that could not be read.
+        mode, window: Same as for sequence_thresholds().
+
+    Returns:
+        numpy.ndarray: (N,) int64 threshold of each frame (-1 for the frames that are None),
+                       or None if the mode is unknown.
+    """
+    thresholds = np.full(len(gray_frames), -1, dtype=np.int64)
+    valid = [n for n, gray in enumerate(gray_frames) if gray is not None]
+    if valid:
+        histograms = gray_histograms(np.stack([gray_frames[n] for n in valid]))
+        valid_thresholds = sequence_thresholds(histograms, mode, window)
+        if valid_thresholds is None:
+            return None
+        thresholds[valid] = valid_thresholds
+    return thresholds
@@ -0,0 +1,486 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter, strftime
+
+import numpy as np
+import serial
+import PIL
+from PIL import Image, ImageSequence
+
+import main
+from ArduinoEmulator import ArduinoEmulator
+from FrameStore import FrameStore
+from GifIndex import GifIndex, CHECKPOINT_INTERVAL
+from ImageToDigit import (convert, convert_batch, convert_image_files, image_to_grayscale_array,
+                          images_to_grayscale_array, TOTAL_BYTES_PER_FRAME)
+from ScriptFile import ScriptReader, ScriptWriter, FRAME_FORMAT_PACKED
+from SerialProtocol import FrameEncoder, ENCODING_FULL, ENCODING_DELTA
+
+# --- Benchmark Suite ---
+# Reproducible timings of the stages of the pipeline, written as JSON so results can be
+# compared across releases:
+#   convert  - convert() per-frame cost and convert_batch() throughput
+#   decode   - per-frame cost of high-resolution JPEG/PNG sources with and without FAST_DECODE
+#   ingest   - folder and GIF ingest throughput through main.process_source_frames()
+#   load     - script file (.bin) load time and peak memory, and collecting converted frames
+#              in a FrameStore compared with a list of bytes objects
+#   send     - end-to-end frames/sec of main.send_frames() against the Arduino emulator
+#
+# Every run uses the bundled "Bad Apple" frames and synthetic sequences generated from a
+# fixed random seed. Timings are the median of several repetitions.
+#
+# Usage: python benchmark.py [--output FILE] [--only convert,decode,ingest,load,send] [--quick]
+
+# --- Constants ---
+SCHEMA_VERSION = 1
+BENCHMARKS = ("convert", "decode", "ingest", "load", "send")
+DEFAULT_SOURCE_FOLDER = "Bad Apple"
+DEFAULT_OUTPUT = "benchmark_results.json"
+RANDOM_SEED = 1234
+# Size of the synthetic source images (roughly the size of the bundled frames)
+SYNTHETIC_SIZE = (160, 120)
+# Size of the high-resolution sources of the decode benchmark
+HIGH_RES_SIZE = (1920, 1080)
+
+
+# --- Helpers ---
+def median_seconds(function, repeat):
+    """Runs function() repeat times and returns the median duration in seconds."""
+    durations = []
+    for _ in range(repeat):
+        begin = perf_counter()
+        function()
+        durations.append(perf_counter() - begin)
+    return statistics.median(durations)
+
+
+def quietly(function, *args):
+    """Calls function(*args) with its console output discarded."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return function(*args)
+
+
+def load_source_images(folder, count):
+    """Decodes the first count numbered images of a folder into memory."""
+    names = sorted((f for f in os.listdir(folder) if os.path.splitext(f)[0].isdigit()),
+                   key=lambda f: int(os.path.splitext(f)[0]))[:count]
+    images = []
+    for name in names:
+        with Image.open(os.path.join(folder, name)) as img:
+            images.append(img.copy())
+    return images
+
+
+def synthetic_images(count, seed=RANDOM_SEED):
+    """
+    Generates a synthetic sequence: a bright disc moving over a noisy background.
+    The noise changes every frame, so delta encoding gains little (a worst case).
+    """
+    rng = np.random.default_rng(seed)
+    width, height = SYNTHETIC_SIZE
+    y, x = np.mgrid[0:height, 0:width]
+    images = []
+    for i in range(count):
+        pixels = rng.integers(0, 160, size=(height, width), dtype=np.uint8)
+        center_x = (i * 3) % width
+        disc = (x - center_x) ** 2 + (y - height // 2) ** 2 < (height // 4) ** 2
+        pixels[disc] = 255
+        images.append(Image.fromarray(pixels, "L"))
+    return images
+
+
+def environment():
+    """Describes the machine and library versions the results were measured with."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "pyserial": serial.__version__,
+        "git_commit": commit,
+    }
+
+
+@contextlib.contextmanager
+def main_config(**settings):
+    """Temporarily overrides configuration constants of main.py."""
+    previous = {name: getattr(main, name) for name in settings}
+    for name, value in settings.items():
+        setattr(main, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(main, name, value)
+
+
+# --- Benchmarks ---
+def benchmark_convert(source_images, synthetic, repeat):
+    """Measures convert() per frame and convert_batch() on the same frames."""
+    results = {}
+    for name, images in (("source", source_images), ("synthetic", synthetic)):
+        if not images:
+            continue
+        seconds = median_seconds(lambda: [convert(img, False, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                                  main.COLOR_BINARIZATION_THRESHOLD) for img in images], repeat)
+        gray = images_to_grayscale_array(images)
+        batch_seconds = median_seconds(lambda: convert_batch(gray, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                                             main.COLOR_BINARIZATION_THRESHOLD), repeat)
+        results[name] = {
+            "frames": len(images),
+            "convert_us_per_frame": seconds / len(images) * 1e6,
+            "convert_frames_per_second": len(images) / seconds,
+            # convert_batch() starts from decoded, resized grayscale frames
+            "convert_batch_us_per_frame": batch_seconds / len(images) * 1e6,
+            "convert_batch_frames_per_second": len(images) / batch_seconds,
+        }
+    return results
+
+
+def benchmark_decode(synthetic, frame_count, work_dir, repeat):
+    """
+    Measures opening and converting high-resolution JPEG and PNG files with and without
+    reduced-resolution decoding, and how far the fast grayscale frames are from the exact ones.
+    """
+    rng = np.random.default_rng(RANDOM_SEED)
+    width, height = HIGH_RES_SIZE
+    paths = {"jpeg": [], "png": []}
+    for n, img in enumerate(synthetic[:frame_count]):
+        # Smoothly upscaled, with fine grain so the decoder has real detail to work through
+        pixels = np.asarray(img.resize(HIGH_RES_SIZE, Image.Resampling.BICUBIC).convert('RGB'), dtype=np.int16)
+        pixels = pixels + rng.integers(-24, 25, size=(height, width, 1), dtype=np.int16)
+        large = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+        for extension, file_format in (("jpeg", "JPEG"), ("png", "PNG")):
+            path = os.path.join(work_dir, f"high_res_{n}.{extension}")
+            large.save(path, file_format)
+            paths[extension].append(path)
+
+    results = {"source_size": list(HIGH_RES_SIZE)}
+    for name, files in paths.items():
+        if not files:
+            continue
+        timings = {}
+        for fast_decode in (False, True):
+            timings[fast_decode] = median_seconds(
+                lambda: convert_image_files(files, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                            main.COLOR_BINARIZATION_THRESHOLD, main.DISPLAY_LAYOUT, fast_decode),
+                repeat) / len(files)
+        exact, fast = [], []
+        for path in files:
+            for fast_decode, frames in ((False, exact), (True, fast)):
+                with Image.open(path) as img:
+                    frames.append(image_to_grayscale_array(img, main.DISPLAY_LAYOUT, fast_decode))
+        difference = np.abs(np.stack(exact).astype(np.int16) - np.stack(fast))
+        exact_bytes = convert_image_files(files, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                          main.COLOR_BINARIZATION_THRESHOLD, main.DISPLAY_LAYOUT, False)
+        fast_bytes = convert_image_files(files, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                         main.COLOR_BINARIZATION_THRESHOLD, main.DISPLAY_LAYOUT, True)
+        differing_pixels = sum(bin(a ^ b).count("1") for exact_frame, fast_frame in zip(exact_bytes, fast_bytes)
+                               for a, b in zip(exact_frame, fast_frame))
+        results[name] = {
+            "frames": len(files),
+            "exact_ms_per_frame": timings[False] * 1000.0,
+            "fast_ms_per_frame": timings[True] * 1000.0,
+            "speedup": timings[False] / timings[True] if timings[True] else None,
+            "max_gray_difference": int(difference.max()),
+            "mean_gray_difference": float(difference.mean()),
+            # Pixels shown differently on the LCD after binarization
+            "differing_pixels_per_frame": differing_pixels / len(files),
+        }
+    return results
+
+
+def check_gif_index(work_dir):
+    """
+    Decodes a GIF through its frame index from every start frame and compares the frames with
+    decoding the whole file in order (ImageSequence). The GIF mixes grayscale and color frames
+    and is saved with optimize=True, so frames switch between the global and local palettes.
+
+    Returns:
+        dict: Frame, keyframe and checkpoint counts, and the frames that came out different.
+    """
+    gif_path = os.path.join(work_dir, "palettes.gif")
+    rng = np.random.default_rng(RANDOM_SEED)
+    width, height = SYNTHETIC_SIZE
+    frames = []
+    for n in range(3 * CHECKPOINT_INTERVAL):
+        # Full-range noise, so every frame covers the canvas without transparent pixels
+        pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        if n % 3 == 2:
+            frames.append(Image.fromarray(pixels, "RGB").quantize(64))
+        else:
+            frames.append(Image.fromarray(pixels[..., 0], "L"))
+    frames[0].save(gif_path, save_all=True, append_images=frames[1:], optimize=True, duration=33)
+    gif_index = GifIndex.build(gif_path)
+    with Image.open(gif_path) as img:
+        expected = [np.asarray(frame.convert("RGB")) for frame in ImageSequence.Iterator(img)]
+    mismatched = set()
+    for start in range(len(expected)):
+        try:
+            for n, frame, _ in gif_index.iterate_frames(gif_path, start, start + 2):
+                if not np.array_equal(np.asarray(frame.convert("RGB")), expected[n]):
+                    mismatched.add(n)
+        except (OSError, ValueError):
+            mismatched.add(start)
+    return {
+        "frames": len(expected),
+        "keyframes": len(set(gif_index.keyframes)),
+        "checkpoints": len(gif_index.checkpoints),
+        "mismatched_frames": len(mismatched),
+    }
+
+
+def benchmark_ingest(source_folder, frame_count, synthetic, work_dir, repeat):
+    """Measures main.process_source_frames() for a folder and a GIF, serially, in parallel and cached."""
+    script_path = os.path.join(work_dir, "ingest.bin")
+    cache_path = os.path.join(work_dir, "ingest_cache.sqlite")
+    gif_path = os.path.join(work_dir, "synthetic.gif")
+    synthetic[0].save(gif_path, save_all=True, append_images=synthetic[1:], duration=33, loop=0)
+
+    def ingest(source):
+        return quietly(lambda: sum(1 for _ in main.process_source_frames(source, script_path)))
+
+    cases = []
+    if source_folder:
+        cases += [
+            ("folder_serial", source_folder, {"INGEST_WORKERS": 1, "ENABLE_FRAME_CACHE": False}),
+            ("folder_parallel", source_folder, {"INGEST_WORKERS": 0, "ENABLE_FRAME_CACHE": False}),
+            ("folder_cached", source_folder, {"INGEST_WORKERS": 1, "ENABLE_FRAME_CACHE": True}),
+        ]
+    cases += [
+        ("gif_serial", gif_path, {"INGEST_WORKERS": 1, "ENABLE_FRAME_CACHE": False}),
+        ("gif_parallel", gif_path, {"INGEST_WORKERS": 0, "ENABLE_FRAME_CACHE": False}),
+    ]
+
+    results = {}
+    for name, source, settings in cases:
+        with main_config(START_FRAME_INDEX=0, END_FRAME_INDEX=frame_count, ENABLE_PRINTOUT=False,
+                         FRAME_CACHE_PATH=cache_path, **settings):
+            if settings["ENABLE_FRAME_CACHE"]:
+                ingest(source)  # Fill the cache, the measured runs only read from it
+            frames = ingest(source)
+            seconds = median_seconds(lambda: ingest(source), repeat)
+        results[name] = {
+            "frames": frames,
+            "workers": main.resolve_worker_count(settings["INGEST_WORKERS"]),
+            "seconds": seconds,
+            "frames_per_second": frames / seconds if seconds else None,
+        }
+    # Random access into a GIF must decode the same frames as reading it from the start
+    results["gif_index_check"] = check_gif_index(work_dir)
+    return results
+
+
+def benchmark_load(frame_count, work_dir, repeat):
+    """
+    Measures opening a script file and reading every frame, compared with reading it into a list
+    and with a script file of packed frames. Also measures collecting converted frames in a
+    FrameStore instead of a list of bytes objects, and writing them with one bulk write.
+    """
+    script_path = os.path.join(work_dir, "load.bin")
+    packed_script_path = os.path.join(work_dir, "load_packed.bin")
+    rng = np.random.default_rng(RANDOM_SEED)
+    frames = rng.integers(0, 32, size=(frame_count, TOTAL_BYTES_PER_FRAME), dtype=np.uint8)
+    with ScriptWriter(script_path, 30) as writer, \
+            ScriptWriter(packed_script_path, 30, frame_format=FRAME_FORMAT_PACKED) as packed_writer:
+        for frame in frames:
+            writer.write(frame.tobytes())
+            packed_writer.write(frame.tobytes())
+
+    def open_reader():
+        ScriptReader(script_path).close()
+
+    def read_all_mapped(path=script_path):
+        with ScriptReader(path) as reader:
+            return sum(frame[0] for frame in reader)
+
+    def read_into_list():
+        # The way script files were loaded before they were memory-mapped
+        with open(script_path, "rb") as f:
+            data = f.read()
+        return [data[i:i + TOTAL_BYTES_PER_FRAME] for i in range(0, len(data), TOTAL_BYTES_PER_FRAME)]
+
+    def collect_into_list():
+        # The way converted frames were collected before the frame store
+        return [frame.tobytes() for frame in frames]
+
+    def collect_into_store():
+        frame_store = FrameStore(TOTAL_BYTES_PER_FRAME, frame_count)
+        frame_store.extend(frames)
+        return frame_store
+
+    frame_store = collect_into_store()
+    bulk_script_path = os.path.join(work_dir, "load_bulk.bin")
+
+    def write_per_frame():
+        with ScriptWriter(bulk_script_path, 30, frame_format=FRAME_FORMAT_PACKED) as writer:
+            for frame in frame_store:
+                writer.write(frame)
+
+    def write_bulk():
+        with ScriptWriter(bulk_script_path, 30, frame_format=FRAME_FORMAT_PACKED) as writer:
+            writer.write_frames(frame_store.view())
+
+    def peak_bytes(function):
+        tracemalloc.start()
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+        return peak
+
+    return {
+        "frames": frame_count,
+        "file_bytes": os.path.getsize(script_path),
+        "open_seconds": median_seconds(open_reader, repeat),
+        "read_all_seconds": median_seconds(read_all_mapped, repeat),
+        "open_peak_python_bytes": peak_bytes(lambda: ScriptReader(script_path)),
+        "list_load_seconds": median_seconds(read_into_list, repeat),
+        "list_load_peak_python_bytes": peak_bytes(read_into_list),
+        "packed_file_bytes": os.path.getsize(packed_script_path),
+        "packed_read_all_seconds": median_seconds(lambda: read_all_mapped(packed_script_path), repeat),
+        "collect_list_seconds": median_seconds(collect_into_list, repeat),
+        "collect_list_peak_python_bytes": peak_bytes(collect_into_list),
+        "collect_store_seconds": median_seconds(collect_into_store, repeat),
+        "collect_store_peak_python_bytes": peak_bytes(collect_into_store),
+        "packed_write_per_frame_seconds": median_seconds(write_per_frame, repeat),
+        "packed_write_bulk_seconds": median_seconds(write_bulk, repeat),
+    }
+
+
+def benchmark_send(frames, i2c_clock_hz):
+    """Measures main.send_frames() end to end against the Arduino emulator."""
+    results = {}
+    windows = sorted({1, main.FLOW_CONTROL_WINDOW})
+    for encoding, window, packed_rows in itertools.product((ENCODING_FULL, ENCODING_DELTA), windows, (False, True)):
+        with ArduinoEmulator(main.BAUDRATE, i2c_clock_hz, main.ARDUINO_RX_BUFFER_BYTES) as board:
+            with serial.Serial(board.port, main.BAUDRATE, timeout=1) as ser:
+                frame_encoder = FrameEncoder(encoding, 0)
+                frame_encoder.packed_rows = packed_rows
+                begin = perf_counter()
+                frames_sent, bytes_sent = quietly(main.send_frames, ser, frames, frame_encoder,
+                                                  window, main.ARDUINO_RX_BUFFER_BYTES)
+                seconds = perf_counter() - begin
+            # Every frame must have been displayed, with the same content
+            displayed_correctly = board.frames_received == frames_sent and bytes(board.cgram) == bytes(frames[-1])
+            results[f"{encoding}_window{window}{'_packed' if packed_rows else ''}"] = {
+                "frames": frames_sent,
+                "seconds": seconds,
+                "frames_per_second": frames_sent / seconds if seconds else None,
+                "bytes_per_frame": bytes_sent / frames_sent if frames_sent else None,
+                "lcd_busy_seconds": board.lcd_busy_seconds,
+                "overflow_bytes": board.overflow_bytes,
+                "displayed_correctly": displayed_correctly,
+            }
+    return results
+
+
+# --- Entry Point ---
+def run(only, source_folder, frame_count, synthetic_count, decode_frames, load_frames, send_count, repeat,
+        i2c_clock_hz):
+    """Runs the selected benchmarks and returns the results document."""
+    if source_folder and not os.path.isdir(source_folder):
+        print(f"Warning: Source folder '{source_folder}' not found. Only synthetic sequences are used.")
+        source_folder = None
+    source_images = load_source_images(source_folder, frame_count) if source_folder else []
+    synthetic = synthetic_images(synthetic_count)
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="lcd_benchmark_")
+    try:
+        if "convert" in only:
+            print("Benchmarking convert()...")
+            results["convert"] = benchmark_convert(source_images, synthetic, repeat)
+        if "decode" in only:
+            print("Benchmarking high-resolution decoding...")
+            results["decode"] = benchmark_decode(synthetic, decode_frames, work_dir, repeat)
+        if "ingest" in only:
+            print("Benchmarking ingest...")
+            results["ingest"] = benchmark_ingest(source_folder, frame_count, synthetic, work_dir, repeat)
+        if "load" in only:
+            print("Benchmarking script file loading...")
+            results["load"] = benchmark_load(load_frames, work_dir, repeat)
+        if "send" in only:
+            print("Benchmarking sending (Arduino emulator)...")
+            images = (source_images or synthetic)[:send_count]
+            frames = [bytes(convert(img, False, main.BLACK_PIXEL_VALUE, main.WHITE_PIXEL_VALUE,
+                                    main.COLOR_BINARIZATION_THRESHOLD)) for img in images]
+            results["send"] = {
+                "emulator_i2c_clock_hz": i2c_clock_hz,
+                "baudrate": main.BAUDRATE,
+                "cases": benchmark_send(frames, i2c_clock_hz),
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "parameters": {
+            "source_folder": source_folder,
+            "source_frames": len(source_images),
+            "synthetic_frames": synthetic_count,
+            "decode_frames": decode_frames,
+            "load_frames": load_frames,
+            "send_frames": send_count,
+            "repeat": repeat,
+            "random_seed": RANDOM_SEED,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the conversion, ingest, loading and sending stages.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSON result file (default {DEFAULT_OUTPUT})")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help=f"Comma-separated benchmarks to run (default {','.join(BENCHMARKS)})")
+    parser.add_argument("--source", default=DEFAULT_SOURCE_FOLDER, help="Image folder used as the real sequence")
+    parser.add_argument("--frames", type=int, default=1000, help="Frames taken from the source folder (default 1000)")
+    parser.add_argument("--synthetic-frames", type=int, default=300, help="Frames of the synthetic sequence (default 300)")
+    parser.add_argument("--decode-frames", type=int, default=30,
+                        help="High-resolution frames of the decode benchmark (default 30)")
+    parser.add_argument("--load-frames", type=int, default=100000, help="Frames of the script file loaded (default 100000)")
+    parser.add_argument("--send-frames", type=int, default=150, help="Frames sent to the emulator per case (default 150)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per timing, the median is reported (default 3)")
+    parser.add_argument("--i2c-clock", type=int, default=100000, help="I2C clock of the emulated LCD in Hz (default 100000)")
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a fast smoke run")
+    arguments = parser.parse_args()
+
+    selected = [name.strip() for name in arguments.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"Error: Unknown benchmark(s): {', '.join(unknown)}. Choose from {', '.join(BENCHMARKS)}.")
+        sys.exit(1)
+    if arguments.quick:
+        arguments.frames = min(arguments.frames, 100)
+        arguments.synthetic_frames = min(arguments.synthetic_frames, 50)
+        arguments.decode_frames = min(arguments.decode_frames, 5)
+        arguments.load_frames = min(arguments.load_frames, 10000)
+        arguments.send_frames = min(arguments.send_frames, 30)
+        arguments.repeat = 1
+
+    document = run(selected, arguments.source, arguments.frames, arguments.synthetic_frames, arguments.decode_frames,
+                   arguments.load_frames, arguments.send_frames, arguments.repeat, arguments.i2c_clock)
+    with open(arguments.output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(json.dumps(document["results"], indent=2))
+    print(f"Results saved to {arguments.output}")
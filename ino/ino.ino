@@ -4,11 +4,351 @@
 // Initialize the LCD object with the I2C address (0x27), 16 columns, and 2 rows
 LiquidCrystal_I2C lcd(0x27, 16, 2);
 
-// Buffer to hold incoming custom character data (8 chars * 8 bytes/char = 64 bytes)
+// Packet framing (see SerialProtocol.py)
+// Every frame arrives as: START_MARKER, sequence (0-63), payload length, payload, checksum
+// The checksum is the CRC-8 (polynomial 0x07, initial value 0) of the sequence, length and payload bytes.
+// Every packet is answered with a single byte: ACK_FLAG | sequence once the frame is displayed,
+// or ACK_FLAG | NAK_FLAG | sequence if it was rejected.
+const uint8_t START_MARKER = 0xA5;
+const uint8_t SEQUENCE_MASK = 0x3F;
+const uint8_t ACK_FLAG = 0x80;
+const uint8_t NAK_FLAG = 0x40;
+const uint8_t MAX_PAYLOAD = 90; // A complete glyph frame
+// A half-received packet is dropped after this long without a new byte
+const unsigned long PACKET_TIMEOUT_MS = 20;
+const uint8_t CRC8_POLYNOMIAL = 0x07;
+
+// Startup handshake (see SerialProtocol.py)
+// Once the LCD is initialized, the sketch sends the line "READY <version> <capabilities>",
+// and sends it again whenever READY_QUERY arrives while no packet is being received, so the
+// host can find out that a board which was not reset is already running.
+const uint8_t PROTOCOL_VERSION = 2;
+const uint8_t READY_QUERY = '?';
+const uint8_t CAPABILITY_BLOCK_FRAMES = 0x01; // Keyframes and delta frames
+const uint8_t CAPABILITY_GLYPH_FRAMES = 0x02; // Glyph frames
+const uint8_t CAPABILITY_PACKED_ROWS = 0x04;  // Frames with packed rows
+
+// Frame types (first byte of every payload)
+// 'K' (keyframe): followed by all 64 bytes of custom character data
+// 'D' (delta frame): followed by a character mask, then for each changed character
+//                    a row mask and the new value of each changed row
+// Keyframes and delta frames show the 8 custom characters as a 4x2 block at column 6.
+// 'G' (glyph frame): custom character rows like a delta frame, followed by 16 bytes with a
+//                    4-bit code for every one of the 32 cells of the display: 0-7 for a custom
+//                    character, 8 for the blank and 9 for the full block of the character ROM.
+//                    A glyph frame that rewrites every row of every character is self-contained.
+// 'k', 'd', 'g': the same frames with packed rows. Only the low 5 bits of a row are pixels, so the
+//                rows are sent as a stream of 5-bit values, most significant bit first, filled up
+//                with zero bits to a whole byte. 'k' carries the 64 rows in 40 bytes. In 'd' and 'g'
+//                the row masks of all changed characters come first, then their packed rows.
+const uint8_t FRAME_TYPE_KEY = 'K';
+const uint8_t FRAME_TYPE_DELTA = 'D';
+const uint8_t FRAME_TYPE_GLYPH = 'G';
+const uint8_t PACKED_FRAME_TYPE_MIN = 'a'; // Lowercase frame types carry packed rows
+const uint8_t PACKED_FRAME_TYPE_OFFSET = 'a' - 'A'; // 'k' = 'K' + PACKED_FRAME_TYPE_OFFSET
+const uint8_t ROW_BITS = 5;
+const uint8_t PACKED_FRAME_BYTES = 64 * ROW_BITS / 8;
+const uint8_t GLYPH_MAP_BYTES = 16;
+const uint8_t GLYPH_CODE_BLANK = 8;
+const uint8_t GLYPH_CODE_FULL = 9;
+const uint8_t ROM_BLANK = 0x20; // Space in the HD44780 character ROM
+const uint8_t ROM_FULL = 0xFF;  // All pixels set in the HD44780 character ROM
+
+// Size of the display in character cells
+const uint8_t LCD_COLUMNS = 16;
+const uint8_t LCD_ROWS = 2;
+const uint8_t LCD_CELLS = LCD_COLUMNS * LCD_ROWS;
+// Position of the 4x2 block of keyframes and delta frames
+const uint8_t BLOCK_COLUMN = 6;
+const uint8_t BLOCK_COLUMNS = 4;
+
+// Kind of the last accepted frame, a delta or partial glyph frame must build on the same kind
+enum FrameLayout {
+  LAYOUT_NONE,   // No frame accepted yet
+  LAYOUT_BLOCK,  // Keyframe or delta frame
+  LAYOUT_GLYPH   // Glyph frame
+};
+
+// States of the incoming packet parser
+enum ParserState {
+  WAIT_START,     // Waiting for the start marker
+  READ_SEQUENCE,  // Reading the sequence number
+  READ_LENGTH,    // Reading the payload length
+  READ_PAYLOAD,   // Reading the payload
+  READ_CHECKSUM   // Reading the checksum
+};
+
+// Buffer holding the current custom character data (8 chars * 8 bytes/char = 64 bytes)
+// Keyframes overwrite it completely, delta frames patch individual rows.
 uint8_t customCharDataBuffer[64];
-int bufferIndex = 0; // Index to track the current position in the buffer
-bool dataReady = false; // Flag to indicate when a full frame of data is received
+bool dataReady = false; // Flag to indicate when a complete frame was accepted
 bool firstFrameReceived = false; // Flag to track if the first frame has been received
+uint8_t dirtyChars = 0;   // Bit n set = custom character n must be rewritten to CGRAM
+uint8_t readySequence = 0; // Sequence number of the accepted frame, acknowledged once displayed
+uint8_t expectedSequence = 0; // A delta frame must carry the sequence after the last accepted frame
+FrameLayout layout = LAYOUT_NONE;
+
+// Character code of every cell: as it should be after the current frame, and as it is on the LCD
+uint8_t cellCodes[LCD_CELLS];
+uint8_t screenCodes[LCD_CELLS];
+
+// The packet being received: every byte after the start marker
+// (sequence, length, payload, checksum)
+ParserState parserState = WAIT_START;
+uint8_t packetBytes[MAX_PAYLOAD + 3];
+uint8_t packetIndex = 0;
+uint8_t payloadLength = 0;
+uint8_t packetCrc = 0; // CRC-8 of the packet bytes received so far
+unsigned long lastByteTime = 0;
+
+// Bytes of a bad packet that are parsed again, before new bytes are read from Serial,
+// so a start marker inside them is not missed
+uint8_t replayBuffer[MAX_PAYLOAD + 3];
+uint8_t replayLength = 0;
+uint8_t replayIndex = 0;
+
+// Places the 8 custom characters as a 4x2 block at BLOCK_COLUMN, the other cells stay blank
+void setBlockLayout() {
+  for (uint8_t cell = 0; cell < LCD_CELLS; cell++) {
+    uint8_t row = cell / LCD_COLUMNS;
+    uint8_t column = cell % LCD_COLUMNS;
+    if (column >= BLOCK_COLUMN && column < BLOCK_COLUMN + BLOCK_COLUMNS) {
+      cellCodes[cell] = row * BLOCK_COLUMNS + column - BLOCK_COLUMN;
+    } else {
+      cellCodes[cell] = ROM_BLANK;
+    }
+  }
+}
+
+// Reads the packed row that starts at bit `bit` of `data`
+uint8_t readPackedRow(const uint8_t *data, uint16_t bit) {
+  const uint8_t *p = data + (bit >> 3);
+  uint8_t shift = bit & 7;
+  uint16_t word = (uint16_t)p[0] << 8;
+  if (shift > 8 - ROW_BITS) {
+    word |= p[1]; // The row continues in the next byte
+  }
+  return (word >> (16 - ROW_BITS - shift)) & ((1 << ROW_BITS) - 1);
+}
+
+// Checks that the character mask and row masks starting at payload[1] add up to `end`.
+// Sets `complete` if every row of every character is included.
+bool checkChangedRows(const uint8_t *payload, uint8_t end, bool packed, bool &complete) {
+  uint8_t charMask = payload[1];
+  uint8_t index = 2;
+  uint8_t rows = 0;
+  complete = charMask == 0xFF;
+  for (uint8_t c = 0; c < 8; c++) {
+    if (charMask & (1 << c)) {
+      if (index >= end) {
+        return false;
+      }
+      complete = complete && payload[index] == 0xFF;
+      uint8_t count = __builtin_popcount(payload[index]);
+      if (packed) {
+        rows += count;
+        index += 1;
+      } else {
+        index += 1 + count;
+      }
+    }
+  }
+  if (packed) {
+    index += (rows * ROW_BITS + 7) / 8;
+  }
+  return index == end;
+}
+
+// Copies the changed rows (checked with checkChangedRows) into the custom character data
+void applyChangedRows(const uint8_t *payload, bool packed) {
+  uint8_t charMask = payload[1];
+  uint8_t index = 2;
+  // Packed rows follow all row masks
+  uint16_t bit = (2 + __builtin_popcount(charMask)) * 8;
+  for (uint8_t c = 0; c < 8; c++) {
+    if (charMask & (1 << c)) {
+      uint8_t rowMask = payload[index++];
+      for (uint8_t r = 0; r < 8; r++) {
+        if (rowMask & (1 << r)) {
+          if (packed) {
+            customCharDataBuffer[c * 8 + r] = readPackedRow(payload, bit);
+            bit += ROW_BITS;
+          } else {
+            customCharDataBuffer[c * 8 + r] = payload[index++];
+          }
+        }
+      }
+      dirtyChars |= 1 << c;
+    }
+  }
+}
+
+// Applies a received payload to the custom character data and the cell codes.
+// Returns false (and changes nothing) if the payload is malformed, or a delta frame or partial
+// glyph frame does not follow the last accepted frame of its kind.
+bool applyPayload(const uint8_t *payload, uint8_t length, uint8_t sequence) {
+  bool complete;
+  uint8_t frameType = payload[0];
+  bool packed = frameType >= PACKED_FRAME_TYPE_MIN;
+  if (packed) {
+    frameType -= PACKED_FRAME_TYPE_OFFSET; // 'k', 'd', 'g' become 'K', 'D', 'G', anything else stays unknown
+  }
+  if (frameType == FRAME_TYPE_KEY) {
+    if (length != 1 + (packed ? PACKED_FRAME_BYTES : 64)) {
+      return false;
+    }
+    if (packed) {
+      for (uint8_t i = 0; i < 64; i++) {
+        customCharDataBuffer[i] = readPackedRow(payload + 1, i * ROW_BITS);
+      }
+    } else {
+      memcpy(customCharDataBuffer, payload + 1, 64);
+    }
+    dirtyChars = 0xFF; // Every character must be rewritten
+    layout = LAYOUT_BLOCK;
+    setBlockLayout();
+    return true;
+  }
+  if (frameType == FRAME_TYPE_DELTA) {
+    // Check that the masks and rows add up to the payload length before changing anything
+    if (length < 2 || layout != LAYOUT_BLOCK || sequence != expectedSequence
+        || !checkChangedRows(payload, length, packed, complete)) {
+      return false;
+    }
+    applyChangedRows(payload, packed);
+    return true;
+  }
+  if (frameType == FRAME_TYPE_GLYPH) {
+    if (length < 2 + GLYPH_MAP_BYTES || !checkChangedRows(payload, length - GLYPH_MAP_BYTES, packed, complete)) {
+      return false;
+    }
+    if (!complete && (layout != LAYOUT_GLYPH || sequence != expectedSequence)) {
+      return false;
+    }
+    const uint8_t *cellMap = payload + length - GLYPH_MAP_BYTES;
+    for (uint8_t i = 0; i < GLYPH_MAP_BYTES; i++) {
+      if ((cellMap[i] & 0x0F) > GLYPH_CODE_FULL || (cellMap[i] >> 4) > GLYPH_CODE_FULL) {
+        return false;
+      }
+    }
+    applyChangedRows(payload, packed);
+    for (uint8_t cell = 0; cell < LCD_CELLS; cell++) {
+      uint8_t code = (cell & 1) ? cellMap[cell / 2] >> 4 : cellMap[cell / 2] & 0x0F;
+      cellCodes[cell] = code == GLYPH_CODE_BLANK ? ROM_BLANK : (code == GLYPH_CODE_FULL ? ROM_FULL : code);
+    }
+    layout = LAYOUT_GLYPH;
+    return true;
+  }
+  return false;
+}
+
+// Adds one byte to a CRC-8. The checksum is updated as the bytes arrive, so checking a
+// packet costs no extra time once its last byte is in.
+uint8_t crc8Update(uint8_t crc, uint8_t value) {
+  crc ^= value;
+  for (uint8_t bit = 0; bit < 8; bit++) {
+    crc = (crc & 0x80) ? (crc << 1) ^ CRC8_POLYNOMIAL : crc << 1;
+  }
+  return crc;
+}
+
+// Announces that the sketch is ready to receive frames
+void sendReady() {
+  Serial.print("READY ");
+  Serial.print(PROTOCOL_VERSION);
+  Serial.print(' ');
+  Serial.print(CAPABILITY_BLOCK_FRAMES | CAPABILITY_GLYPH_FRAMES | CAPABILITY_PACKED_ROWS);
+  Serial.print('\n');
+}
+
+// Drops the packet being received. If its sequence number looks valid, it is rejected right away
+// so the host does not have to wait for a timeout. Any start marker among the bytes received
+// after the dropped start marker is parsed again.
+void dropPacket() {
+  if (packetIndex > 0 && !(packetBytes[0] & ~SEQUENCE_MASK)) {
+    Serial.write(ACK_FLAG | NAK_FLAG | packetBytes[0]);
+  }
+  uint8_t start = 0;
+  while (start < packetIndex && packetBytes[start] != START_MARKER) {
+    start++;
+  }
+  uint8_t tail = packetIndex - start;
+  uint8_t remaining = replayLength - replayIndex;
+  if (tail + remaining > sizeof(replayBuffer)) {
+    remaining = sizeof(replayBuffer) - tail;
+  }
+  // Keep the order: the bytes of this packet came before the bytes still waiting to be replayed
+  memmove(replayBuffer + tail, replayBuffer + replayIndex, remaining);
+  memcpy(replayBuffer, packetBytes + start, tail);
+  replayLength = tail + remaining;
+  replayIndex = 0;
+  packetIndex = 0;
+  parserState = WAIT_START;
+}
+
+// Feeds one received byte into the packet parser
+void parseByte(uint8_t value) {
+  switch (parserState) {
+    case WAIT_START:
+      if (value == START_MARKER) {
+        packetIndex = 0;
+        packetCrc = 0;
+        parserState = READ_SEQUENCE;
+      } else if (value == READY_QUERY) {
+        sendReady();
+      }
+      // Any other byte is ignored until a start marker arrives
+      break;
+
+    case READ_SEQUENCE:
+      packetBytes[packetIndex++] = value;
+      packetCrc = crc8Update(packetCrc, value);
+      if (value & ~SEQUENCE_MASK) {
+        dropPacket();
+      } else {
+        parserState = READ_LENGTH;
+      }
+      break;
+
+    case READ_LENGTH:
+      packetBytes[packetIndex++] = value;
+      packetCrc = crc8Update(packetCrc, value);
+      payloadLength = value;
+      if (payloadLength == 0 || payloadLength > MAX_PAYLOAD) {
+        dropPacket();
+      } else {
+        parserState = READ_PAYLOAD;
+      }
+      break;
+
+    case READ_PAYLOAD:
+      packetBytes[packetIndex++] = value;
+      packetCrc = crc8Update(packetCrc, value);
+      if (packetIndex == 2 + payloadLength) {
+        parserState = READ_CHECKSUM;
+      }
+      break;
+
+    case READ_CHECKSUM: {
+      packetBytes[packetIndex++] = value;
+      if (packetCrc != value) {
+        dropPacket();
+        break;
+      }
+      uint8_t sequence = packetBytes[0];
+      packetIndex = 0;
+      parserState = WAIT_START;
+      if (applyPayload(packetBytes + 2, payloadLength, sequence)) {
+        readySequence = sequence;
+        expectedSequence = (sequence + 1) & SEQUENCE_MASK;
+        dataReady = true;
+      } else {
+        Serial.write(ACK_FLAG | NAK_FLAG | sequence);
+      }
+      break;
+    }
+  }
+}
 
 void setup() {
   // Start serial communication at a high baud rate.
@@ -29,75 +369,79 @@ void setup() {
   lcd.print("System Ready");
   lcd.setCursor(0, 1);
   lcd.print("Waiting for data...");
+
+  // Tell the host that frames can be sent now
+  sendReady();
 }
 
 void loop() {
-  // Read incoming bytes from the serial buffer
-  // This loop reads all currently available bytes from the serial port
-  while (Serial.available() > 0) {
-    // Check if the buffer has space to prevent overflow (buffer size is 64 bytes)
-    if (bufferIndex < 64) {
-      // Read a single byte from the serial buffer and store it
-      customCharDataBuffer[bufferIndex] = Serial.read();
-      bufferIndex++; // Move to the next position in the buffer
-    }
-
-    // If the buffer is full (meaning a complete frame of 64 bytes is received)
-    if (bufferIndex == 64) {
-      // Set the dataReady flag to true to signal that a frame is ready for processing
-      dataReady = true;
-      // Reset the buffer index to 0 for the next incoming frame
-      bufferIndex = 0;
-      // Exit the while loop as a full frame is received and ready
+  // Read incoming bytes: first those replayed after a bad packet, then the serial buffer
+  while (!dataReady) {
+    if (replayIndex < replayLength) {
+      parseByte(replayBuffer[replayIndex++]);
+    } else if (Serial.available() > 0) {
+      lastByteTime = millis();
+      parseByte(Serial.read());
+    } else {
       break;
     }
   }
+  // Stop reading once a complete frame is ready, the rest stays in the serial buffer
+
+  // A packet that stopped halfway (bytes were lost) is dropped, so the next one is not missed
+  if (!dataReady && parserState != WAIT_START && replayIndex >= replayLength
+      && millis() - lastByteTime > PACKET_TIMEOUT_MS) {
+    dropPacket();
+  }
 
   // If a full frame of data is received and the dataReady flag is true
   if (dataReady) {
     // Reset the dataReady flag immediately as we are about to process the frame
     dataReady = false;
 
-    // If this is the first frame being received, clear the initial messages
-    if (!firstFrameReceived) {
-      lcd.clear(); // Clearing the LCD takes some time via I2C
-      firstFrameReceived = true; // Set the flag so this only happens once
-    }
-
-    // Update custom characters using the data from the buffer
+    // Update only the custom characters that changed since the last frame
     // There are 8 custom characters (index 0 to 7)
     for (int charIndex = 0; charIndex < 8; charIndex++) {
-      // Create a temporary array to hold the 8 bytes for the current character
-      uint8_t currentCharData[8];
-      // Copy 8 bytes from the main buffer for the current character's definition
-      // The data for charIndex starts at customCharDataBuffer[charIndex * 8]
-      for (int i = 0; i < 8; i++) {
-        currentCharData[i] = customCharDataBuffer[charIndex * 8 + i];
+      if (dirtyChars & (1 << charIndex)) {
+        // Create or update the custom character in the LCD's CGRAM
+        // The data for charIndex starts at customCharDataBuffer[charIndex * 8]
+        // This is a key part that involves I2C communication and takes time.
+        lcd.createChar(charIndex, &customCharDataBuffer[charIndex * 8]);
       }
-      // Create or update the custom character in the LCD's CGRAM
-      // This is a key part that involves I2C communication and takes time.
-      lcd.createChar(charIndex, currentCharData);
     }
+    dirtyChars = 0;
 
-    // Display the custom characters on the LCD
-    // Set cursor to the starting position for the display area (column 6, row 0)
-    lcd.setCursor(6, 0);
-    // Write the first 4 custom characters (index 0, 1, 2, 3) on the first row
-    for (int i = 0; i < 4; i++) {
-      lcd.write(i); // Writing a custom character by its index (0-7)
+    // The LCD redraws characters automatically when their CGRAM data changes,
+    // so only the cells whose character code changed are written.
+    if (!firstFrameReceived) {
+      lcd.clear(); // Clearing the LCD takes some time via I2C
+      memset(screenCodes, ROM_BLANK, sizeof(screenCodes));
+      firstFrameReceived = true; // Set the flag so this only happens once
     }
-    // Set cursor to the starting position for the second row (column 6, row 1)
-    lcd.setCursor(6, 1);
-    // Write the next 4 custom characters (index 4, 5, 6, 7) on the second row
-    for (int i = 4; i < 8; i++) {
-      lcd.write(i); // Writing a custom character by its index (0-7)
+    for (uint8_t row = 0; row < LCD_ROWS; row++) {
+      bool cursorPlaced = false; // The cursor advances by itself over consecutive cells
+      for (uint8_t column = 0; column < LCD_COLUMNS; column++) {
+        uint8_t cell = row * LCD_COLUMNS + column;
+        if (cellCodes[cell] == screenCodes[cell]) {
+          cursorPlaced = false;
+          continue;
+        }
+        if (!cursorPlaced) {
+          lcd.setCursor(column, row);
+          cursorPlaced = true;
+        }
+        lcd.write(cellCodes[cell]); // A custom character by its index (0-7), or a ROM character
+        screenCodes[cell] = cellCodes[cell];
+      }
     }
 
-    // Send a confirmation back to the Python script.
-    // This signal tells the Python script that the Arduino has finished processing
-    // and displaying the current frame and is ready for the next one.
-    // This is important for synchronization. Removing this would likely cause issues.
-    Serial.println("OK");
+    // Acknowledge the frame with its sequence number.
+    // This tells the Python script that the Arduino has finished processing and
+    // displaying the frame. Every acknowledgement is also a credit: the Python script
+    // keeps at most FLOW_CONTROL_WINDOW frames (and at most 64 bytes, the size of the
+    // serial receive buffer) unconfirmed, so later frames can already wait in the
+    // buffer while the LCD is being updated without overflowing it.
+    Serial.write(ACK_FLAG | readySequence);
   }
 
   // If dataReady is false and no new data arrived in this loop iteration,
@@ -1,12 +1,42 @@
 import sys
 import serial.tools.list_ports
 import serial
-from PIL import Image, ImageSequence
+from PIL import Image
 # Import the updated convert function which returns bytes
-from ImageToDigit import convert
-from time import sleep, time
+from ImageToDigit import (convert, convert_image_files, convert_gif_frames, convert_gray_frames, grayscale_image_files,
+                          grayscale_gif_frames, image_to_grayscale_array, draft_image, LAYOUT_FULL, LAYOUT_FRAME_BYTES)
+from ThresholdAnalysis import analyze_gray_frames, THRESHOLD_MODES, THRESHOLD_MODE_FRAME, THRESHOLD_MODE_SMOOTHED
+from SerialProtocol import (FrameEncoder, frame_packet, parse_answer, parse_ready_message, FRAMING_OVERHEAD_BYTES,
+                            PROTOCOL_VERSION, READY_QUERY, READY_QUERY_INTERVAL_SECONDS, CAPABILITY_GLYPH_FRAMES,
+                            CAPABILITY_PACKED_ROWS, ACK_FLAG, LOST_FRAME_SKIP, LOST_FRAME_RETRANSMIT)
+from GlyphDictionary import GlyphEncoder
+from RawInput import is_raw_source, iterate_raw_frames, STDIN_SOURCE
+from GifIndex import load_gif_index, index_path_for, iterate_gif_frames
+from ScriptFile import (ScriptReader, ScriptWriter, source_fingerprint, FRAME_FORMAT_RAW, FRAME_FORMAT_CELLS,
+                        PACKED_FRAME_FORMATS, DECODE_FLAG_FAST)
+from FrameCache import FrameCache
+from FrameStream import FrameStream
+from FrameStore import FrameStore
+from PlaybackScheduler import PlaybackScheduler, wait_seconds
+from ArduinoEmulator import ArduinoEmulator
+from TerminalPreview import TerminalPreview
+from Playlist import Playlist, PlaylistPreloader
+from Telemetry import (Telemetry, STAGE_DECODE, STAGE_CONVERT, STAGE_INGEST_WAIT, STAGE_WRITE, STAGE_ACK,
+                       COUNTER_TIMEOUT, COUNTER_UNEXPECTED, COUNTER_REJECTED, COUNTER_MISSED, COUNTER_RETRANSMITTED,
+                       COUNTER_RESYNC)
+from time import sleep, time, perf_counter
 import os
+import io
+import contextlib
 import math # Import math for floor
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import termios
+except ImportError:  # Not available on Windows
+    termios = None
 
 # No longer explicitly using struct, direct byte handling is sufficient
 # import struct
@@ -19,14 +49,56 @@ DEFAULT_FOLDER_PATH = "Bad Apple"
 COM_PORT = ""
 # Serial baud rate (must match Arduino sketch)
 BAUDRATE = 500000
+# Frame encoding on the serial link: "delta" sends only the rows that changed since the
+# previous frame, "full" sends all 64 bytes of every frame (as keyframes).
+FRAME_ENCODING = "delta"
+# In "delta" mode, force a full keyframe every N frames (0 = only when needed)
+KEYFRAME_INTERVAL = 0
+# Pack the 5-bit rows of the custom characters without padding bits (64 -> 40 bytes per frame),
+# in new script files and on the serial link (if the sketch reports that it supports it).
+ROW_PACKING = True
+# Maximum number of frames in flight (sent, but not yet acknowledged by the Arduino).
+# 1 = stop-and-wait: wait for the acknowledgement after every frame. Higher values keep the serial
+# link busy while the Arduino is updating the LCD, each acknowledgement acts as a credit for the next frame.
+FLOW_CONTROL_WINDOW = 4
+# Size of the Arduino's serial receive buffer (64 bytes on AVR boards). Unconfirmed data never
+# exceeds this, so the buffer cannot overflow while the sketch is busy with the LCD.
+ARDUINO_RX_BUFFER_BYTES = 64
+# Seconds to wait for an acknowledgement before the frames in flight are considered lost and
+# playback resynchronizes with a keyframe. Must be longer than a full LCD update (about 0.1 s).
+ACK_TIMEOUT_SECONDS = 0.25
+# What to do with a frame the Arduino did not display (damaged on the wire, rejected or lost):
+# "skip" goes on with the next frame, "retransmit" sends the lost frame again (as a keyframe)
+# while it can still be shown in its slot. Either way the display is back in sync one frame later.
+LOST_FRAME_POLICY = "skip"
+# How often a lost frame is sent again with LOST_FRAME_POLICY = "retransmit"
+MAX_RETRANSMITS = 2
+# Seconds to wait for the Arduino's READY message after opening the serial port. A board that is
+# reset by opening the port takes about 2 seconds to boot, one that keeps running answers at once.
+# Sketches without the handshake never answer, playback then starts when the time is up.
+READY_TIMEOUT_SECONDS = 5.0
+# Set to True to keep the Arduino running when the serial port is opened and closed (no DTR
+# auto-reset), so later runs reuse the running board instead of waiting for it to boot.
+# On Linux and macOS the first run after connecting the board still resets it.
+AVOID_BOARD_RESET = False
+# Set to True to run against the software Arduino emulator (ArduinoEmulator.py) instead of a board.
+# COM_PORT is ignored and no sketch is installed. Needs pseudo-terminal support (Linux or macOS).
+EMULATE_ARDUINO = False
+# I2C clock of the emulated LCD in Hz (the LCD update time of the emulator is derived from it)
+EMULATOR_I2C_CLOCK_HZ = 100000
 # Set to True to compile and upload Arduino sketch using arduino-cli
 INSTALL_ARDUINO_SKETCH = False
 # Arduino board model for arduino-cli
 ARDUINO_BOARD_MODEL = "arduino:avr:uno"
 
-# Target Frames Per Second - This is now a theoretical value for reporting only.
-# The script will run as fast as the hardware allows, limited by FRAMES_PER_PRINT.
+# Target Frames Per Second - The playback speed when ENABLE_PLAYBACK_SCHEDULER is True
+# (GIF frames use their own durations). Otherwise it is only used for reporting and the
+# script runs as fast as the hardware allows, limited by FRAMES_PER_PRINT.
 TARGET_FPS = 30
+# Set to True to play at TARGET_FPS (or the GIF frame durations) against a monotonic clock.
+# Frames that can no longer be shown in time are dropped, and frames are held back when
+# the link is faster than needed. FRAMES_PER_PRINT is ignored in this mode.
+ENABLE_PLAYBACK_SCHEDULER = True
 # Frames Per Print: controls how many frames are SKIPPED between each frame that is SENT to the Arduino.
 # Setting FRAMES_PER_PRINT to N means only every Nth frame (0, N, 2N, ...) is sent.
 # This directly affects the animation speed on the LCD.
@@ -42,22 +114,97 @@ BLACK_PIXEL_VALUE = 0
 WHITE_PIXEL_VALUE = 1
 # Threshold for determining black/white pixels (0-255). Use -1 for auto calculation.
 COLOR_BINARIZATION_THRESHOLD = -1
+# How the automatic threshold is found (see ThresholdAnalysis.py): "frame" uses the mean of each
+# frame, "global" one Otsu threshold for the whole sequence, "otsu" the Otsu threshold of each frame,
+# "smoothed" the Otsu threshold of the frames around each frame, which follows the scene brightness
+# without flicker. All but "frame" analyze the whole sequence before the first frame is ready.
+THRESHOLD_MODE = "frame"
+# Number of frames combined for each threshold with THRESHOLD_MODE = "smoothed"
+THRESHOLD_WINDOW_FRAMES = 15
+# Part of the LCD the animation fills: "block" is the 20x16 pixel area of the 8 custom
+# characters in the middle of the display, "full" is the whole display (80x16 pixels), drawn
+# with a per-frame dictionary of 8 custom characters plus the blank and full ROM blocks.
+# Frames with more than 8 distinct character cells are approximated. Needs the current ino.ino.
+DISPLAY_LAYOUT = "block"
+# Set to True to decode large source images at reduced resolution (JPEG draft mode, early grayscale
+# conversion and integer downscaling before the final resize). Much faster for high-resolution
+# frames, and the result differs from the full-size conversion by a few gray levels at most.
+FAST_DECODE = True
 
 # Set to True to loop the animation continuously
 LOOP_ANIMATION = True
-# Set to True to print a text representation of the image during conversion
+# Set to True to preview the frames shown on the LCD in the console. The preview is drawn on a
+# background thread and skips frames when the terminal can't keep up, so playback is not slowed down.
 ENABLE_PRINTOUT = False
+# Set to True to record per-frame timings (decode, convert, serial write, time until acknowledged)
+# and print their percentiles after every animation cycle
+ENABLE_TELEMETRY = False
+# Number of most recent timings kept per stage
+TELEMETRY_CAPACITY = 4096
+# File the timings are exported to when the script ends, ".csv" or ".json" ("" = no export)
+TELEMETRY_EXPORT_PATH = ""
 
 # Set to True to load from a pre-built binary script file instead of processing images
 AUTO_LOAD_SCRIPT = False
 
+# Raw frame input: with "-" as the source path, frames are read from standard input, and a
+# named pipe (FIFO) as the source is read the same way, so another program can pipe frames in.
+# "gray" reads headerless 8-bit grayscale frames of RAW_INPUT_WIDTH x RAW_INPUT_HEIGHT pixels,
+# "pnm" reads concatenated binary PGM/PPM images (their size is taken from each header).
+# Raw input always plays while it is being converted, like STREAMING_PLAYBACK.
+RAW_INPUT_FORMAT = "gray"
+RAW_INPUT_WIDTH = 0
+RAW_INPUT_HEIGHT = 0
+# Raw input plays until the writer closes the stream (END_FRAME_INDEX does not apply to it).
+# Set to stop after this many frames (counted from START_FRAME_INDEX), 0 = no limit.
+RAW_INPUT_MAX_FRAMES = 0
+
 # File/Folder parameters: define the range of frames to process/send
 START_FRAME_INDEX = 0   # Starting frame index (inclusive, 0-based)
-END_FRAME_INDEX = 1000   # Ending frame index (exclusive)
+END_FRAME_INDEX = 1000   # Ending frame index (exclusive, not used for raw input)
+
+# Set to True to start playback while the source is still being converted. Frames are
+# converted on a background thread and passed to the sender through a bounded queue,
+# so the first frame is sent right away and memory use does not grow with the sequence.
+# Later animation cycles play back from the script file written along the way.
+STREAMING_PLAYBACK = False
+# Maximum number of converted frames waiting to be sent in streaming mode (the worker
+# processes of INGEST_WORKERS convert at most about as many frames ahead)
+STREAM_QUEUE_FRAMES = 256
+
+# A source path with one of these extensions is a playlist: a text file listing script files (.bin)
+# or sources, one per line, played in sequence over one serial connection (see Playlist.py).
+# The next entry is loaded while the current one plays, and the file may be edited while it plays.
+# With LOOP_ANIMATION the playlist starts again after its last entry.
+PLAYLIST_EXTENSIONS = (".m3u", ".m3u8", ".playlist")
+# How often the playlist file is checked for changes, in seconds
+PLAYLIST_POLL_SECONDS = 1.0
+
+# Cache the converted frames of folder sources, so that only new or edited images
+# (or all images, after a conversion setting changed) are converted again
+ENABLE_FRAME_CACHE = True
+# Location of the frame cache database
+FRAME_CACHE_PATH = os.path.join("Scripts", "frame_cache.sqlite")
+# Maximum size of the frame cache, least recently used frames are evicted first (0 = unlimited)
+FRAME_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# How source images are identified: "stat" (path, size and modification time) or "content" (file hash)
+FRAME_CACHE_KEY_MODE = "stat"
+
+# Number of worker processes used to decode and convert folder/GIF frames in parallel.
+# 0 uses one worker per CPU core, 1 processes frames serially.
+INGEST_WORKERS = 0
+# Number of frames handed to a worker process at a time
+INGEST_CHUNK_SIZE = 64
 
 # --- Constants ---
-# Expected number of bytes per frame (8 custom characters * 8 bytes/character)
-BYTES_PER_FRAME = 64
+# Expected number of bytes per frame (8 custom characters * 8 bytes/character, or
+# 32 character cells * 8 bytes/cell in the "full" layout)
+BYTES_PER_FRAME = LAYOUT_FRAME_BYTES.get(DISPLAY_LAYOUT, 64)
+# Sending stops after this many acknowledgement timeouts in a row (the Arduino is not responding)
+MAX_CONSECUTIVE_ACK_TIMEOUTS = 5
+# Read timeout while waiting for the READY message, and the received text kept to find it in
+READY_POLL_SECONDS = 0.01
+READY_BUFFER_BYTES = 64
 
 # --- Helper Functions ---
 def auto_detect_com_port():
@@ -102,11 +249,542 @@ def install_arduino_sketch(com_port, model):
         print(f"An unexpected error occurred during installation: {e}")
         return False
 
+def resolve_worker_count(workers):
+    """Returns the number of worker processes to use (0 or less means one per CPU core)."""
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def ingest_parallel(worker, chunk_args, workers, max_in_flight=0):
+    """
+    Runs worker(*args) for every entry of chunk_args on a process pool and yields
+    the result of each chunk in the original chunk order, so frames can be
+    appended and written to the script file in sequence.
+
+    Only a few chunks are submitted ahead of the one being consumed, the next one
+    each time a result is taken, so converted frames don't pile up when the
+    consumer is slower than the workers. Closing the generator early cancels the
+    chunks that have not started instead of waiting for the whole source.
+
+    Args:
+        worker (callable): Converts one chunk (must be picklable).
+        chunk_args (iterable): The arguments of every chunk, in order.
+        workers (int): Worker processes.
+        max_in_flight (int): Chunks submitted but not yet consumed, 0 = two per worker.
+    """
+    chunk_args = iter(chunk_args)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for args in islice(chunk_args, max_in_flight if max_in_flight > 0 else 2 * workers):
+            pending.append(pool.submit(worker, *args))
+        while pending:
+            result = pending.popleft().result()
+            for args in islice(chunk_args, 1):
+                pending.append(pool.submit(worker, *args))
+            yield result
+    except BaseException:  # Including GeneratorExit when the consumer stops early
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+def open_serial_port(port, baudrate, timeout, avoid_reset=False):
+    """
+    Opens a serial port, optionally without resetting the Arduino.
+
+    Boards with DTR auto-reset reboot when DTR is asserted. On Windows the port is opened with DTR
+    deasserted. On Linux and macOS opening a port always asserts DTR, so instead the port is told
+    not to drop DTR when it is closed (no HUPCL): DTR then stays asserted between runs.
+
+    Raises:
+        serial.SerialException: If the port cannot be opened.
+    """
+    ser = serial.Serial(None, baudrate, timeout=timeout)
+    ser.port = port
+    if avoid_reset and os.name == 'nt':
+        ser.dtr = False
+        ser.rts = False
+    ser.open()
+    if avoid_reset and termios is not None:
+        try:
+            attributes = termios.tcgetattr(ser.fileno())
+            attributes[2] &= ~termios.HUPCL
+            termios.tcsetattr(ser.fileno(), termios.TCSANOW, attributes)
+        except (termios.error, OSError) as e:
+            print(f"Warning: Could not keep DTR asserted on {port}, the board may reset next time: {e}")
+    return ser
+
+def wait_for_ready(ser, timeout):
+    """
+    Waits for the READY message of the sketch (see "Startup Handshake" in SerialProtocol.py),
+    sending READY_QUERY now and then for a board that is already running.
+
+    Args:
+        ser (serial.Serial): The open serial port.
+        timeout (float): Seconds to wait at most.
+
+    Returns:
+        tuple: (protocol version, capabilities) of the sketch, or None if it did not answer in time.
+    """
+    deadline = perf_counter() + timeout
+    next_query = 0.0
+    received = bytearray()
+    previous_timeout = ser.timeout
+    ser.timeout = READY_POLL_SECONDS
+    try:
+        while True:
+            now = perf_counter()
+            if now >= deadline:
+                return None
+            if now >= next_query:
+                ser.write(bytes((READY_QUERY,)))
+                next_query = now + READY_QUERY_INTERVAL_SECONDS
+            data = ser.read(ser.in_waiting or 1)
+            if data:
+                # Answer bytes left over from an earlier run are dropped
+                received += bytes(value for value in data if not value & ACK_FLAG)
+                ready = parse_ready_message(received)
+                if ready is not None:
+                    return ready
+                del received[:-READY_BUFFER_BYTES]
+    finally:
+        ser.timeout = previous_timeout
+
+def send_frames(ser, frames, frame_encoder, window=1, rx_buffer_bytes=64, frames_per_print=1, first_frame_index=0,
+                scheduler=None, telemetry=None, lost_frame_policy=LOST_FRAME_SKIP, max_retransmits=0,
+                link_counters=None, preview=None):
+    """
+    Sends one cycle of frames to the Arduino with credit-based flow control.
+
+    Every frame travels in a packet with a sequence number and a CRC-8 (see SerialProtocol.py).
+    Up to `window` packets may be in flight at once, and the unconfirmed bytes never
+    exceed `rx_buffer_bytes`, so the Arduino's serial receive buffer cannot overflow.
+    Every acknowledgement from the Arduino confirms the frame with its sequence number
+    and frees a credit. A packet larger than the buffer (a keyframe) is only sent when
+    nothing is in flight. With window=1 this is the classic stop-and-wait protocol.
+
+    A frame is lost when the Arduino rejects it (a damaged packet or a delta it can't
+    apply), when a later frame is acknowledged first, or when no answer arrives within
+    the serial timeout. The next frame is then sent as a keyframe, so the display is back
+    in sync one frame later. With LOST_FRAME_RETRANSMIT, the lost frame itself is sent
+    again first (at most max_retransmits times), as long as it can still be shown in time.
+
+    With a scheduler, frames are sent when they are due according to its clock
+    (late frames are dropped) instead of as fast as possible, and frames_per_print
+    is ignored.
+
+    Args:
+        ser (serial.Serial): The open serial connection. Its timeout is the acknowledgement timeout.
+        frames (list): The frames to send (BYTES_PER_FRAME each).
+        frame_encoder (FrameEncoder): Encodes frames as keyframes or deltas and numbers the packets.
+        window (int): Maximum number of unconfirmed frames.
+        rx_buffer_bytes (int): Maximum number of unconfirmed bytes.
+        frames_per_print (int): Only every Nth frame is sent.
+        first_frame_index (int): Source index of frames[0], used for progress output.
+        scheduler (PlaybackScheduler): Optional clock-driven scheduler, restarted for this cycle.
+        telemetry (Telemetry): Optional recorder of the write and confirmation times.
+        lost_frame_policy (str): LOST_FRAME_SKIP or LOST_FRAME_RETRANSMIT.
+        max_retransmits (int): How often a lost frame is sent again with LOST_FRAME_RETRANSMIT.
+        link_counters (dict): Optional dict that receives the link error counts of this cycle
+                              (the COUNTER_* names of Telemetry.py).
+        preview (TerminalPreview): Optional console preview, receives every acknowledged frame.
+
+    Returns:
+        tuple: (frames_sent, bytes_sent) for this cycle, counting the acknowledged frames.
+    """
+    frames_sent = 0
+    bytes_sent = 0
+    # Source frame index, sequence number, packet length, send time, due time, resync epoch,
+    # frame and retransmission attempt of each unconfirmed frame
+    in_flight = deque()
+    in_flight_bytes = 0
+    # Source frame index, frame, due time and attempt of the lost frames to send again
+    retransmits = deque()
+    stop_sending = False
+    resync_epoch = 0  # Counts the encoder resets after lost frames
+    consecutive_timeouts = 0
+
+    def count(counter):
+        """Counts a link event in the telemetry and in link_counters."""
+        if telemetry:
+            telemetry.count(counter)
+        if link_counters is not None:
+            link_counters[counter] = link_counters.get(counter, 0) + 1
+
+    def still_in_time(frame_index, due_time):
+        """Returns True if a frame sent now can still be shown before its slot ends."""
+        if scheduler is None or due_time is None:
+            return True
+        slot_end = due_time + scheduler.frame_duration(frame_index - first_frame_index)
+        return perf_counter() + scheduler.latency < slot_end
+
+    def frame_lost(entry, reason):
+        """Handles a frame that was not displayed, so the next frame is sent as a keyframe."""
+        nonlocal resync_epoch
+        count(reason)
+        frame_index, _, _, _, due_time, epoch, frame_bytes, attempt = entry
+        retransmit = (lost_frame_policy == LOST_FRAME_RETRANSMIT and attempt < max_retransmits
+                      and still_in_time(frame_index, due_time))
+        if retransmit:
+            retransmits.append((frame_index, frame_bytes, due_time, attempt + 1))
+        # The deltas sent after a lost frame are rejected as well, one keyframe resyncs them all
+        if epoch == resync_epoch:
+            resync_epoch += 1
+            frame_encoder.reset()
+            count(COUNTER_RESYNC)
+            action = "Sending it again" if retransmit else "Resynchronizing with a keyframe"
+            print(f"\nWarning: Frame {frame_index} was not displayed ({reason}). {action}.")
+
+    def wait_for_confirmation():
+        """Reads answers until the oldest frame in flight is settled. Returns False if sending must stop."""
+        nonlocal frames_sent, in_flight_bytes, consecutive_timeouts
+        while True:
+            response = ser.read(1)
+            if not response:
+                # No answer within the timeout, so none of the frames in flight arrived intact
+                consecutive_timeouts += 1
+                while in_flight:
+                    entry = in_flight.popleft()
+                    in_flight_bytes -= entry[2]
+                    frame_lost(entry, COUNTER_TIMEOUT)
+                if consecutive_timeouts >= MAX_CONSECUTIVE_ACK_TIMEOUTS:
+                    print("\nWarning: The Arduino does not acknowledge any frames. It might be unresponsive.")
+                    return False
+                return True
+
+            answer = parse_answer(response[0])
+            if answer is None or all(entry[1] != answer[0] for entry in in_flight):
+                # Not an answer, or a late answer for a frame that was already given up on
+                count(COUNTER_UNEXPECTED)
+                continue
+            consecutive_timeouts = 0
+            sequence, accepted = answer
+            confirmed_time = perf_counter()
+            entry = in_flight.popleft()
+            in_flight_bytes -= entry[2]
+            # Answers arrive in order, so the frames sent before the answered one were lost
+            while entry[1] != sequence:
+                frame_lost(entry, COUNTER_MISSED)
+                entry = in_flight.popleft()
+                in_flight_bytes -= entry[2]
+
+            frame_index, _, _, sent_time, due_time = entry[:5]
+            if not accepted:
+                frame_lost(entry, COUNTER_REJECTED)
+                return True
+            frames_sent += 1
+            if scheduler and due_time is not None:
+                scheduler.frame_confirmed(sent_time, due_time, confirmed_time)
+            if telemetry:
+                telemetry.record(STAGE_ACK, frame_index, confirmed_time - sent_time)
+            if preview:
+                preview.show(entry[6])
+            # Use carriage return \r to overwrite the line for cleaner output
+            sys.stdout.write(f"\rSent frame: {frame_index}")
+            sys.stdout.flush()  # Ensure output is displayed immediately
+            return True
+
+    def wait_and_confirm(seconds):
+        """Waits until the next frame is due, reading the confirmations that arrive meanwhile."""
+        nonlocal stop_sending
+        deadline = perf_counter() + seconds
+        while True:
+            while in_flight and ser.in_waiting:
+                if not wait_for_confirmation():
+                    stop_sending = True
+                    return
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                return
+            if not in_flight:
+                wait_seconds(remaining)
+                return
+            sleep(min(remaining, 0.001))
+
+    if scheduler:
+        scheduler.start()
+    frame_iterator = enumerate(frames)
+    try:
+        while True:
+            if retransmits:
+                # Lost frames go first, they were due before the frames that follow them
+                frame_index, frame_bytes, due_time, attempt = retransmits.popleft()
+                if not still_in_time(frame_index, due_time):
+                    continue
+                if attempt:
+                    count(COUNTER_RETRANSMITTED)
+            else:
+                next_frame = next(frame_iterator, None)
+                if next_frame is None:
+                    # Collect the confirmations of the frames still in flight
+                    if not in_flight or not wait_for_confirmation():
+                        break
+                    continue
+                i, frame_bytes = next_frame
+                frame_index = first_frame_index + i
+                attempt = 0
+                due_time = None
+                if scheduler:
+                    due_time = scheduler.schedule(i, wait_and_confirm)
+                    if stop_sending:
+                        return frames_sent, bytes_sent
+                    if due_time is None:
+                        continue  # Too late to be shown in its slot, drop it
+                # If i % frames_per_print != 0, the frame is skipped and nothing is sent
+                elif i % frames_per_print != 0:
+                    continue
+
+            # Encode the frame as a keyframe or as a delta against the previous frame
+            payload = frame_encoder.encode(frame_bytes)
+            # Wait for credits: a free window slot and room in the Arduino's receive buffer
+            while in_flight and (len(in_flight) >= window
+                                 or in_flight_bytes + len(payload) + FRAMING_OVERHEAD_BYTES > rx_buffer_bytes):
+                if not wait_for_confirmation():
+                    return frames_sent, bytes_sent
+                if frame_encoder.previous is None:
+                    # A frame was lost and the encoder was reset, so send this frame in full
+                    payload = frame_encoder.encode(frame_bytes)
+            if retransmits and attempt == 0:
+                # A frame was lost meanwhile and goes first. This frame was encoded but never sent,
+                # so the encoder no longer knows the Arduino's state.
+                retransmits.append((frame_index, frame_bytes, due_time, attempt))
+                frame_encoder.reset()
+                continue
+
+            sequence = frame_encoder.next_sequence()
+            packet = frame_packet(sequence, payload)
+            sent_time = perf_counter()
+            ser.write(packet)
+            if telemetry:
+                telemetry.record(STAGE_WRITE, frame_index, perf_counter() - sent_time)
+            bytes_sent += len(packet)
+            in_flight.append((frame_index, sequence, len(packet), sent_time, due_time, resync_epoch,
+                              frame_bytes, attempt))
+            in_flight_bytes += len(packet)
+
+    except serial.SerialException as e:
+        print(f"\nSerial error during sending: {e}")
+    except Exception as e:
+        print(f"\nAn unexpected error occurred while sending frames: {e}")
+    return frames_sent, bytes_sent
+
+def frame_cache_key(frame_cache, image_path, threshold=COLOR_BINARIZATION_THRESHOLD):
+    """Returns the cache key of an image for the configured conversion settings, or None if it can't be read."""
+    try:
+        return frame_cache.key(image_path, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE, threshold, DISPLAY_LAYOUT, FAST_DECODE)
+    except OSError:
+        return None
+
+def load_playlist_entry(entry_path):
+    """
+    Loads one playlist entry: a script file as it is, any other source through its script
+    file, which is converted first unless it is up to date (or AUTO_LOAD_SCRIPT finds it).
+    Runs on the preloading thread while the previous entry plays; the new script file
+    replaces the old one only once it is complete, so an entry that is playing is not affected.
+
+    Args:
+        entry_path (str): The script file or source.
+
+    Returns:
+        ScriptReader: The frames of the entry, or None if it cannot be played.
+    """
+    if is_raw_source(entry_path):
+        print(f"\nWarning: Playlist entry {entry_path} is raw input, which can't be preloaded. Skipping it.")
+        return None
+    if not os.path.exists(entry_path):
+        print(f"\nWarning: Playlist entry {entry_path} not found. Skipping it.")
+        return None
+    script_path = entry_path
+    if not entry_path.lower().endswith(".bin"):
+        script_path = script_file_path_for(entry_path)
+        if not (AUTO_LOAD_SCRIPT and os.path.exists(script_path)) and not script_is_up_to_date(entry_path, script_path):
+            for _ in process_source_frames(entry_path, script_path):
+                pass
+    try:
+        reader = ScriptReader(script_path)
+    except (OSError, ValueError) as e:
+        print(f"\nWarning: Could not load playlist entry {entry_path}: {e}. Skipping it.")
+        return None
+    if reader.frame_size != BYTES_PER_FRAME or not len(reader):
+        print(f"\nWarning: Playlist entry {entry_path} has no {BYTES_PER_FRAME}-byte frames "
+              f"(DISPLAY_LAYOUT '{DISPLAY_LAYOUT}'). Skipping it.")
+        reader.close()
+        return None
+    reader.preload()
+    return reader
+
+def next_playlist_entry(preloader):
+    """
+    Takes the next playlist entry that can be played, skipping entries that failed to load.
+
+    Returns:
+        tuple: (entry path, ScriptReader), or None at the end of the playlist.
+    """
+    failures = 0
+    while True:
+        item = preloader.take()
+        if item is None:
+            return None
+        if item[1] is not None:
+            return item
+        failures += 1
+        if failures >= len(preloader.playlist.entries):
+            print("Error: None of the playlist entries can be played.")
+            return None
+
+def read_stored_thresholds(script_file_path, threshold_mode, threshold_window):
+    """
+    Reads the per-frame thresholds an existing script file was converted with, so converting
+    the same frames again can skip the threshold analysis.
+
+    Args:
+        script_file_path (str): The script file that is about to be rebuilt.
+        threshold_mode (int): Position of the threshold mode in THRESHOLD_MODES.
+        threshold_window (int): The smoothing window the thresholds must have been computed with.
+
+    Returns:
+        tuple: (fingerprint, start_frame, end_frame, thresholds) if the file holds thresholds of every
+               frame, computed with the same mode and window from frames decoded like with the current
+               FAST_DECODE, for the current layout, otherwise None.
+    """
+    if not os.path.exists(script_file_path):
+        return None
+    try:
+        with ScriptReader(script_file_path) as reader:
+            if (reader.thresholds is None or reader.frame_size != BYTES_PER_FRAME
+                    or (reader.threshold_mode, reader.threshold_window) != (threshold_mode, threshold_window)
+                    or reader.decode_flags != script_decode_flags()
+                    or reader.frame_count != reader.end_frame - reader.start_frame):
+                return None
+            return reader.fingerprint, reader.start_frame, reader.end_frame, list(reader.thresholds)
+    except (OSError, ValueError):
+        return None
+
+def list_frame_files(folder_path):
+    """Returns the image file names of a folder source in frame order (numbered files first, by number)."""
+    return sorted([f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp'))],
+                  key=lambda x: int(os.path.splitext(x)[0]) if os.path.splitext(x)[0].isdigit() else float('inf'))
+
+def script_frame_format():
+    """Returns the frame format of new script files for DISPLAY_LAYOUT and ROW_PACKING."""
+    frame_format = FRAME_FORMAT_CELLS if DISPLAY_LAYOUT == LAYOUT_FULL else FRAME_FORMAT_RAW
+    return PACKED_FRAME_FORMATS[frame_format] if ROW_PACKING else frame_format
+
+def script_decode_flags():
+    """Returns the decode flags of new script files for FAST_DECODE."""
+    return DECODE_FLAG_FAST if FAST_DECODE else 0
+
+def resolve_threshold_mode():
+    """
+    Returns the threshold analysis used for new script files: THRESHOLD_MODE with an automatic
+    threshold (COLOR_BINARIZATION_THRESHOLD = -1), otherwise "frame".
+
+    Returns:
+        tuple: (mode, smoothing window), the window is 0 unless the mode is "smoothed".
+    """
+    threshold_mode = THRESHOLD_MODE if COLOR_BINARIZATION_THRESHOLD == -1 else THRESHOLD_MODE_FRAME
+    if threshold_mode not in THRESHOLD_MODES:
+        print(f"Warning: Unknown THRESHOLD_MODE '{threshold_mode}'. Using '{THRESHOLD_MODE_FRAME}'.")
+        threshold_mode = THRESHOLD_MODE_FRAME
+    return threshold_mode, THRESHOLD_WINDOW_FRAMES if threshold_mode == THRESHOLD_MODE_SMOOTHED else 0
+
+def expected_script_header(source_path):
+    """
+    Works out what the header of an up-to-date script file of a source contains, from the
+    current configuration and the source files (without decoding any frames).
+
+    Returns:
+        dict: Header fields of ScriptReader and their expected values, or None if the source can't be read.
+    """
+    if os.path.isdir(source_path):
+        names = list_frame_files(source_path)
+        end_frame = min(END_FRAME_INDEX, len(names))
+        fingerprint = source_fingerprint([os.path.join(source_path, name)
+                                          for name in names[START_FRAME_INDEX:end_frame]])
+    elif '.gif' in source_path.lower():
+        with contextlib.redirect_stdout(io.StringIO()):  # Indexing messages
+            gif_index = load_gif_index(source_path, index_path_for(script_file_path_for(source_path)))
+        if gif_index is not None:
+            frame_total = len(gif_index)
+        else:
+            try:
+                with Image.open(source_path) as im:
+                    frame_total = getattr(im, 'n_frames', 1)
+            except OSError:
+                return None
+        end_frame = min(END_FRAME_INDEX, frame_total)
+        fingerprint = source_fingerprint([source_path])
+    else:
+        end_frame = 1
+        fingerprint = source_fingerprint([source_path])
+    with contextlib.redirect_stdout(io.StringIO()):  # Unknown THRESHOLD_MODE warning, printed by the conversion
+        threshold_mode, threshold_window = resolve_threshold_mode()
+    return {
+        "frame_size": BYTES_PER_FRAME,
+        "frame_format": script_frame_format(),
+        "black": BLACK_PIXEL_VALUE,
+        "white": WHITE_PIXEL_VALUE,
+        "threshold": COLOR_BINARIZATION_THRESHOLD,
+        "threshold_mode": THRESHOLD_MODES.index(threshold_mode),
+        "threshold_window": threshold_window,
+        "decode_flags": script_decode_flags(),
+        "start_frame": START_FRAME_INDEX,
+        "end_frame": max(end_frame, START_FRAME_INDEX),
+        "fingerprint": fingerprint,
+    }
+
+def script_is_up_to_date(source_path, script_file_path):
+    """
+    Checks whether a script file holds the frames of the source, converted with the current settings.
+
+    Returns:
+        bool: True if converting the source again would write the same file.
+    """
+    if not os.path.exists(script_file_path):
+        return False
+    expected = expected_script_header(source_path)
+    if expected is None:
+        return False
+    try:
+        with ScriptReader(script_file_path) as reader:
+            # A script file without frames is converted again
+            return reader.version > 0 and len(reader) > 0 and all(
+                getattr(reader, name) == value for name, value in expected.items())
+    except (OSError, ValueError):
+        return False
+
+def create_frame_encoder():
+    """Returns the frame encoder for DISPLAY_LAYOUT, FRAME_ENCODING and KEYFRAME_INTERVAL."""
+    if DISPLAY_LAYOUT == LAYOUT_FULL:
+        return GlyphEncoder(FRAME_ENCODING, KEYFRAME_INTERVAL)
+    return FrameEncoder(FRAME_ENCODING, KEYFRAME_INTERVAL)
+
+def script_file_path_for(source_path):
+    """Returns the script file path of a source (a separate file for the "full" layout)."""
+    # Use base name for script file to handle both folder and single file cases
+    # Replace invalid characters for filenames if necessary
+    script_file_name = "stdin" if source_path == STDIN_SOURCE else os.path.basename(source_path)
+    # Simple sanitization (more robust handling might be needed for complex paths)
+    script_file_name = "".join([c for c in script_file_name if c.isalnum() or c in (' ', '.', '_', '-')]).rstrip() # Added hyphen
+    if not script_file_name:
+        script_file_name = "default_script" # Fallback name if sanitization results in empty string
+    if DISPLAY_LAYOUT == LAYOUT_FULL:
+        script_file_name += "_full"
+    return os.path.join("Scripts", f"{script_file_name}.bin")
+
+def wait_for_enter():
+    """Waits until Enter is pressed (returns right away if stdin is closed, e.g. after raw input)."""
+    try:
+        input()
+    except EOFError:
+        pass
+
 def show_help():
     """Prints the help message and usage instructions."""
     print("\n--- Arduino LCD Animation Script Help ---")
     print("Usage:")
     print("  python main.py [path_to_image_or_folder]")
+    print("  python main.py -   (or a named pipe) to read raw frames, see RAW_INPUT_FORMAT")
     print("  Drag and drop an image file or a folder onto the main.py script.")
     print("  Run from terminal without arguments to use the default FOLDER_PATH.")
     print("  python main.py --help  or  python main.py -h  to show this help message.")
@@ -117,24 +795,446 @@ def show_help():
     print(f"  DEFAULT_FOLDER_PATH      : Default image source path ('{DEFAULT_FOLDER_PATH}')")
     print(f"  COM_PORT                 : Arduino COM port ('{COM_PORT}' or auto-detect)")
     print(f"  BAUDRATE                 : Serial communication speed ({BAUDRATE})")
+    print(f"  THRESHOLD_MODE           : Auto threshold, 'frame', 'global', 'otsu' or 'smoothed' ('{THRESHOLD_MODE}')")
+    print(f"  THRESHOLD_WINDOW_FRAMES  : Frames per threshold with 'smoothed' ({THRESHOLD_WINDOW_FRAMES})")
+    print(f"  FRAME_ENCODING           : Serial frame encoding, 'delta' or 'full' ('{FRAME_ENCODING}')")
+    print(f"  KEYFRAME_INTERVAL        : Force a keyframe every N frames, 0 = never ({KEYFRAME_INTERVAL})")
+    print(f"  ROW_PACKING              : Pack 5-bit rows in script files and on the wire ({ROW_PACKING})")
+    print(f"  FLOW_CONTROL_WINDOW      : Frames in flight, 1 = stop-and-wait ({FLOW_CONTROL_WINDOW})")
+    print(f"  ARDUINO_RX_BUFFER_BYTES  : Arduino serial receive buffer size ({ARDUINO_RX_BUFFER_BYTES})")
+    print(f"  ACK_TIMEOUT_SECONDS      : Wait for an acknowledgement before resynchronizing ({ACK_TIMEOUT_SECONDS})")
+    print(f"  LOST_FRAME_POLICY        : Lost frames, 'skip' or 'retransmit' ('{LOST_FRAME_POLICY}')")
+    print(f"  MAX_RETRANSMITS          : Send a lost frame again at most N times ({MAX_RETRANSMITS})")
+    print(f"  READY_TIMEOUT_SECONDS    : Wait for the Arduino's READY message at most ({READY_TIMEOUT_SECONDS})")
+    print(f"  AVOID_BOARD_RESET        : Keep the Arduino running between runs (no DTR reset) ({AVOID_BOARD_RESET})")
+    print(f"  EMULATE_ARDUINO          : Use the software Arduino emulator instead of a board ({EMULATE_ARDUINO})")
+    print(f"  EMULATOR_I2C_CLOCK_HZ    : I2C clock of the emulated LCD ({EMULATOR_I2C_CLOCK_HZ})")
     print(f"  INSTALL_ARDUINO_SKETCH   : Auto-upload sketch ({INSTALL_ARDUINO_SKETCH})")
     print(f"  ARDUINO_BOARD_MODEL      : Board model for arduino-cli ('{ARDUINO_BOARD_MODEL}')")
-    print(f"  TARGET_FPS               : Theoretical FPS for reporting ({TARGET_FPS})")
+    print(f"  TARGET_FPS               : Playback FPS with the scheduler ({TARGET_FPS})")
+    print(f"  ENABLE_PLAYBACK_SCHEDULER: Clock-driven playback with frame dropping ({ENABLE_PLAYBACK_SCHEDULER})")
     print(f"  FRAMES_PER_PRINT         : Frame skipping factor ({FRAMES_PER_PRINT})")
     print(f"  BLACK_PIXEL_VALUE        : Value for black pixels ({BLACK_PIXEL_VALUE})")
     print(f"  WHITE_PIXEL_VALUE        : Value for white pixels ({WHITE_PIXEL_VALUE})")
     print(f"  COLOR_BINARIZATION_THRESHOLD: Binarization threshold ({COLOR_BINARIZATION_THRESHOLD})")
+    print(f"  DISPLAY_LAYOUT           : 'block' (20x16 pixels) or 'full' display (80x16) ('{DISPLAY_LAYOUT}')")
+    print(f"  FAST_DECODE              : Decode large images at reduced resolution ({FAST_DECODE})")
     print(f"  LOOP_ANIMATION           : Loop animation ({LOOP_ANIMATION})")
-    print(f"  ENABLE_PRINTOUT          : Enable console image printout ({ENABLE_PRINTOUT})")
+    print(f"  ENABLE_PRINTOUT          : Preview the shown frames in the console ({ENABLE_PRINTOUT})")
+    print(f"  ENABLE_TELEMETRY         : Record and report per-frame stage timings ({ENABLE_TELEMETRY})")
+    print(f"  TELEMETRY_CAPACITY       : Timings kept per stage ({TELEMETRY_CAPACITY})")
+    print(f"  TELEMETRY_EXPORT_PATH    : Export timings to a .csv or .json file ('{TELEMETRY_EXPORT_PATH}')")
     print(f"  AUTO_LOAD_SCRIPT         : Load from script file ({AUTO_LOAD_SCRIPT})")
+    print(f"  RAW_INPUT_FORMAT         : Raw frames from stdin/FIFO, 'gray' or 'pnm' ('{RAW_INPUT_FORMAT}')")
+    print(f"  RAW_INPUT_WIDTH/HEIGHT   : Size of 'gray' raw frames ({RAW_INPUT_WIDTH}x{RAW_INPUT_HEIGHT})")
+    print(f"  RAW_INPUT_MAX_FRAMES     : Raw frames to play, 0 = until the stream ends ({RAW_INPUT_MAX_FRAMES})")
     print(f"  START_FRAME_INDEX        : Starting frame index ({START_FRAME_INDEX})")
-    print(f"  END_FRAME_INDEX          : Ending frame index ({END_FRAME_INDEX})")
+    print(f"  END_FRAME_INDEX          : Ending frame index, not for raw input ({END_FRAME_INDEX})")
+    print(f"  STREAMING_PLAYBACK       : Send frames while converting ({STREAMING_PLAYBACK})")
+    print(f"  STREAM_QUEUE_FRAMES      : Converted frames buffered in streaming mode ({STREAM_QUEUE_FRAMES})")
+    print(f"  PLAYLIST_EXTENSIONS      : Source extensions played as playlists ({', '.join(PLAYLIST_EXTENSIONS)})")
+    print(f"  PLAYLIST_POLL_SECONDS    : Check the playlist file for changes this often ({PLAYLIST_POLL_SECONDS})")
+    print(f"  ENABLE_FRAME_CACHE       : Reuse converted frames of unchanged images ({ENABLE_FRAME_CACHE})")
+    print(f"  FRAME_CACHE_PATH         : Frame cache database ('{FRAME_CACHE_PATH}')")
+    print(f"  FRAME_CACHE_MAX_BYTES    : Frame cache size limit, 0 = unlimited ({FRAME_CACHE_MAX_BYTES})")
+    print(f"  FRAME_CACHE_KEY_MODE     : Identify images by 'stat' or 'content' ('{FRAME_CACHE_KEY_MODE}')")
+    print(f"  INGEST_WORKERS           : Parallel ingest worker processes, 0 = all cores ({INGEST_WORKERS})")
+    print(f"  INGEST_CHUNK_SIZE        : Frames per worker task ({INGEST_CHUNK_SIZE})")
     print("\nAnimation Control:")
     print("  Press Ctrl+C in the terminal to stop the animation.")
     print("  In the idle state, press Enter to exit the script.")
     print("\n-----------------------------------------")
 
 
+def process_source_frames(source_path, script_file_path, telemetry=None, frame_store=None, max_queued_frames=0):
+    """
+    Converts the frames of an image folder, GIF, single image or raw input
+    (stdin or a named pipe) within START_FRAME_INDEX/END_FRAME_INDEX (for raw
+    input, RAW_INPUT_MAX_FRAMES) and saves them to the script file.
+
+    This is a generator: frames are yielded in order as soon as they are
+    converted, so they can be collected or streamed to the sender.
+
+    Args:
+        source_path (str): The image folder, GIF or image file, STDIN_SOURCE or a named pipe.
+        script_file_path (str): Where to save the converted frames.
+        telemetry (Telemetry): Optional recorder of the decode and convert times.
+        frame_store (FrameStore): Optional store that collects the frames. They are copied into it
+                                  as they are converted and written to the script file in one go
+                                  at the end, instead of one by one.
+        max_queued_frames (int): Frames the consumer buffers (STREAM_QUEUE_FRAMES when streaming). The
+                                 worker processes convert at most about as many frames ahead of it,
+                                 0 = two chunks per worker.
+
+    Yields:
+        bytes: The bytes of each converted frame (BYTES_PER_FRAME), a view into frame_store if given.
+    """
+    ingest_workers = resolve_worker_count(INGEST_WORKERS)
+    use_parallel_ingest = ingest_workers > 1
+    # Chunks converted ahead of the consumer, so a bounded consumer keeps memory use bounded
+    chunks_in_flight = 2 * ingest_workers
+    if max_queued_frames > 0:
+        chunks_in_flight = max(1, min(chunks_in_flight, max_queued_frames // INGEST_CHUNK_SIZE))
+    if use_parallel_ingest:
+        print(f"Processing images with {ingest_workers} worker processes...")
+    else:
+        print("Processing images...")
+    # Ensure the Scripts directory exists
+    os.makedirs("Scripts", exist_ok=True)
+    script_file = None
+    frame_cache = None
+    frame_count = 0
+    first_stored_frame = len(frame_store) if frame_store is not None else 0
+    # Durations and thresholds of the frames in frame_store, written to the script file with them
+    store_durations = []
+    store_thresholds = []
+    # Newly converted frames of a folder source not yet stored in the frame cache, (key, frame) pairs
+    new_cache_entries = []
+
+    def emit(frame, duration=None, threshold=None):
+        """Saves a converted frame (bytes or a list of ints), returns the frame to yield."""
+        nonlocal frame_count
+        frame_count += 1
+        if frame_store is not None:
+            store_durations.append(duration)
+            store_thresholds.append(threshold)
+            return frame_store.append(frame)
+        frame = bytes(frame)
+        script_file.write(frame, duration, threshold)
+        return frame
+
+    try:
+        if ENABLE_FRAME_CACHE:
+            try:
+                frame_cache = FrameCache(FRAME_CACHE_PATH, FRAME_CACHE_MAX_BYTES, FRAME_CACHE_KEY_MODE)
+            except Exception as e:
+                print(f"Warning: Could not open frame cache {FRAME_CACHE_PATH}: {e}. Converting all frames.")
+
+        # With an automatic threshold, THRESHOLD_MODE may derive the thresholds from the whole sequence
+        threshold_mode, threshold_window = resolve_threshold_mode()
+        sequence_analysis = threshold_mode != THRESHOLD_MODE_FRAME
+        # Thresholds of the previous conversion, read before the script file is overwritten
+        stored_thresholds = None
+        if sequence_analysis:
+            stored_thresholds = read_stored_thresholds(script_file_path, THRESHOLD_MODES.index(threshold_mode),
+                                                       threshold_window)
+
+        def analyze_thresholds(gray_frames):
+            """Runs the threshold analysis on the grayscale frames of the whole range, returns their thresholds."""
+            print(f"Analyzing the thresholds of {len(gray_frames)} frames ('{threshold_mode}')...")
+            thresholds = analyze_gray_frames(gray_frames, threshold_mode, threshold_window)
+            return thresholds.tolist()
+
+        def reuse_thresholds(fingerprint, end_frame):
+            """Returns the stored thresholds if they belong to the same source frames, otherwise None."""
+            if stored_thresholds is None or stored_thresholds[:3] != (fingerprint, START_FRAME_INDEX, end_frame):
+                return None
+            print(f"Reusing the thresholds stored in {script_file_path} ('{threshold_mode}').")
+            return stored_thresholds[3]
+
+        # Open script file for writing, the header records the conversion parameters
+        script_file = ScriptWriter(script_file_path, TARGET_FPS, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                   COLOR_BINARIZATION_THRESHOLD, START_FRAME_INDEX, END_FRAME_INDEX,
+                                   frame_size=BYTES_PER_FRAME, frame_format=script_frame_format(),
+                                   threshold_mode=THRESHOLD_MODES.index(threshold_mode),
+                                   threshold_window=threshold_window, decode_flags=script_decode_flags())
+
+        if is_raw_source(source_path):
+            # Read raw frames from stdin or a named pipe and convert them as they arrive.
+            # Decode time includes waiting for the writer.
+            print(f"Reading raw '{RAW_INPUT_FORMAT}' frames from "
+                  f"{'standard input' if source_path == STDIN_SOURCE else source_path}...")
+            if sequence_analysis:
+                print(f"Info: Raw input is converted as it arrives, THRESHOLD_MODE '{threshold_mode}' needs the "
+                      f"whole sequence. Using '{THRESHOLD_MODE_FRAME}'.")
+                script_file.threshold_mode = THRESHOLD_MODES.index(THRESHOLD_MODE_FRAME)
+                script_file.threshold_window = 0
+            i = 0
+            try:
+                stage_begin = perf_counter()
+                for frame in iterate_raw_frames(source_path, RAW_INPUT_FORMAT, RAW_INPUT_WIDTH, RAW_INPUT_HEIGHT):
+                    if i >= START_FRAME_INDEX:
+                        decoded_time = perf_counter()
+                        if telemetry:
+                            telemetry.record(STAGE_DECODE, i, decoded_time - stage_begin)
+                        byte_data = convert(frame, False, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                            COLOR_BINARIZATION_THRESHOLD, DISPLAY_LAYOUT, FAST_DECODE)
+                        if telemetry:
+                            telemetry.record(STAGE_CONVERT, i, perf_counter() - decoded_time)
+                        if byte_data and len(byte_data) == BYTES_PER_FRAME:
+                            yield emit(byte_data)
+                        else:
+                            print(f"Warning: Could not process raw frame {i}. Skipping.")
+                    i += 1
+                    # Checked before reading on, so a pipe that stays open is not waited for
+                    if RAW_INPUT_MAX_FRAMES > 0 and i >= START_FRAME_INDEX + RAW_INPUT_MAX_FRAMES:
+                        break
+                    stage_begin = perf_counter()
+            except (OSError, ValueError) as e:
+                print(f"Error reading raw input: {e}")
+            script_file.end_frame = max(i, START_FRAME_INDEX)
+
+        elif os.path.isdir(source_path):
+            # Process frames from a folder within the start and end range
+            dirF = list_frame_files(source_path)
+            total_frames_in_folder = len(dirF)
+            # Adjust effective end frame based on available files and user setting
+            effective_end_frame = min(END_FRAME_INDEX, total_frames_in_folder)
+            script_file.end_frame = max(effective_end_frame, START_FRAME_INDEX)
+            script_file.fingerprint = source_fingerprint(
+                [os.path.join(source_path, f) for f in dirF[START_FRAME_INDEX:effective_end_frame]])
+
+            if START_FRAME_INDEX >= effective_end_frame:
+                print(
+                    f"Warning: Start frame index ({START_FRAME_INDEX}) is beyond or equal to effective end frame index ({effective_end_frame}). No frames to process.")
+            else:
+                frame_paths = [os.path.join(source_path, dirF[i]) for i in range(START_FRAME_INDEX, effective_end_frame)]
+                if frame_store is not None:
+                    frame_store.reserve(first_stored_frame + len(frame_paths))
+                frame_thresholds = [COLOR_BINARIZATION_THRESHOLD] * len(frame_paths)
+                analyzed_frames = None  # Frames converted by the threshold analysis
+                if sequence_analysis:
+                    frame_thresholds = reuse_thresholds(script_file.fingerprint, effective_end_frame)
+                    if frame_thresholds is None:
+                        # Every frame is decoded once, the analysis converts them all in one go
+                        if use_parallel_ingest:
+                            chunk_args = [(frame_paths[c:c + INGEST_CHUNK_SIZE], DISPLAY_LAYOUT, FAST_DECODE)
+                                          for c in range(0, len(frame_paths), INGEST_CHUNK_SIZE)]
+                            gray_frames = [gray for chunk_result in
+                                           ingest_parallel(grayscale_image_files, chunk_args, ingest_workers)
+                                           for gray in chunk_result]
+                        else:
+                            gray_frames = grayscale_image_files(frame_paths, DISPLAY_LAYOUT, FAST_DECODE)
+                        frame_thresholds = analyze_thresholds(gray_frames)
+                        analyzed_frames = convert_gray_frames(gray_frames, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                                              frame_thresholds, DISPLAY_LAYOUT)
+
+                # Look the frames up in the conversion cache, only new or edited images are converted.
+                # This is done one chunk at a time, just ahead of the frames being emitted, so the
+                # first frame does not wait for every image of the folder to be looked up.
+                chunk_lookups = {}  # Position of the first frame of a chunk -> (cache keys, cached frames)
+
+                def lookup_chunk(chunk_start):
+                    """Returns the cache keys of the frames of a chunk and the frames found in the cache."""
+                    if chunk_start not in chunk_lookups:
+                        positions = range(chunk_start, min(chunk_start + INGEST_CHUNK_SIZE, len(frame_paths)))
+                        keys = [None] * len(positions)
+                        cached = {}
+                        if frame_cache:
+                            keys = [frame_cache_key(frame_cache, frame_paths[n], frame_thresholds[n]) for n in positions]
+                            if analyzed_frames is None:
+                                cached = frame_cache.get_many([key for key in keys if key])
+                        chunk_lookups[chunk_start] = (keys, cached)
+                    return chunk_lookups[chunk_start]
+
+                def missing_chunk_args():
+                    """Yields the worker arguments of every chunk with frames missing from the cache."""
+                    for chunk_start in range(0, len(frame_paths), INGEST_CHUNK_SIZE):
+                        keys, cached = lookup_chunk(chunk_start)
+                        chunk = [chunk_start + n for n, key in enumerate(keys) if key not in cached]
+                        if chunk:
+                            # Known per-frame thresholds travel with the chunk
+                            color_check = [frame_thresholds[n] for n in chunk] if sequence_analysis else COLOR_BINARIZATION_THRESHOLD
+                            yield ([frame_paths[n] for n in chunk], BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                   color_check, DISPLAY_LAYOUT, FAST_DECODE)
+                cache_hits = 0
+
+                converted_frames = iter(())
+                if use_parallel_ingest and analyzed_frames is None:
+                    # Results arrive in order, one for each frame missing from the cache. The chunks are
+                    # looked up as they are submitted, no pool is started if every frame is cached.
+                    converted_frames = (frame_bytes for chunk_result in
+                                        ingest_parallel(convert_image_files, missing_chunk_args(), ingest_workers,
+                                                        chunks_in_flight)
+                                        for frame_bytes in chunk_result)
+
+                for i in range(START_FRAME_INDEX, effective_end_frame):
+                    position = i - START_FRAME_INDEX
+                    chunk_start = position - position % INGEST_CHUNK_SIZE
+                    if position == chunk_start:
+                        # The previous chunk is done, its new frames are stored and no longer kept here
+                        chunk_lookups.pop(chunk_start - INGEST_CHUNK_SIZE, None)
+                        if frame_cache and new_cache_entries:
+                            frame_cache.put_many(new_cache_entries)
+                            new_cache_entries.clear()
+                    frame_keys, cached_frames = lookup_chunk(chunk_start)
+                    frame_key = frame_keys[position - chunk_start]
+                    frame_threshold = frame_thresholds[position]
+                    if frame_key in cached_frames:
+                        frame_bytes = cached_frames[frame_key]
+                        cache_hits += 1
+                    elif analyzed_frames is not None:
+                        frame_bytes = analyzed_frames[i - START_FRAME_INDEX]
+                    elif use_parallel_ingest:
+                        stage_begin = perf_counter()
+                        frame_bytes = next(converted_frames)
+                        if telemetry:
+                            telemetry.record(STAGE_INGEST_WAIT, i, perf_counter() - stage_begin)
+                    else:
+                        try:
+                            stage_begin = perf_counter()
+                            img_path = os.path.join(source_path, dirF[i])
+                            img = Image.open(img_path)
+                            if telemetry:
+                                if FAST_DECODE:
+                                    draft_image(img, DISPLAY_LAYOUT)  # Before load(), which decodes the pixels
+                                img.load()  # Decode now, so decoding and conversion are timed separately
+                                decoded_time = perf_counter()
+                                telemetry.record(STAGE_DECODE, i, decoded_time - stage_begin)
+                            # Get byte data using the updated convert function
+                            byte_data = convert(img, False, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                                frame_threshold, DISPLAY_LAYOUT, FAST_DECODE)
+                            if telemetry:
+                                telemetry.record(STAGE_CONVERT, i, perf_counter() - decoded_time)
+                            frame_bytes = byte_data
+                        except FileNotFoundError:
+                            print(
+                                f"Error: Frame file not found: {os.path.join(source_path, dirF[i])}. Stopping processing.")
+                            break  # Stop processing if a file is missing
+                        except Exception as e:
+                            print(f"Error processing frame {i} ({dirF[i]}): {e}. Stopping processing.")
+                            break  # Stop processing on other errors
+
+                    if frame_bytes and len(frame_bytes) == BYTES_PER_FRAME:  # Ensure we got a complete frame
+                        # Save the frame, with the threshold from the sequence analysis
+                        frame_bytes = emit(frame_bytes, threshold=frame_threshold if sequence_analysis else None)
+                        if frame_key and frame_key not in cached_frames:
+                            new_cache_entries.append((frame_key, frame_bytes))
+                        yield frame_bytes
+                    else:
+                        print(
+                            f"Warning: Could not process frame {i} ({dirF[i]}) or received incorrect data length. Skipping.")
+
+                if frame_cache and analyzed_frames is None:
+                    print(f"Frame cache: {cache_hits} of {len(frame_paths)} frames were up to date.")
+
+        elif os.path.isfile(source_path):
+            # Process a single image or GIF
+            try:
+                im = Image.open(source_path)
+                script_file.fingerprint = source_fingerprint([source_path])
+                if '.gif' in source_path.lower():
+                    # Process GIF frames within the start and end range (GIFs are 0-indexed).
+                    # The frame index (saved next to the script) lets decoding start near the first frame.
+                    gif_index_path = index_path_for(script_file_path)
+                    gif_index = load_gif_index(source_path, gif_index_path)
+                    if gif_index is not None:
+                        total_gif_frames = len(gif_index)
+                    else:
+                        gif_index_path = None
+                        total_gif_frames = im.n_frames if hasattr(im, 'n_frames') else 1
+                    effective_end_frame = min(END_FRAME_INDEX, total_gif_frames)
+                    script_file.end_frame = max(effective_end_frame, START_FRAME_INDEX)
+                    if frame_store is not None:
+                        frame_store.reserve(first_stored_frame + max(effective_end_frame - START_FRAME_INDEX, 0))
+
+                    frame_thresholds = None  # Per-frame thresholds from the sequence analysis
+                    if sequence_analysis and START_FRAME_INDEX < effective_end_frame:
+                        frame_thresholds = reuse_thresholds(script_file.fingerprint, effective_end_frame)
+
+                    if START_FRAME_INDEX >= effective_end_frame:
+                         print(f"Warning: Start frame index ({START_FRAME_INDEX}) is beyond or equal to effective end frame index ({effective_end_frame}). No GIF frames to process.")
+                    elif sequence_analysis and frame_thresholds is None:
+                        # Every frame is decoded once, the analysis converts them all in one go
+                        if use_parallel_ingest:
+                            chunk_args = [(source_path, c, min(c + INGEST_CHUNK_SIZE, effective_end_frame), DISPLAY_LAYOUT,
+                                           FAST_DECODE, gif_index_path)
+                                          for c in range(START_FRAME_INDEX, effective_end_frame, INGEST_CHUNK_SIZE)]
+                            gray_frames, durations = [], []
+                            for chunk_grays, chunk_durations in ingest_parallel(grayscale_gif_frames, chunk_args,
+                                                                                ingest_workers):
+                                gray_frames.extend(chunk_grays)
+                                durations.extend(chunk_durations)
+                        else:
+                            gray_frames, durations = grayscale_gif_frames(source_path, START_FRAME_INDEX, effective_end_frame,
+                                                                          DISPLAY_LAYOUT, FAST_DECODE, gif_index_path)
+                        frame_thresholds = analyze_thresholds(gray_frames)
+                        analyzed_frames = convert_gray_frames(gray_frames, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                                              frame_thresholds, DISPLAY_LAYOUT)
+                        for i, (frame_bytes, duration, threshold) in enumerate(
+                                zip(analyzed_frames, durations, frame_thresholds), START_FRAME_INDEX):
+                            if frame_bytes and len(frame_bytes) == BYTES_PER_FRAME:
+                                yield emit(frame_bytes, duration, threshold)
+                            else:
+                                print(f"Warning: Could not process GIF frame {i} or received incorrect data length. Skipping.")
+                    elif use_parallel_ingest:
+                        # Each worker opens the GIF itself and seeks to the start of its chunk
+                        chunk_args = [(source_path, c, min(c + INGEST_CHUNK_SIZE, effective_end_frame), BLACK_PIXEL_VALUE,
+                                       WHITE_PIXEL_VALUE,
+                                       frame_thresholds[c - START_FRAME_INDEX:c - START_FRAME_INDEX + INGEST_CHUNK_SIZE]
+                                       if frame_thresholds else COLOR_BINARIZATION_THRESHOLD,
+                                       DISPLAY_LAYOUT, FAST_DECODE, gif_index_path)
+                                      for c in range(START_FRAME_INDEX, effective_end_frame, INGEST_CHUNK_SIZE)]
+                        i = START_FRAME_INDEX
+                        stage_begin = perf_counter()
+                        for chunk_frames, chunk_durations in ingest_parallel(convert_gif_frames, chunk_args, ingest_workers,
+                                                                             chunks_in_flight):
+                            if telemetry:
+                                telemetry.record(STAGE_INGEST_WAIT, i, perf_counter() - stage_begin)
+                            for frame_bytes, duration in zip(chunk_frames, chunk_durations):
+                                if frame_bytes and len(frame_bytes) == BYTES_PER_FRAME:
+                                    yield emit(frame_bytes, duration,
+                                               frame_thresholds[i - START_FRAME_INDEX] if frame_thresholds else None)
+                                else:
+                                    print(f"Warning: Could not process GIF frame {i} or received incorrect data length. Skipping.")
+                                i += 1
+                            stage_begin = perf_counter()
+                    else:
+                        for i, frame, duration in iterate_gif_frames(source_path, START_FRAME_INDEX,
+                                                                     effective_end_frame, gif_index):
+                            stage_begin = perf_counter()
+                            threshold = frame_thresholds[i - START_FRAME_INDEX] if frame_thresholds else None
+                            byte_data = convert(frame, False, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                                COLOR_BINARIZATION_THRESHOLD if threshold is None else threshold,
+                                                DISPLAY_LAYOUT, FAST_DECODE)
+                            if telemetry:
+                                telemetry.record(STAGE_CONVERT, i, perf_counter() - stage_begin)
+                            if byte_data and len(byte_data) == BYTES_PER_FRAME:
+                                yield emit(byte_data, duration, threshold)
+                            else:
+                                print(
+                                    f"Warning: Could not process GIF frame {i} or received incorrect data length. Skipping.")
+
+                else:
+                    # Process a single image (only frame 0) if within start/end range
+                    script_file.end_frame = 1
+                    if START_FRAME_INDEX == 0 and END_FRAME_INDEX >= 1:
+                        threshold = None
+                        if sequence_analysis:
+                            # A sequence of one frame
+                            threshold = analyze_thresholds([image_to_grayscale_array(im, DISPLAY_LAYOUT, FAST_DECODE)])[0]
+                        byte_data = convert(im, False, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
+                                            COLOR_BINARIZATION_THRESHOLD if threshold is None else threshold,
+                                            DISPLAY_LAYOUT, FAST_DECODE)
+                        if byte_data and len(byte_data) == BYTES_PER_FRAME:
+                            yield emit(byte_data, threshold=threshold)
+                        else:
+                            print(f"Warning: Could not process the image or received incorrect data length.")
+                    elif START_FRAME_INDEX > 0:
+                         print(f"Info: Single image at index 0 skipped as start is {START_FRAME_INDEX}.")
+
+
+            except FileNotFoundError:
+                 print(f"Error: Image file not found: {source_path}")
+            except Exception as e:
+                print(f"Error processing image: {e}")
+    finally:
+        if frame_cache:
+            if new_cache_entries:
+                # The frames of the last chunk, or the frames converted before the conversion was stopped
+                frame_cache.put_many(new_cache_entries)
+            frame_cache.close()  # Evicts old entries if the cache grew beyond its size limit
+        if script_file:
+            if frame_store is not None and frame_count:
+                # All frames at once, straight from the store's buffer
+                script_file.write_frames(frame_store.view(first_stored_frame), store_durations, store_thresholds)
+            script_file.close()  # Ensure the script file is closed even if errors occur
+            if frame_count:
+                print(f"Processed {frame_count} frames and saved to {script_file_path}.")
+            else:
+                print(f"No frames processed. Script file {script_file_path} may be empty or not created.")
+
+
 # --- Main Execution ---
 if __name__ == '__main__':
     # Hide the cursor in the terminal for cleaner output
@@ -162,7 +1262,10 @@ if __name__ == '__main__':
 
 
     # --- Initial Path Validation ---
-    if not os.path.exists(FOLDER_PATH):
+    # Raw frames from stdin or a named pipe are converted and played as they arrive
+    raw_input_source = is_raw_source(FOLDER_PATH)
+    playlist_mode = not raw_input_source and FOLDER_PATH.lower().endswith(PLAYLIST_EXTENSIONS)
+    if not raw_input_source and not os.path.exists(FOLDER_PATH):
         print(f"Error: Specified folder or file '{FOLDER_PATH}' not found.")
         # Show cursor before exiting
         sys.stdout.write("\033[?25h")
@@ -170,7 +1273,19 @@ if __name__ == '__main__':
         sys.exit(1)  # Exit with an error code
 
     # --- COM Port Setup ---
-    if COM_PORT == "":
+    emulator = None
+    if EMULATE_ARDUINO:
+        try:
+            emulator = ArduinoEmulator(BAUDRATE, EMULATOR_I2C_CLOCK_HZ, ARDUINO_RX_BUFFER_BYTES).start()
+        except OSError as e:
+            print(f"Failed to start the Arduino emulator: {e}")
+            # Show cursor before exiting
+            sys.stdout.write("\033[?25h")
+            sys.stdout.flush()
+            sys.exit(1)  # Exit with an error code
+        COM_PORT = emulator.port
+        print(f"Using the emulated Arduino on {COM_PORT}")
+    elif COM_PORT == "":
         COM_PORT = auto_detect_com_port()
         if COM_PORT:
             print(f"Auto-detected COM port: {COM_PORT}")
@@ -186,7 +1301,7 @@ if __name__ == '__main__':
             sys.exit(1)  # Exit with an error code
 
     # --- Arduino Sketch Installation ---
-    if INSTALL_ARDUINO_SKETCH:
+    if INSTALL_ARDUINO_SKETCH and not EMULATE_ARDUINO:
         if not install_arduino_sketch(COM_PORT, ARDUINO_BOARD_MODEL):
             # Show cursor before exiting
             sys.stdout.write("\033[?25h")
@@ -195,32 +1310,33 @@ if __name__ == '__main__':
 
     # --- File/Folder Handling and Frame Processing ---
     processed_frames = []
-    # Use base name for script file to handle both folder and single file cases
-    # Replace invalid characters for filenames if necessary
-    script_file_name = os.path.basename(FOLDER_PATH)
-    # Simple sanitization (more robust handling might be needed for complex paths)
-    script_file_name = "".join([c for c in script_file_name if c.isalnum() or c in (' ', '.', '_', '-')]).rstrip() # Added hyphen
-    if not script_file_name:
-        script_file_name = "default_script" # Fallback name if sanitization results in empty string
+    script_reader = None  # Set when frames are loaded from a script file
+    frame_stream = None  # Set in streaming mode, until the first animation cycle is complete
+    telemetry = Telemetry(TELEMETRY_CAPACITY) if ENABLE_TELEMETRY else None
+    script_file_path = script_file_path_for(FOLDER_PATH)
+    playlist_preloader = None  # Set in playlist mode
 
-    script_file_path = os.path.join("Scripts", f"{script_file_name}.bin")
 
+    if playlist_mode:
+        # Entries are loaded on a background thread, the first one before the port is opened
+        print(f"Playing the playlist {FOLDER_PATH}.")
+        playlist_preloader = PlaylistPreloader(Playlist(FOLDER_PATH, LOOP_ANIMATION), load_playlist_entry,
+                                               PLAYLIST_POLL_SECONDS).start()
+        playlist_entry = next_playlist_entry(playlist_preloader)
+        if playlist_entry is not None:
+            print(f"Playlist entry: {playlist_entry[0]} ({len(playlist_entry[1])} frames)")
+            script_reader = playlist_entry[1]
+            processed_frames = script_reader
 
-    if AUTO_LOAD_SCRIPT and os.path.exists(script_file_path): # Check if script file exists when auto_load is True
+    elif AUTO_LOAD_SCRIPT and not raw_input_source and os.path.exists(script_file_path): # Check if script file exists when auto_load is True
         print(f"Attempting to load frames from script file: {script_file_path}")
         try:
-            with open(script_file_path, "rb") as f:  # Open in read binary mode
-                while True:
-                    # Read BYTES_PER_FRAME at a time
-                    frame_data = f.read(BYTES_PER_FRAME)
-                    if not frame_data:
-                        break  # End of file
-                    if len(frame_data) == BYTES_PER_FRAME:
-                        processed_frames.append(frame_data)  # Append the bytes
-                    else:
-                         print(f"Warning: Read incomplete frame data from {script_file_path}. Expected {BYTES_PER_FRAME} bytes, got {len(frame_data)}. Skipping.")
-                         # Depending on the expected file format, you might want to raise an error here
-                         break  # Stop reading on incomplete data
+            # The file is memory-mapped, frames are read lazily as zero-copy slices
+            script_reader = ScriptReader(script_file_path)
+            processed_frames = script_reader
+            if script_reader.frame_size != BYTES_PER_FRAME:
+                raise ValueError(f"Script file has {script_reader.frame_size}-byte frames, but DISPLAY_LAYOUT "
+                                 f"'{DISPLAY_LAYOUT}' needs {BYTES_PER_FRAME}-byte frames. Delete it to rebuild it.")
 
             if not processed_frames:
                  print(f"No frames loaded from {script_file_path}. Check file content or set AUTO_LOAD_SCRIPT = False.")
@@ -230,6 +1346,19 @@ if __name__ == '__main__':
                  # continue # Go back to the start of the main loop to process images
             else:
                  print(f"Successfully loaded {len(processed_frames)} frames from {script_file_path}.")
+                 if script_reader.version == 0:
+                     print("Info: Script file has no header (old format). Delete it to rebuild it in the current format.")
+                 else:
+                     stored_mode = THRESHOLD_MODES[script_reader.threshold_mode] if script_reader.threshold_mode < len(
+                         THRESHOLD_MODES) else script_reader.threshold_mode
+                     threshold_mode = THRESHOLD_MODE if COLOR_BINARIZATION_THRESHOLD == -1 else THRESHOLD_MODE_FRAME
+                     print(f"Script parameters: frames {script_reader.start_frame}-{script_reader.end_frame}, "
+                           f"threshold {script_reader.threshold} ('{stored_mode}'), "
+                           f"black/white {script_reader.black}/{script_reader.white}, "
+                           f"frame rate {script_reader.frame_rate:g}")
+                     if (script_reader.threshold, stored_mode, script_reader.black, script_reader.white) != (
+                             COLOR_BINARIZATION_THRESHOLD, threshold_mode, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE):
+                         print("Warning: Script file was built with different conversion settings than the current configuration.")
 
         except FileNotFoundError:
             # This should ideally not happen with the os.path.exists check, but keeping for robustness
@@ -250,110 +1379,24 @@ if __name__ == '__main__':
         if AUTO_LOAD_SCRIPT and not os.path.exists(script_file_path):
              print(f"Script file not found: {script_file_path}. Processing images instead.")
 
-        print("Processing images...")
-        # Ensure the Scripts directory exists
-        os.makedirs("Scripts", exist_ok=True)
-        script_file = None
-        try:
-            # Open script file for writing in binary mode
-            script_file = open(script_file_path, "wb")
-
-            if os.path.isdir(FOLDER_PATH):
-                # Process frames from a folder within the start and end range
-                # Ensure dirF is defined and sorted correctly
-                dirF = sorted([f for f in os.listdir(FOLDER_PATH) if
-                               f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp'))],
-                              # Include more image types
-                              key=lambda x: int(os.path.splitext(x)[0]) if os.path.splitext(x)[0].isdigit() else float(
-                                  'inf'))  # Robust sorting
-                total_frames_in_folder = len(dirF)
-                # Adjust effective end frame based on available files and user setting
-                effective_end_frame = min(END_FRAME_INDEX, total_frames_in_folder)
-
-                if START_FRAME_INDEX >= effective_end_frame:
-                    print(
-                        f"Warning: Start frame index ({START_FRAME_INDEX}) is beyond or equal to effective end frame index ({effective_end_frame}). No frames to process.")
-                else:
-                    for i in range(START_FRAME_INDEX, effective_end_frame):
-                        try:
-                            img_path = os.path.join(FOLDER_PATH, dirF[i])
-                            img = Image.open(img_path)
-                            # Get byte data using the updated convert function
-                            byte_data = convert(img, ENABLE_PRINTOUT, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
-                                                COLOR_BINARIZATION_THRESHOLD)
-                            if byte_data and len(byte_data) == BYTES_PER_FRAME:  # Ensure we got 64 bytes
-                                frame_bytes = bytes(byte_data)
-                                processed_frames.append(frame_bytes)  # Append as bytes
-                                if script_file:
-                                    script_file.write(frame_bytes)  # Write bytes to file
-                            else:
-                                print(
-                                    f"Warning: Could not process frame {i} ({dirF[i]}) or received incorrect data length. Skipping.")
-                        except FileNotFoundError:
-                            print(
-                                f"Error: Frame file not found: {os.path.join(FOLDER_PATH, dirF[i])}. Stopping processing.")
-                            break  # Stop processing if a file is missing
-                        except Exception as e:
-                            print(f"Error processing frame {i} ({dirF[i]}): {e}. Stopping processing.")
-                            break  # Stop processing on other errors
-
-            elif os.path.isfile(FOLDER_PATH):
-                # Process a single image or GIF
-                try:
-                    im = Image.open(FOLDER_PATH)
-                    if '.gif' in FOLDER_PATH.lower():
-                        # Process GIF frames within the start and end range (GIFs are 0-indexed)
-                        total_gif_frames = im.n_frames if hasattr(im, 'n_frames') else 1
-                        effective_end_frame = min(END_FRAME_INDEX, total_gif_frames)
-
-                        if START_FRAME_INDEX >= effective_end_frame:
-                             print(f"Warning: Start frame index ({START_FRAME_INDEX}) is beyond or equal to effective end frame index ({effective_end_frame}). No GIF frames to process.")
-                        else:
-                            for i, frame in enumerate(ImageSequence.Iterator(im)):
-                                if i >= START_FRAME_INDEX and i < effective_end_frame:
-                                    byte_data = convert(frame, ENABLE_PRINTOUT, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
-                                                        COLOR_BINARIZATION_THRESHOLD)
-                                    if byte_data and len(byte_data) == BYTES_PER_FRAME:
-                                        frame_bytes = bytes(byte_data)
-                                        processed_frames.append(frame_bytes)
-                                        if script_file:
-                                            script_file.write(frame_bytes)
-                                    else:
-                                        print(
-                                            f"Warning: Could not process GIF frame {i} or received incorrect data length. Skipping.")
-                                elif i >= effective_end_frame:
-                                    break  # Stop processing if we've passed the end frame
-
-                    else:
-                        # Process a single image (only frame 0) if within start/end range
-                        if START_FRAME_INDEX == 0 and END_FRAME_INDEX >= 1:
-                            byte_data = convert(im, ENABLE_PRINTOUT, BLACK_PIXEL_VALUE, WHITE_PIXEL_VALUE,
-                                                COLOR_BINARIZATION_THRESHOLD)
-                            if byte_data and len(byte_data) == BYTES_PER_FRAME:
-                                frame_bytes = bytes(byte_data)
-                                processed_frames.append(frame_bytes)
-                                if script_file:
-                                    script_file.write(frame_bytes)
-                            else:
-                                print(f"Warning: Could not process the image or received incorrect data length.")
-                        elif START_FRAME_INDEX > 0:
-                             print(f"Info: Single image at index 0 skipped as start is {START_FRAME_INDEX}.")
-
-
-                except FileNotFoundError:
-                     print(f"Error: Image file not found: {FOLDER_PATH}")
-                except Exception as e:
-                    print(f"Error processing image: {e}")
-        finally:
-            if script_file:
-                script_file.close()  # Ensure the script file is closed even if errors occur
-                if processed_frames:
-                    print(f"Processed {len(processed_frames)} frames and saved to {script_file_path}.")
-                else:
-                    print(f"No frames processed. Script file {script_file_path} may be empty or not created.")
+        if STREAMING_PLAYBACK or raw_input_source:
+            # Convert in the background while frames are already being sent
+            frame_stream = FrameStream(process_source_frames(FOLDER_PATH, script_file_path, telemetry,
+                                                             max_queued_frames=STREAM_QUEUE_FRAMES),
+                                       STREAM_QUEUE_FRAMES).start()
+            processed_frames = frame_stream
+        else:
+            # The frames are collected in one contiguous buffer, see FrameStore.py
+            processed_frames = FrameStore(BYTES_PER_FRAME)
+            for _ in process_source_frames(FOLDER_PATH, script_file_path, telemetry, processed_frames):
+                pass
+            if processed_frames and ENABLE_PLAYBACK_SCHEDULER:
+                # Map the new script file for the GIF frame durations stored in it
+                script_reader = ScriptReader(script_file_path)
 
 
-    if not processed_frames:
+    # In streaming mode, wait until the first frame is converted (or the source turned out empty)
+    if not (frame_stream.wait_for_first_frame() if frame_stream is not None else processed_frames):
         print("No frames available to send. Exiting.")
         # Show cursor before exiting
         sys.stdout.write("\033[?25h")
@@ -363,9 +1406,7 @@ if __name__ == '__main__':
     # --- Serial Connection ---
     ser = None  # Initialize ser to None
     try:
-        ser = serial.Serial(COM_PORT, BAUDRATE, timeout=1)  # Add a timeout
-        # Give the Arduino time to reset after opening the serial connection
-        sleep(2)  # Adjust this delay if needed
+        ser = open_serial_port(COM_PORT, BAUDRATE, ACK_TIMEOUT_SECONDS, AVOID_BOARD_RESET)  # Add a timeout
     except serial.SerialException as e:
         print(f"Failed to connect to Arduino on {COM_PORT}: {e}")
         # Show cursor before exiting
@@ -384,67 +1425,50 @@ if __name__ == '__main__':
 
     print(f"Serial port {COM_PORT} opened successfully at {BAUDRATE} baud.")
     print("Please wait for Arduino initialization...")
-    # Wait for a signal from Arduino if needed, or a fixed delay
-    sleep(3)  # Give Arduino some time to initialize
+    # Wait until the sketch announces that it is ready (right away if the board kept running)
+    handshake_begin = perf_counter()
+    ready = wait_for_ready(ser, READY_TIMEOUT_SECONDS)
+    if ready is None:
+        print(f"Warning: No READY message from the Arduino within {READY_TIMEOUT_SECONDS} seconds. "
+              f"Is the sketch up to date? Sending anyway.")
+    else:
+        version, capabilities = ready
+        print(f"Arduino ready after {perf_counter() - handshake_begin:.2f} seconds "
+              f"(protocol {version}, capabilities {capabilities:#04x}).")
+        if version != PROTOCOL_VERSION:
+            print(f"Warning: The sketch speaks protocol {version}, this script protocol {PROTOCOL_VERSION}. "
+                  f"Upload ino/ino.ino again.")
+        if DISPLAY_LAYOUT == LAYOUT_FULL and not capabilities & CAPABILITY_GLYPH_FRAMES:
+            print("Warning: The sketch does not support glyph frames, needed for DISPLAY_LAYOUT = 'full'.")
+        if ROW_PACKING and not capabilities & CAPABILITY_PACKED_ROWS:
+            print("Info: The sketch does not support packed rows, frames are sent unpacked.")
 
     # --- Main Loop (Sending and Idle) ---
+    # The encoder remembers what the Arduino is displaying, across animation cycles
+    frame_encoder = create_frame_encoder()
+    # Packed rows only if the sketch reported that it can unpack them
+    frame_encoder.packed_rows = ROW_PACKING and ready is not None and bool(ready[1] & CAPABILITY_PACKED_ROWS)
+    playback_scheduler = PlaybackScheduler(TARGET_FPS) if ENABLE_PLAYBACK_SCHEDULER else None
+    preview = TerminalPreview(DISPLAY_LAYOUT, WHITE_PIXEL_VALUE).start() if ENABLE_PRINTOUT else None
     try:
         while True:  # Outer loop to keep the script running for looping animation or idle state
             if processed_frames and ser and ser.is_open:  # Check if ser is not None and is open
-                print("\nStart sending frames (sending every {} frames)...".format(FRAMES_PER_PRINT)) # Indicate skipping
+                if playback_scheduler:
+                    # GIF sources play with their stored frame durations once the script file exists
+                    if script_reader is not None and script_reader.durations is not None:
+                        playback_scheduler.frame_duration_ms = script_reader.frame_duration
+                    else:
+                        playback_scheduler.frame_duration_ms = None
+                    print(f"\nStart sending frames (scheduled at {TARGET_FPS} FPS)...")
+                else:
+                    print("\nStart sending frames (sending every {} frames)...".format(FRAMES_PER_PRINT)) # Indicate skipping
                 begin_time = time()
-                frame_count_sent_in_cycle = 0  # Counter for frames *actually sent* in the current cycle
-
-                # Iterate through all processed frames, but only send based on FRAMES_PER_PRINT
-                for i, frame_bytes in enumerate(processed_frames):
-
-                    # Check if the current frame index is a multiple of FRAMES_PER_PRINT
-                    if i % FRAMES_PER_PRINT == 0:
-                        try:
-                            # Send the BYTES_PER_FRAME of data
-                            ser.write(frame_bytes)
-                            # Wait for a confirmation from the Arduino ("OK\r\n")
-                            # This synchronizes sending with Arduino's processing speed
-                            # Use readline with a timeout to prevent infinite blocking
-                            response = ""
-                            try:
-                               response = ser.readline().decode('utf-8').strip()
-                            except serial.SerialTimeoutException:
-                               print(f"\nWarning: Serial read timeout while waiting for confirmation for frame {START_FRAME_INDEX + i}. Arduino might be unresponsive.")
-                               # Decide how to handle this: break, skip frame, retry?
-                               # For now, break the sending loop
-                               break # Exit the sending loop
-
-
-                            if response == "OK":
-                                # Arduino processed the frame, proceed to the next
-                                # Display actual frame index being sent
-                                actual_frame_index = START_FRAME_INDEX + i
-                                # Use carriage return \r to overwrite the line for cleaner output
-                                sys.stdout.write(f"\rSent frame: {actual_frame_index}")
-                                sys.stdout.flush()  # Ensure output is displayed immediately
-
-                                frame_count_sent_in_cycle += 1 # Increment sent frame count
-
-                            else:
-                                # Received unexpected response or timeout
-                                print(
-                                    f"\nWarning: Received unexpected response from Arduino for frame {START_FRAME_INDEX + i}: '{response}'")
-                                # Depending on the issue, you might want to retry or skip the frame
-                                # For now, we'll just print a warning and continue
-                                frame_count_sent_in_cycle += 1  # Still count the frame as attempted
-
-
-                        except serial.SerialTimeoutException:
-                            # This specific timeout is now handled within the inner try block for readline
-                            pass  # Already handled above
-                        except serial.SerialException as e:
-                            print(f"\nSerial error during sending frame {START_FRAME_INDEX + i}: {e}")
-                            break  # Exit the sending loop on serial error
-                        except Exception as e:
-                            print(f"\nAn unexpected error occurred while sending frame {START_FRAME_INDEX + i}: {e}")
-                            break  # Exit on other errors
-                    # If i % FRAMES_PER_PRINT != 0, the frame is skipped and nothing is sent
+                # Send all processed frames, on schedule or every FRAMES_PER_PRINT-th one
+                link_counters = {}
+                frame_count_sent_in_cycle, bytes_sent_in_cycle = send_frames(
+                    ser, processed_frames, frame_encoder, FLOW_CONTROL_WINDOW, ARDUINO_RX_BUFFER_BYTES,
+                    FRAMES_PER_PRINT, START_FRAME_INDEX, playback_scheduler, telemetry,
+                    LOST_FRAME_POLICY, MAX_RETRANSMITS, link_counters, preview)
 
                 end_time = time()
                 duration = end_time - begin_time
@@ -452,6 +1476,16 @@ if __name__ == '__main__':
                 print("-" * 20)
                 print(f"Total frames processed in cycle: {len(processed_frames)}") # Report total processed
                 print(f"Total frames sent in this run: {frame_count_sent_in_cycle}") # Report total sent
+                if frame_count_sent_in_cycle > 0:
+                     print(f"Bytes sent: {bytes_sent_in_cycle} (average {bytes_sent_in_cycle / frame_count_sent_in_cycle:.1f} per frame, encoding '{FRAME_ENCODING}')")
+                print(f"Flow control window: {FLOW_CONTROL_WINDOW} frame(s)")
+                if link_counters:
+                    print("Link errors: " + ", ".join(f"{name}: {value}" for name, value in sorted(link_counters.items())))
+                if playback_scheduler:
+                    print(f"Frames dropped to stay on schedule: {playback_scheduler.frames_dropped} of {playback_scheduler.frames_scheduled}")
+                    print(f"Lateness of shown frames: average {playback_scheduler.average_lateness() * 1000:.1f} ms, "
+                          f"max {playback_scheduler.max_lateness * 1000:.1f} ms "
+                          f"(confirmation latency {playback_scheduler.latency * 1000:.1f} ms)")
                 print(f"Time elapsed: {duration:.2f} seconds")
                 # Report the Target FPS (from configuration)
                 print(f"Target FPS: {TARGET_FPS}")
@@ -461,14 +1495,46 @@ if __name__ == '__main__':
                 # Report the effective FPS based on original frames and duration (if needed)
                 # if duration > 0:
                 #      print(f"Approximate Effective FPS (original frames): {round(len(processed_frames) / duration, 2)}")
+                if frame_stream is not None:
+                    print(f"Streaming: converter waited {frame_stream.producer_blocked_seconds:.2f} s for the sender, "
+                          f"sender waited {frame_stream.consumer_wait_seconds:.2f} s for the converter "
+                          f"(max {frame_stream.max_queue_depth} of {STREAM_QUEUE_FRAMES} frames queued)")
+                if telemetry:
+                    print(f"Stage timings (last {TELEMETRY_CAPACITY} frames per stage):")
+                    print(telemetry.report())
                 print("-" * 20)
 
+                if frame_stream is not None:
+                    # The stream can only be played once, later cycles use the script file written along the way
+                    if not frame_stream.finished.is_set():
+                        frame_stream.stop()
+                    frame_stream = None
+                    script_reader = ScriptReader(script_file_path)
+                    processed_frames = script_reader
+
+                if playlist_preloader is not None:
+                    # Continue with the preloaded next entry. The encoder still knows what the LCD
+                    # shows, so the first frame of the next entry is sent right away as a delta.
+                    waited_seconds = playlist_preloader.waited_seconds
+                    playlist_entry = next_playlist_entry(playlist_preloader)
+                    if playlist_entry is not None:
+                        if playlist_preloader.waited_seconds > waited_seconds:
+                            print(f"Waited {playlist_preloader.waited_seconds - waited_seconds:.2f} s for the entry to load.")
+                        print(f"\nPlaylist entry: {playlist_entry[0]} ({len(playlist_entry[1])} frames)")
+                        script_reader.close()
+                        script_reader = playlist_entry[1]
+                        processed_frames = script_reader
+                        continue
+                    print("\nPlaylist finished. Entering idle state. Press Enter to exit.")
+                    wait_for_enter()
+                    break
+
                 # After the sending loop finishes:
                 if not LOOP_ANIMATION:
                     # If LOOP_ANIMATION is False, enter idle state
                     print("\nAnimation finished. Entering idle state. Press Enter to exit.")
                     # Wait for user input to exit the script
-                    input()
+                    wait_for_enter()
                     break  # Exit the outer while True loop
 
                 else:  # LOOP_ANIMATION is True
@@ -486,13 +1552,13 @@ if __name__ == '__main__':
         # Handle Ctrl+C interruption
         print("\nInterrupted by user. Entering idle state. Press Enter to exit.")
         # Enter idle state: wait for user input before cleanup
-        input()
+        wait_for_enter()
     except Exception as e:
         # Handle any other unexpected errors
         print(f"\nAn unexpected error occurred during animation: {e}")
         print("Entering idle state. Press Enter to exit.")
         # Enter idle state: wait for user input before cleanup
-        input()
+        wait_for_enter()
 
     # --- Cleanup ---
     # This part is reached when the outer loop is broken (either by finishing non-looping animation,
@@ -502,6 +1568,21 @@ if __name__ == '__main__':
         print("Serial port closed.")
     else:
         print("Serial port was already closed or not opened.")
+    if frame_stream is not None:
+        frame_stream.stop()  # Finishes the script file written so far
+    if preview is not None:
+        preview.stop()
+    if playlist_preloader is not None:
+        playlist_preloader.stop()
+    if script_reader is not None:
+        script_reader.close()
+    if telemetry and TELEMETRY_EXPORT_PATH:
+        if telemetry.export(TELEMETRY_EXPORT_PATH):
+            print(f"Telemetry exported to {TELEMETRY_EXPORT_PATH}")
+    if emulator is not None:
+        emulator.stop()
+        print(f"Emulated Arduino: {emulator.frames_received} frames displayed, "
+              f"{emulator.overflow_bytes} bytes lost to receive buffer overflow.")
 
     # Show the cursor again in the terminal
     # Re-enable cursor before exiting